@@ -5,116 +5,61 @@ PvPGN item report - enhanced:
 - search/filter, sorting, expand/collapse, color per account, export JSON/CSV
 - No auto-refresh
 """
-from d2lib.files import D2SFile
-import os, glob, html, json, csv
+import os, sys, glob, html, json, csv
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from collections import defaultdict
+from types import SimpleNamespace
 
 # === Configuration ===
 CHAR_DIR = "/usr/local/pvpgn/var/pvpgn/charsave"
 CHARINFO_DIR = "/usr/local/pvpgn/var/pvpgn/charinfo"
+# shared helpers (charinfo_index.py) live in the pvpgnjsonstat d2gs dir
+D2GS_LIB_DIR = "/home/support/scripts-tools/d2cpp/pvpgnjsonstat/d2gs"
+CHARINFO_INDEX_FILE = os.path.join(D2GS_LIB_DIR, "cache", "charinfo_index.json")
+SNAPSHOT_FILE = os.path.join(D2GS_LIB_DIR, "cache", "char_snapshot.bin")
+sys.path.insert(0, D2GS_LIB_DIR)
+from charinfo_index import build_account_index
+from item_classes import item_categories
 OUTPUT_HTML = "/var/www/html/webstat.html"
 OUTPUT_JSON = "/var/www/html/items_export.json"
 OUTPUT_CSV  = "/var/www/html/items_export.csv"
 
 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-# Best-effort mapping from item.code (from d2lib) to human item type categories
-# Extend this mapping if you find codes not present for your saves.
-CODE_TO_TYPE = {
-    # amulet
-    "amu": "amulet",
-    # ring
-    "rin": "ring", "rin": "ring",
-    # belt
-    "bel": "belt",
-    # charm codes seen in your output: cm1, cm2, cm3
-    "cm1": "charm_small",
-    "cm2": "charm_large",
-    "cm3": "charm_grand",
-    # jewelry generic
-    "jew": "jewelry",
-    # weapons / armor (examples)
-    "swd": "weapon", "swf": "weapon", "axe": "weapon", "axe": "weapon",
-    "bow": "weapon", "xbow": "weapon", "stf": "weapon", "bst": "weapon",
-    "amu": "amulet",
-    # shields / armor
-    "shd": "armor", "plt": "armor", "plt": "armor", "ht": "armor",
-    # jewels / gems
-    "gem": "gem", "gld": "gold", "tkp": "token",
-    # books / tomes etc
-    "tbk": "book",
-    # other/skill items
-    "uap": "helmet",  # harlequin crest = uap (uniq helm)
-    # fallback mapping placeholders
-}
+# item.code -> category ("weapon", "armor", "ring", "belt", "amulet", "charm_small", ...),
+# one table built from weapons/armor/misc.txt (item_classes.py, cached in D2GS_LIB_DIR/cache)
+ITEM_CATEGORY = item_categories()
+
+# Finds account name (BNET account) for a character filename.
+# One os.scandir pass over charinfo (shared index from pvpgnjsonstat/d2gs),
+# built once per run instead of listing every account dir per character.
+# d2lib and the index are only needed for decoding, so --snapshot skips both
+# (see prepare_decode).
+D2SFile = None
+ACCOUNT_INDEX = {}
+
+def prepare_decode():
+    global D2SFile, ACCOUNT_INDEX
+    from d2lib.files import D2SFile
+    ACCOUNT_INDEX = build_account_index(CHARINFO_DIR, CHARINFO_INDEX_FILE)
 
-# Helper detection: if item.code not in CODE_TO_TYPE, try suffix/prefix heuristics
-def detect_type_from_code_and_name(code, name):
-    if not code:
-        code = ""
-    if not name:
-        name = ""
-    code = code.lower()
-    name = name.lower()
-    # direct mapping
-    if code in CODE_TO_TYPE:
-        return CODE_TO_TYPE[code]
-    # heuristics by name
-    if "ring" in name or "band" in name:
-        return "ring"
-    if "amulet" in name or "gorget" in name or "neck" in name:
-        return "amulet"
-    if "belt" in name:
-        return "belt"
-    if "charm" in name or "annihilus" in name or "gheed" in name:
-        # charm size cannot be guaranteed by name but treat as generic charm
-        return "charm"
-    if "helm" in name or "crown" in name or "mask" in name:
-        return "helmet"
-    if "shield" in name:
-        return "shield"
-    # weapon keywords
-    for kw in ("sword","axe","mace","dagger","bow","crossbow","staff","polearm","spear","hammer"):
-        if kw in name:
-            return "weapon"
-    # armor keywords
-    for kw in ("armor","plate","mail","leather","chain","robe","shield"):
-        if kw in name:
-            return "armor"
-    # fallback
-    return "other"
-
-# Finds account name (BNET account) for a character filename using charinfo dirs
 def find_account_for_character(char_filename):
-    # char_filename may be the name of charsave file (same as character)
-    # search CHARINFO_DIR subfolders for this filename
-    try:
-        for acc in os.listdir(CHARINFO_DIR):
-            p = os.path.join(CHARINFO_DIR, acc)
-            if not os.path.isdir(p):
-                continue
-            # list files inside
-            try:
-                if char_filename in os.listdir(p):
-                    return acc
-            except Exception:
-                continue
-    except FileNotFoundError:
-        pass
-    return "Unknown"
+    return ACCOUNT_INDEX.get(char_filename, "Unknown")
 
-# Gather data
-rows = []
-for path in sorted(glob.glob(os.path.join(CHAR_DIR, "*"))):
+# Decode one charsave into a plain (picklable) row; None if unreadable
+def scan_character(path):
     try:
         d2s = D2SFile(path)
     except Exception:
         # skip unreadable
-        continue
+        return None
 
     char_fname = os.path.basename(path)
-    char_name = getattr(d2s, "name", None) or char_fname
+    # same attribute as char_snapshot.py, so both paths give the same charname
+    char_name = getattr(d2s, "char_name", None) or char_fname
     account_name = find_account_for_character(char_fname)
 
     # combine inventory + stash if present
@@ -129,6 +74,12 @@ for path in sorted(glob.glob(os.path.join(CHAR_DIR, "*"))):
             except Exception:
                 pass
 
+    return build_row(account_name, char_fname, char_name, all_items)
+
+# Categorize one character's items into a plain (picklable) row.
+# Items only need getattr-able name/code/is_unique/is_set/is_rune/rune_id,
+# so both d2lib items and snapshot items (as SimpleNamespace) work here.
+def build_row(account_name, char_fname, char_name, all_items):
     # categorize items
     unique_set = []
     runes = []
@@ -166,44 +117,30 @@ for path in sorted(glob.glob(os.path.join(CHAR_DIR, "*"))):
             runes.append(f"Rune ID {rid}")
             continue
 
-        # charms detection by code prefix (cm1/cm2/cm3 shown in your qt.py)
-        code_l = code.lower()
-        if code_l.startswith("cm"):
-            # cm1 / cm2 / cm3 heuristics
-            if code_l.startswith("cm1"):
-                charms_small.append(name or code)
-            elif code_l.startswith("cm2"):
-                charms_large.append(name or code)
-            elif code_l.startswith("cm3"):
-                charms_grand.append(name or code)
-            else:
-                # generic charm
-                charms_small.append(name or code)
-            continue
-
-        # detect type by mapping or heuristics
-        itype = detect_type_from_code_and_name(code, name)
+        # one dict lookup by code (unknown codes -> other)
+        itype = ITEM_CATEGORY.get(code.strip().lower(), "other")
 
-        if itype == "ring":
+        if itype == "charm_small":
+            charms_small.append(name or code)
+        elif itype == "charm_large":
+            charms_large.append(name or code)
+        elif itype == "charm_grand":
+            charms_grand.append(name or code)
+        elif itype == "ring":
             rings.append(name)
         elif itype == "belt":
             belts.append(name)
         elif itype == "amulet":
             amulets.append(name)
-        elif itype.startswith("charm"):
-            # fallback if charm detection by code didn't trigger
-            charms_small.append(name)
         elif itype == "weapon":
             weapons.append(name)
-        elif itype in ("armor","helmet","shield"):
+        elif itype == "armor":
             armors.append(name)
-        elif itype == "other":
-            other.append(name)
         else:
-            # put into other if unknown
+            # potions, gems, jewels, quest items, unknown codes
             other.append(name)
 
-    rows.append({
+    return {
         "account": account_name,
         "charfile": char_fname,
         "charname": char_name,
@@ -218,7 +155,50 @@ for path in sorted(glob.glob(os.path.join(CHAR_DIR, "*"))):
         "weapons": weapons,
         "armors": armors,
         "other": other,
-    })
+    }
+
+# Decode all charsaves; with workers > 1 fan out to a process pool.
+# pool.map keeps input order, so rows come back in sorted-path order
+# and the output is identical to the serial run.
+def scan_all_characters(paths, workers=1):
+    prepare_decode()
+    if workers <= 1 or len(paths) <= 1:
+        results = [scan_character(p) for p in paths]
+    else:
+        # fork: workers inherit the imported d2lib and config, nothing is re-run
+        ctx = multiprocessing.get_context("fork")
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            results = list(pool.map(scan_character, paths, chunksize=chunksize))
+    return [r for r in results if r is not None]
+
+# Rows from the shared character snapshot (pvpgnjsonstat/d2gs/07.build_char_snapshot.py),
+# no D2SFile decoding at all
+def rows_from_snapshot(snapshot_path):
+    from char_snapshot import load_snapshot
+    snapshot = load_snapshot(snapshot_path)
+    if snapshot is None:
+        raise SystemExit(f"No usable character snapshot at {snapshot_path}")
+    rows = []
+    for rec in snapshot["characters"]:
+        items = [SimpleNamespace(**it) for it in rec["items"]]
+        rows.append(build_row(rec["account"], rec["charfile"], rec["charname"], items))
+    return rows
+
+parser = argparse.ArgumentParser(description="PvPGN item report (HTML + JSON/CSV exports)")
+parser.add_argument("--workers", type=int, default=1, metavar="N",
+                    help="decode charsaves in N parallel processes (default: 1)")
+parser.add_argument("--snapshot", action="store_true",
+                    help="render from the shared character snapshot instead of decoding charsaves")
+parser.add_argument("--snapshot-file", default=SNAPSHOT_FILE, metavar="PATH",
+                    help=f"snapshot to read with --snapshot (default: {SNAPSHOT_FILE})")
+args = parser.parse_args()
+
+# Gather data
+if args.snapshot:
+    rows = rows_from_snapshot(args.snapshot_file)
+else:
+    rows = scan_all_characters(sorted(glob.glob(os.path.join(CHAR_DIR, "*"))), args.workers)
 
 # Save JSON and CSV exports (single exports)
 with open(OUTPUT_JSON, "w", encoding="utf-8") as jf:
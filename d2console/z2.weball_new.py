@@ -4,13 +4,18 @@
 # Requires: d2lib (pip install d2lib)
 
 from d2lib.files import D2SFile
-import os, glob, html, json, csv
+import os, sys, glob, html, json, csv
 from datetime import datetime
 from collections import defaultdict
 
 # CONFIG
 CHAR_DIR = "/usr/local/pvpgn/var/pvpgn/charsave"
 CHARINFO_DIR = "/usr/local/pvpgn/var/pvpgn/charinfo"
+# shared helpers (charinfo_index.py) live in the pvpgnjsonstat d2gs dir
+D2GS_LIB_DIR = "/home/support/scripts-tools/d2cpp/pvpgnjsonstat/d2gs"
+CHARINFO_INDEX_FILE = os.path.join(D2GS_LIB_DIR, "cache", "charinfo_index.json")
+sys.path.insert(0, D2GS_LIB_DIR)
+from charinfo_index import build_account_index
 OUTPUT_HTML = "/var/www/html/index2.html"
 OUTPUT_JSON = "/var/www/html/pvpgn_items.json"
 OUTPUT_CSV = "/var/www/html/pvpgn_items.csv"
@@ -56,21 +61,11 @@ CHARM_SIZE_MAP = {
     # If item.name contains "small charm" or code contains some marker, place accordingly
 }
 
-# helper: find the account owning the char by scanning charinfo folder
+# helper: find the account owning the char (one-pass charinfo index, built once per run)
+ACCOUNT_INDEX = build_account_index(CHARINFO_DIR, CHARINFO_INDEX_FILE)
+
 def find_account_for_character(char_name):
-    try:
-        for account in os.listdir(CHARINFO_DIR):
-            acc_path = os.path.join(CHARINFO_DIR, account)
-            if not os.path.isdir(acc_path):
-                continue
-            try:
-                if char_name in os.listdir(acc_path):
-                    return account
-            except Exception:
-                continue
-    except Exception:
-        pass
-    return "Unknown"
+    return ACCOUNT_INDEX.get(char_name, "Unknown")
 
 # helper: determine category using item attributes + name heuristics
 def determine_category(item):
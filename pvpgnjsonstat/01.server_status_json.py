@@ -1,8 +1,14 @@
 import os
+import sys
 import datetime
 import xml.etree.ElementTree as ET
 import json
 
+# Общият поточен парсер на server.xml
+D2GS_PY_DIR = "/home/support/scripts-tools/d2cpp/python-tools/d2gs-py"
+sys.path.insert(0, D2GS_PY_DIR)
+from pvpgn_server_xml import iter_server_xml
+
 # --- КОНФИГУРАЦИЯ ---
 PVPGN_SERVER_XML = "/usr/local/pvpgn/var/pvpgn/status/server.xml"
 PVPGN_STATUS_XML = "/usr/local/pvpgn/var/pvpgn/logs/pvpgnstatus.xml"
@@ -25,49 +31,43 @@ def parse_server_xml(file_path):
         "games": []
     }
 
-    tree = ET.parse(file_path)
-    root = tree.getroot()
-
-    # Version
-    version = root.findtext("Version")
-    if version:
-        data["status"]["version"] = version
-
-    # Uptime
-    uptime = root.find("Uptime")
-    if uptime is not None:
-        data["status"]["uptime"] = {
-            "days": int(uptime.findtext("Days", 0)),
-            "hours": int(uptime.findtext("Hours", 0)),
-            "minutes": int(uptime.findtext("Minutes", 0)),
-            "seconds": int(uptime.findtext("Seconds", 0)),
-        }
-
-    # Users
-    users_node = root.find("Users")
-    if users_node is not None:
-        for user in users_node.findall("user"):
-            platform = user.findtext("clienttag")
+    # поточно (XMLParser с expat target, без дърво): записите идват по реда в документа
+    for kind, rec in iter_server_xml(file_path):
+        # Version
+        if kind == "version":
+            if rec["Version"]:
+                data["status"]["version"] = rec["Version"]
+
+        # Uptime
+        elif kind == "uptime":
+            data["status"]["uptime"] = {
+                "days": int(rec.get("Days", 0)),
+                "hours": int(rec.get("Hours", 0)),
+                "minutes": int(rec.get("Minutes", 0)),
+                "seconds": int(rec.get("Seconds", 0)),
+            }
+
+        # Users
+        elif kind == "user":
+            platform = rec.get("clienttag")
             data["users"].append({
                 "platform_tag": platform,
                 "platform_name": PLATFORM_MAP.get(platform, platform),
-                "username": user.findtext("name"),
-                "version": user.findtext("version"),
-                "region": user.findtext("country"),
-                "channel_id": user.findtext("gameid")
+                "username": rec.get("name"),
+                "version": rec.get("version"),
+                "region": rec.get("country"),
+                "channel_id": rec.get("gameid")
             })
 
-    # Games
-    games_node = root.find("Games")
-    if games_node is not None:
-        for game in games_node.findall("game"):
-            platform = game.findtext("clienttag")
+        # Games
+        elif kind == "game":
+            platform = rec.get("clienttag")
             data["games"].append({
-                "id": game.findtext("id"),
+                "id": rec.get("id"),
                 "platform_tag": platform,
                 "platform_name": PLATFORM_MAP.get(platform, platform),
                 "players": None,
-                "name": game.findtext("name")
+                "name": rec.get("name")
             })
 
     return data
@@ -7,17 +7,18 @@ rm $WORKDIR/logs/* -f
 cp /usr/local/pvpgn/var/pvpgn/logs/games.txt $WEBDIR/games.txt
 
 cp /usr/local/pvpgn/var/pvpgn/ladders/d2ladder.xml $WEBDIR/
-sleep 1
-$WORKDIR/01.d2gs_get_gl.exp
-sleep 1
-$WORKDIR/02.bashawksed.sh
-sleep 1
-$WORKDIR/03.d2gs_cl_runner.sh
-sleep 1
-python3 $WORKDIR/05.gameinfo2json.py
-sleep 1
+# gl + all cl in one console session -> all_games_d2.json (--dump-raw keeps the old logs/ files)
+python3 $WORKDIR/01.d2gs_collect_games.py
+# old file-based pipeline:
+#$WORKDIR/01.d2gs_get_gl.exp
+#$WORKDIR/02.bashawksed.sh
+#$WORKDIR/03.d2gs_cl_runner.sh
+#python3 $WORKDIR/05.gameinfo2json.py
 python3 $WORKDIR/06_build_ladder.py
 sleep 1
+# decode charsave once (changed saves only); 07 items + 06 runes render from the snapshot
+# (if 09.charsave_watcher.py runs as a daemon, these three steps can be dropped)
+python3 $WORKDIR/07.build_char_snapshot.py --workers 4
 python3 $WORKDIR/07.generate_items_json.py
 sleep 0.5
 python3 $WORKDIR/06.generate_rune_json.py
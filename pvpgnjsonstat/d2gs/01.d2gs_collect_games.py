@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Събира списъка с игри и героите в тях от D2GS конзолата и пише all_games_d2.json.
+
+Заменя веригата 01.d2gs_get_gl.exp -> 02.bashawksed.sh -> 03.d2gs_cl_runner.sh
+(по един expect/telnet за всяка игра) -> 05.gameinfo2json.py: една сесия,
+"gl" и всички "cl <id>" наведнъж, парсване в паметта.
+
+    python3 01.d2gs_collect_games.py              # само JSON
+    python3 01.d2gs_collect_games.py --dump-raw   # + старите файлове в logs/
+                                                  # (d2gs_gl_raw.txt, game_ready_ids.txt,
+                                                  #  cl_output/cl_<id>_raw.txt) за дебъг
+"""
+import os
+import sys
+import json
+import argparse
+
+from gameinfo import parse_gl_game_ids, parse_game_text, calculate_xp_rate
+
+# Общият клиент за D2GS конзолата
+D2GS_PY_DIR = "/home/support/scripts-tools/d2cpp/python-tools/d2gs-py"
+sys.path.insert(0, D2GS_PY_DIR)
+from d2gs_console import D2GSConsole, D2GSConsoleError
+
+# --- КОНФИГУРАЦИЯ ---
+HOST = "192.168.88.41"
+PORT = 8888
+PASSWORD = "abcd123"
+
+WORKDIR = "/home/support/scripts-tools/d2cpp/pvpgnjsonstat/d2gs"
+LOGS_DIR = os.path.join(WORKDIR, "logs")
+CL_OUTPUT_DIR = os.path.join(LOGS_DIR, "cl_output")
+OUTPUT_FILES = [
+    os.path.join(LOGS_DIR, "all_games_d2.json"),
+    "/var/www/html/pvpjsonstat/jsons/all_games_d2.json",
+]
+
+
+def collect(console):
+    """Връща (суров gl, [(game_id, суров cl), ...]) от една сесия."""
+    raw_gl = console.run("gl")
+    game_ids = parse_gl_game_ids(raw_gl)
+    raw_cls = console.run_many([f"cl {gid}" for gid in game_ids]) if game_ids else []
+    return raw_gl, list(zip(game_ids, raw_cls))
+
+
+def dump_raw(raw_gl, games_raw):
+    """Старите междинни файлове (същите имена като от expect скриптовете)."""
+    os.makedirs(CL_OUTPUT_DIR, exist_ok=True)
+    with open(os.path.join(LOGS_DIR, "d2gs_gl_raw.txt"), "w") as f:
+        f.write(raw_gl + "\n")
+    with open(os.path.join(LOGS_DIR, "game_ready_ids.txt"), "w") as f:
+        f.writelines(f"{gid}\n" for gid, _ in games_raw)
+    for gid, raw_cl in games_raw:
+        with open(os.path.join(CL_OUTPUT_DIR, f"cl_{gid}_raw.txt"), "w") as f:
+            f.write(raw_cl + "\n")
+    print(f"Raw console output dumped to {LOGS_DIR}")
+
+
+def write_json_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect D2GS games (gl + cl) into all_games_d2.json in one console session.")
+    parser.add_argument("--dump-raw", action="store_true", help="also write the raw gl/cl text files to logs/ (debug)")
+    args = parser.parse_args()
+
+    try:
+        with D2GSConsole(HOST, PORT, PASSWORD) as console:
+            raw_gl, games_raw = collect(console)
+    except D2GSConsoleError as e:
+        # Старият JSON остава - по-добре стари данни, отколкото празен списък
+        print(f"Error: D2GS console unavailable: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.dump_raw:
+        dump_raw(raw_gl, games_raw)
+
+    all_games = [calculate_xp_rate(parse_game_text(raw_cl)) for _, raw_cl in games_raw]
+
+    for path in OUTPUT_FILES:
+        write_json_atomic(path, all_games)
+        print(f"Processed {len(all_games)} games, output saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
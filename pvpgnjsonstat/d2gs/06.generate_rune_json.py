@@ -2,18 +2,21 @@
 """
 Скрипт за сканиране на всички герои, събиране на руните и генериране на
 един JSON файл с цялата информация.
+Героите се четат от общия snapshot (07.build_char_snapshot.py), а не с D2SFile.
 """
 import os
 import sys
 import json
-from d2lib.files import D2SFile
 from typing import List, Dict, Any
 from collections import defaultdict
 
+import char_snapshot
+
 # =======================================================
 # --- КОНФИГУРАЦИЯ ---
 D2_DATA_DIR = "/home/support/scripts-tools/d2cpp/pvpgnjsonstat/d2gs/items/" 
 CHAR_SAVE_DIR = "/usr/local/pvpgn/var/pvpgn/charsave"
+SNAPSHOT_FILE = char_snapshot.SNAPSHOT_FILE
 # WEBROOT & OUTPUT PATH
 WEBROOT = "/var/www/html/pvpjsonstat/"
 OUTPUT_JSON_PATH = os.path.join(WEBROOT, "jsons", "rune_inventory.json")
@@ -48,45 +51,20 @@ RUNE_STATS = {
     "Zod Rune": "Indestructible (Weapon/Armor/Helm/Shield)"
 }
 
-# --- D2LIB ЗАРЕЖДАНЕ ---
-os.environ['D2_DATA_PATH'] = D2_DATA_DIR
-try:
-    from d2lib.files import D2SFile
-except ImportError:
-    print("[!!!] ERROR: Failed to import d2lib.files.D2SFile. Is d2lib installed?")
-    sys.exit(1)
-
-
-def gather_all_runes_detailed(char_dir: str) -> Dict[str, Dict[str, int]]:
+def gather_all_runes_detailed(snapshot: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
     """
-    Сканира всички файлове, събира руните и проследява кой герой колко руни има.
+    Обхожда героите в snapshot-а, събира руните и проследява кой герой колко руни има.
     Връща: { 'RuneName': { 'char_name': count, ... }, ... }
     """
     total_rune_inventory = defaultdict(lambda: defaultdict(int))
-    
-    if not os.path.isdir(char_dir):
-        print(f"[!!!] ERROR: Директорията за запазване на герои не е намерена: {char_dir}")
-        return total_rune_inventory
-
-    for filename in os.listdir(char_dir):
-        char_path = os.path.join(char_dir, filename)
-        if os.path.isdir(char_path): continue
-            
-        try:
-            d2s = D2SFile(char_path)
-            char_name = filename
-        except Exception:
-            continue
 
-        all_items = list(getattr(d2s, "items", []))
-        try: all_items.extend(list(getattr(d2s, "stash", [])))
-        except Exception: pass
-        
-        for item in all_items:
-            code = getattr(item, 'code', '')
+    for record in snapshot["characters"]:
+        char_name = record["charfile"]
+        for item in record["items"]:
+            code = item["code"]
             if code.startswith('r') and code not in NON_RUNE_CODES:
                 if len(code) == 3 and code[1:].isdigit() and 1 <= int(code[1:]) <= 33:
-                    name = getattr(item, 'name', 'Unknown Rune')
+                    name = item["name"] or 'Unknown Rune'
                     total_rune_inventory[name][char_name] += 1
     return total_rune_inventory
 
@@ -117,8 +95,11 @@ def generate_json_report(inventory: Dict[str, Dict[str, int]], output_path: str)
     
     # 3. Записване на JSON файла
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
+        # tmp файл + os.replace, за да не се чете наполовина записан JSON
+        tmp_path = output_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump(json_data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, output_path)
         print(f"\n[+] Успешно генериран JSON файл:")
         print(f"    Път: {output_path}")
         print(f"    Общ брой рунически видове: {len(json_data)}")
@@ -126,8 +107,9 @@ def generate_json_report(inventory: Dict[str, Dict[str, int]], output_path: str)
         print(f"[!!!] ГРЕШКА при записване на JSON: {e}")
 
 if __name__ == "__main__":
-    # 1. Изпълнение на сканирането
-    all_rune_data = gather_all_runes_detailed(CHAR_SAVE_DIR)
+    # 1. Изпълнение на сканирането (snapshot-ът се строи само ако липсва)
+    snapshot = char_snapshot.load_or_build_snapshot(SNAPSHOT_FILE)
+    all_rune_data = gather_all_runes_detailed(snapshot)
     
     # 2. Генериране на JSON
     generate_json_report(all_rune_data, OUTPUT_JSON_PATH)
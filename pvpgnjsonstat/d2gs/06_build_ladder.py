@@ -1,13 +1,46 @@
 #!/usr/bin/env python3
+"""
+Ladder -> webladder.html + ladder_<type>.json (типове 27-34).
+
+Източникът е бинарният ladder на d2dbs (ladder.D2DV, чете се с
+python-tools/d2gs-py/d2ladder_dat.py) - той е винаги актуален и се
+декодира много по-бързо. Ако го няма (или с --xml) - d2ladder.xml.
+
+Скриптът се пуска на всеки cron цикъл, а ladder-ът се сменя рядко. Затова:
+  - ако mtime/размерът на източника са същите като при последното
+    генериране (cache/ladder_state.json) и изходите ги има - нищо не се прави;
+  - ако mtime е сменен, но sha1 на съдържанието е същият - само се
+    обновява state-ът;
+  - иначе източникът се чете веднъж (XML-ът поточно с iterparse), HTML-ът
+    се събира в списък и се пише наведнъж, а за всеки тип 27-34 се пише
+    компактен JSON (колони + редове), който ladder.js страницира в браузъра.
+
+    python3 06_build_ladder.py [--force] [--xml]
+"""
+import os
+import sys
+import json
+import hashlib
 import xml.etree.ElementTree as ET
+from datetime import datetime
+
+# Бинарният ladder на d2dbs
+D2GS_PY_DIR = "/home/support/scripts-tools/d2cpp/python-tools/d2gs-py"
+sys.path.insert(0, D2GS_PY_DIR)
+from d2ladder_dat import LADDER_DAT_FILE, iter_ladder_dat
 
 XML_FILE = "/usr/local/pvpgn/var/pvpgn/ladders/d2ladder.xml"
 HTML_FILE = "/var/www/html/pvpjsonstat/webladder.html"
+# ladder_27.json ... ladder_34.json
+LADDER_JSON_DIR = "/var/www/html/pvpjsonstat/jsons"
+STATE_FILE = "/home/support/scripts-tools/d2cpp/pvpgnjsonstat/d2gs/cache/ladder_state.json"
+STATE_VERSION = 1
 
-tree = ET.parse(XML_FILE)
-root = tree.getroot()
+LADDER_TYPES = range(27, 35)
+CHAR_COLUMNS = ["rank", "name", "level", "experience", "class", "prefix", "status"]
+INT_COLUMNS = {"rank", "level", "experience"}
 
-html = """
+HTML_HEAD = """
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -63,43 +96,157 @@ tr:hover {
 <body>
 <h1>DarkPsy Ladder</h1>
 """
+TABLE_HEADER = "<tr><th>Rank</th><th>Name</th><th>Level</th><th>Experience</th><th>Class</th><th>Prefix</th><th>Status</th></tr>"
+
+
+def iter_ladders(path):
+    """(ladder, chars) за всяка <ladder> по реда във файла; ladder/chars са { таг: текст }."""
+    ladder, chars, char = {}, [], None
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == "ladder":
+                ladder, chars = {}, []
+            elif tag == "char":
+                char = {}
+            continue
 
-def get_text(elem, tag):
-    child = elem.find(tag)
-    if child is not None and child.text is not None:
-        return child.text.strip()
-    return ""
+        if tag == "char":
+            chars.append(char)
+            char = None
+            elem.clear()
+        elif tag == "ladder":
+            yield ladder, chars
+            elem.clear()
+        else:
+            # <class> е и на ladder-а, и на героя - първият таг печели (като find)
+            target = char if char is not None else ladder
+            target.setdefault(tag, (elem.text or "").strip())
 
-for ladder in root.findall('ladder'):
-    ladder_type = get_text(ladder, 'type')
 
-    # Only include ladder types 27-34
+def ladder_type(ladder):
     try:
-        if not (27 <= int(ladder_type) <= 34):
-            continue
+        return int(ladder.get("type", ""))
     except ValueError:
-        continue
+        return None
+
 
-    ladder_mode = get_text(ladder, 'mode')
+def file_signature(path):
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_state():
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if state.get("version") == STATE_VERSION else {}
 
-    html += "<table>"
-    html += "<tr><th>Rank</th><th>Name</th><th>Level</th><th>Experience</th><th>Class</th><th>Prefix</th><th>Status</th></tr>"
 
-    for char in ladder.findall('char'):
-        rank = get_text(char, 'rank')
-        name = get_text(char, 'name')
-        level = get_text(char, 'level')
-        experience = get_text(char, 'experience')
-        char_class = get_text(char, 'class')
-        prefix = get_text(char, 'prefix')
-        status = get_text(char, 'status')
+def write_atomic(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
 
-        html += f"<tr><td>{rank}</td><td>{name}</td><td>{level}</td><td>{experience}</td><td>{char_class}</td><td>{prefix}</td><td>{status}</td></tr>"
 
-    html += "</table>"
-html += "</body></html>"
+def json_path(type_id):
+    return os.path.join(LADDER_JSON_DIR, f"ladder_{type_id}.json")
 
-with open(HTML_FILE, "w") as f:
-    f.write(html)
 
-print(f"[+] Webstat generated: {HTML_FILE}")
+def outputs_exist():
+    return os.path.exists(HTML_FILE) and all(os.path.exists(json_path(t)) for t in LADDER_TYPES)
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def build_ladder(source):
+    """Един проход по източника: HTML-ът и JSON-ите за типовете 27-34."""
+    html = [HTML_HEAD]
+    ladders = {}
+    generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    records = iter_ladder_dat(source) if source == LADDER_DAT_FILE else iter_ladders(source)
+
+    for ladder, chars in records:
+        type_id = ladder_type(ladder)
+        if type_id not in LADDER_TYPES:
+            continue
+
+        html.append("<table>")
+        html.append(TABLE_HEADER)
+        rows = []
+        for char in chars:
+            values = [char.get(col, "") for col in CHAR_COLUMNS]
+            html.append("<tr>" + "".join(f"<td>{v}</td>" for v in values) + "</tr>")
+            rows.append([to_int(v) if col in INT_COLUMNS else v for col, v in zip(CHAR_COLUMNS, values)])
+        html.append("</table>")
+
+        ladders[type_id] = {
+            "type": type_id,
+            "mode": ladder.get("mode", ""),
+            "class": ladder.get("class", ""),
+            "generated_at": generated_at,
+            "columns": CHAR_COLUMNS,
+            "chars": rows,
+        }
+    html.append("</body></html>")
+
+    write_atomic(HTML_FILE, "".join(html))
+    for type_id in LADDER_TYPES:
+        data = ladders.get(type_id) or {"type": type_id, "mode": "", "class": "", "generated_at": generated_at,
+                                        "columns": CHAR_COLUMNS, "chars": []}
+        write_atomic(json_path(type_id), json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    return ladders
+
+
+def main():
+    args = sys.argv[1:]
+    force = "--force" in args
+    source = XML_FILE if "--xml" in args or not os.path.exists(LADDER_DAT_FILE) else LADDER_DAT_FILE
+    try:
+        signature = file_signature(source)
+    except OSError as e:
+        print(f"[!] Cannot stat {source}: {e}")
+        return 1
+
+    state = load_state()
+    fresh = not force and outputs_exist() and state.get("source") == source
+    if fresh and state.get("signature") == signature:
+        print(f"[*] {source} unchanged, ladder not rebuilt")
+        return 0
+
+    sha1 = file_sha1(source)
+    if fresh and state.get("sha1") == sha1:
+        print(f"[*] {source} touched but content unchanged, ladder not rebuilt")
+    else:
+        try:
+            ladders = build_ladder(source)
+        except ValueError as e:
+            print(f"[!] Cannot read {source}: {e}")
+            return 1
+        print(f"[+] Webstat generated: {HTML_FILE} (from {source})")
+        print(f"[+] Ladder JSON ({len(ladders)} types with data) in {LADDER_JSON_DIR}")
+
+    write_atomic(STATE_FILE, json.dumps({"version": STATE_VERSION, "source": source,
+                                         "signature": signature, "sha1": sha1}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
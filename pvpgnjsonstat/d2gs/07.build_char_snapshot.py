@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Стъпка "snapshot": декодира charsave веднъж на цикъл (само променените файлове)
+в cache/char_snapshot.bin. Следващите стъпки (07.generate_items_json.py,
+06.generate_rune_json.py) рендерират своите JSON-и от него.
+"""
+import argparse
+
+import char_snapshot
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode PvPGN charsaves once into a shared character snapshot.")
+    parser.add_argument("--char-dir", default=char_snapshot.CHAR_DIR, help="charsave directory")
+    parser.add_argument("--output", default=char_snapshot.SNAPSHOT_FILE, help="snapshot file to (re)write")
+    parser.add_argument("--workers", type=int, default=1, metavar="N", help="decode changed saves in N parallel processes (default: 1)")
+    parser.add_argument("--no-cache", action="store_true", help="ignore the previous snapshot and re-decode every save")
+    args = parser.parse_args()
+
+    print(f"[*] Building character snapshot from {args.char_dir}...")
+    char_snapshot.build_snapshot(args.char_dir, args.output, workers=args.workers, use_cache=not args.no_cache)
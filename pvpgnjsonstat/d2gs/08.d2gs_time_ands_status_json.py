@@ -1,14 +1,27 @@
-import telnetlib
 import re
+import sys
 import json
 import os
+import asyncio
 from datetime import datetime
 
+# Общият клиент за D2GS конзолата (asyncio, без telnetlib)
+D2GS_PY_DIR = "/home/support/scripts-tools/d2cpp/python-tools/d2gs-py"
+sys.path.insert(0, D2GS_PY_DIR)
+from d2gs_console import poll_servers
+
 # --- КОНФИГУРАЦИЯ ---
 HOST = "192.168.88.41"
 PORT = 8888
 PASSWORD = "abcd123"
 
+# Всички D2GS на realm-а (питат се едновременно). Първият е основният -
+# от него са d2gs_uptime.txt / d2gs_uptime_data.json / d2gs_status_data.json.
+SERVERS = [
+    {"name": "d2gs", "host": HOST, "port": PORT, "password": PASSWORD},
+]
+POLL_TIMEOUT = 15  # секунди за uptime + status от един сървър
+
 # Абсолютен път за Уеб данни
 WEB_DATA_DIR = "/var/www/html/pvpjsonstat/jsons/" 
 # Локална директория за Логове (до скрипта)
@@ -51,10 +64,10 @@ def parse_memory_usage(pattern, text):
     return {"used_mb": 0.0, "total_mb": 0.0}
 
 # --- Функция за Логване на Сурови Данни (Остава същата) ---
-def log_raw_data(uptime_raw, status_raw):
+def log_raw_data(uptime_raw, status_raw, server_name="d2gs"):
     """Saves the raw output from Telnet commands to a log file."""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_filename = f"raw_data_{timestamp}.log"
+    log_filename = f"raw_data_{server_name}_{timestamp}.log"
     file_path = os.path.join(LOGS_DIR, log_filename)
     
     try:
@@ -71,43 +84,20 @@ def log_raw_data(uptime_raw, status_raw):
 
 # --- Основна функция за парсване (КОРИГИРАНА) ---
 
-def parse_server_status():
+async def fetch_raw(console):
+    """uptime + status по една сесия (двете команди се пращат наведнъж)."""
+    uptime_raw, status_raw = await console.run_many(["uptime", "status"])
+    return {"uptime_raw": uptime_raw, "status_raw": status_raw}
+
+
+def parse_server_status(uptime_raw, status_raw, server_name="d2gs"):
     
-    uptime_raw = ""
-    status_raw = ""
     results = {"status": "error", "message": "", "data": {}}
 
     try:
-        tn = telnetlib.Telnet(HOST, PORT, timeout=5) 
-        
-        # 1. Изчакване на съобщението за добре дошли или първия промпт.
-        # Този ред ще чете, докато стигне "pass:" (за парола) или "D2GS>" (за промпт).
-        # Ако сървърът първо изпраща банер, този read_until ще го прочете.
-        # Увеличаваме таймаута за първата комуникация.
-        tn.read_until(b"pass:", timeout=5) 
-        
-        # 2. Изпращане на паролата
-        tn.write(PASSWORD.encode('ascii') + b"\n")
-        
-        # 3. Изчакване на промпта D2GS> след влизане.
-        # Ако паролата е успешна, трябва да стигнем до промпта.
-        # Добавяме кратък таймаут за по-голяма сигурност, че промптът е наличен.
-        tn.read_until(b"D2GS>", timeout=2)
-
-        # 4. Изпълнение на 'uptime'
-        tn.write(b"uptime\n")
-        # Прочитане на изхода до следващия промпт 'D2GS>'
-        uptime_raw = tn.read_until(b"D2GS>", timeout=3).decode('ascii')
-        
-        # 5. Изпълнение на 'status'
-        tn.write(b"status\n")
-        status_raw = tn.read_until(b"D2GS>", timeout=4).decode('ascii') 
-        
-        tn.close()
-        
         if not status_raw or not uptime_raw:
              results["message"] = "Partial or no response received from server after commands."
-             log_raw_data(uptime_raw, status_raw)
+             log_raw_data(uptime_raw, status_raw, server_name)
              return {"status": "error", "message": results["message"], "uptime_data": {}, "status_data": {}}
         
         # ... (Парсване на данни - както преди) ...
@@ -168,7 +158,7 @@ def parse_server_status():
         # (Пропуснати са network_statistics за краткост, но трябва да останат във вашия файл)
 
         # Запис на суровите данни в лога
-        log_raw_data(uptime_raw, status_raw)
+        log_raw_data(uptime_raw, status_raw, server_name)
         
         return {
             "status": "success", 
@@ -178,9 +168,8 @@ def parse_server_status():
         }
 
     except Exception as e:
-        results["message"] = f"Critical error during Telnet session: {e}"
-        # Логваме, дори ако сесията е прекъсната
-        log_raw_data(uptime_raw, status_raw) 
+        results["message"] = f"Critical error while parsing server output: {e}"
+        log_raw_data(uptime_raw, status_raw, server_name)
         return {"status": "error", "message": results["message"], "uptime_data": {}, "status_data": {}}
 
 
@@ -232,8 +221,36 @@ def save_parsed_data(parsed_data):
         
     print("--- File processing complete ---")
 
+def save_servers_data(parsed_by_server):
+    """При няколко D2GS: един общ JSON { server_name: {uptime_data, status_data} }."""
+    servers_json_path = os.path.join(WEB_DATA_DIR, "d2gs_servers_status.json")
+    try:
+        os.makedirs(WEB_DATA_DIR, exist_ok=True)
+        with open(servers_json_path, 'w', encoding='utf-8') as f:
+            json.dump(parsed_by_server, f, indent=4)
+        print(f"[SUCCESS] Multi-server JSON saved to: {servers_json_path}")
+    except OSError as e:
+        print(f"[ERROR] Could not write multi-server JSON file: {e}")
+
+
+def poll_all_servers():
+    """Пита всички SERVERS едновременно; времето е колкото на най-бавния."""
+    raw_results = asyncio.run(poll_servers(SERVERS, fetch_raw, timeout=POLL_TIMEOUT))
+    parsed = {}
+    for name, raw in raw_results.items():
+        if "error" in raw:
+            log_raw_data("", "", name)
+            parsed[name] = {"status": "error", "message": f"Critical error during Telnet session: {raw['error']}",
+                            "uptime_data": {}, "status_data": {}}
+        else:
+            parsed[name] = parse_server_status(raw["uptime_raw"], raw["status_raw"], name)
+    return parsed
+
+
 # --- Изпълнение ---
 if __name__ == "__main__":
     
-    parsed_data = parse_server_status()
-    save_parsed_data(parsed_data)
+    parsed_by_server = poll_all_servers()
+    save_parsed_data(parsed_by_server[SERVERS[0]["name"]])
+    if len(SERVERS) > 1:
+        save_servers_data(parsed_by_server)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Демон за живо преиндексиране на charsave/charinfo (вместо пълно сканиране от cron).
+
+Абонира се с inotify за IN_CLOSE_WRITE / IN_MOVED_TO (и изтриване/преместване)
+в charsave и в акаунт-директориите на charinfo. Събитията от едно записване на
+d2dbs идват на серии, затова се събират (debounce) и се обработват наведнъж:
+  1. декодират се само засегнатите герои (char_snapshot.refresh_characters),
+  2. при промени в charinfo се обновява индексът герой -> акаунт,
+  3. snapshot-ът се записва атомарно,
+  4. пускат се рендерите (07.generate_items_json.py, 06.generate_rune_json.py),
+     които презаписват (атомарно) само остарелите JSON файлове.
+
+Пускане (напр. от systemd или nohup):
+    python3 09.charsave_watcher.py [--debounce 2] [--max-delay 10]
+При работещ демон стъпките snapshot/07/06 в 00.start.sh не са нужни.
+"""
+import os
+import sys
+import time
+import errno
+import select
+import signal
+import struct
+import argparse
+import ctypes
+import ctypes.util
+import subprocess
+from typing import Dict, Set
+
+import char_snapshot
+
+# === Configuration ===
+CHAR_DIR = char_snapshot.CHAR_DIR
+CHARINFO_DIR = char_snapshot.CHARINFO_DIR
+SNAPSHOT_FILE = char_snapshot.SNAPSHOT_FILE
+WORKDIR = os.path.dirname(os.path.abspath(__file__))
+RENDER_SCRIPTS = [
+    os.path.join(WORKDIR, "07.generate_items_json.py"),
+    os.path.join(WORKDIR, "06.generate_rune_json.py"),
+]
+DEBOUNCE_SECONDS = 2.0   # тишина след последното събитие
+MAX_DELAY_SECONDS = 10.0  # но не повече от толкова след първото
+
+# --- inotify (linux/inotify.h) ---
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = os.O_CLOEXEC
+
+FILE_EVENTS = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+CHARINFO_TOP_EVENTS = IN_CREATE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class Inotify:
+    """Минимална обвивка на inotify през ctypes (без външни модули)."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1: {os.strerror(err)}")
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch({path}): {os.strerror(err)}")
+        return wd
+
+    def read_events(self):
+        """Връща списък (wd, mask, name) от всичко налично в буфера."""
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EINTR):
+                return []
+            raise
+        events = []
+        pos = 0
+        while pos + EVENT_HEADER.size <= len(buf):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(buf, pos)
+            pos += EVENT_HEADER.size
+            name = os.fsdecode(buf[pos:pos + length].rstrip(b"\0"))
+            pos += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class CharsaveWatcher:
+    def __init__(self, debounce: float, max_delay: float, workers: int):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.workers = workers
+        self.inotify = Inotify()
+        self.charsave_wd = self.inotify.add_watch(CHAR_DIR, FILE_EVENTS)
+        self.charinfo_wd = self.inotify.add_watch(CHARINFO_DIR, CHARINFO_TOP_EVENTS)
+        self.account_wds: Dict[int, str] = {}
+        for entry in os.scandir(CHARINFO_DIR):
+            if entry.is_dir():
+                self._watch_account(entry.name)
+
+        self.pending_chars: Set[str] = set()
+        self.pending_accounts = False
+        self.full_rescan = False
+        self.first_event = 0.0
+        self.last_event = 0.0
+
+    def _watch_account(self, account: str) -> None:
+        try:
+            wd = self.inotify.add_watch(os.path.join(CHARINFO_DIR, account), FILE_EVENTS | IN_DELETE_SELF)
+            self.account_wds[wd] = account
+        except OSError as e:
+            print(f"[!] Cannot watch charinfo/{account}: {e}")
+
+    # --- събиране на събития ---
+    def _handle(self, wd: int, mask: int, name: str) -> None:
+        if mask & IN_Q_OVERFLOW:
+            print("[!] inotify queue overflow, scheduling a full rescan.")
+            self.full_rescan = True
+            self.pending_accounts = True
+        elif mask & IN_IGNORED:
+            self.account_wds.pop(wd, None)
+            return
+        elif wd == self.charsave_wd:
+            if name and not mask & IN_ISDIR:
+                self.pending_chars.add(name)
+        elif wd == self.charinfo_wd:
+            # нов/изтрит акаунт
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch_account(name)
+            self.pending_accounts = True
+        elif wd in self.account_wds:
+            self.pending_accounts = True
+        else:
+            return
+
+        now = time.monotonic()
+        if not self.first_event:
+            self.first_event = now
+        self.last_event = now
+
+    def _has_pending(self) -> bool:
+        return bool(self.pending_chars or self.pending_accounts or self.full_rescan)
+
+    def _timeout(self):
+        if not self._has_pending():
+            return None
+        deadline = min(self.last_event + self.debounce, self.first_event + self.max_delay)
+        return max(0.0, deadline - time.monotonic())
+
+    # --- обработка на серия ---
+    def _flush(self, snapshot) -> None:
+        started = time.monotonic()
+        if self.full_rescan:
+            snapshot.update(char_snapshot.build_snapshot(CHAR_DIR, SNAPSHOT_FILE, workers=self.workers))
+            changed = len(snapshot["characters"])
+        else:
+            changed = char_snapshot.refresh_characters(snapshot, self.pending_chars, CHAR_DIR, self.workers)
+            if self.pending_accounts:
+                changed += char_snapshot.refresh_accounts(snapshot)
+            if changed:
+                char_snapshot.save_snapshot(snapshot, SNAPSHOT_FILE)
+
+        touched = len(self.pending_chars)
+        self.pending_chars.clear()
+        self.pending_accounts = False
+        self.full_rescan = False
+        self.first_event = self.last_event = 0.0
+
+        if changed:
+            render()
+        print(f"[*] Batch: {touched} touched save(s), {changed} changed record(s), {time.monotonic() - started:.2f}s")
+
+    def run(self) -> None:
+        # Настигаме всичко пропуснато, докато демонът не е работил.
+        snapshot = char_snapshot.build_snapshot(CHAR_DIR, SNAPSHOT_FILE, workers=self.workers)
+        render()
+        print(f"[+] Watching {CHAR_DIR} and {CHARINFO_DIR} ({len(self.account_wds)} accounts)...")
+
+        while True:
+            try:
+                ready, _, _ = select.select([self.inotify.fd], [], [], self._timeout())
+            except InterruptedError:
+                continue
+            if ready:
+                for wd, mask, name in self.inotify.read_events():
+                    self._handle(wd, mask, name)
+            elif self._has_pending():
+                self._flush(snapshot)
+
+
+def render() -> None:
+    """Пуска рендерите; те четат новия snapshot и пишат атомарно."""
+    for script in RENDER_SCRIPTS:
+        result = subprocess.run([sys.executable, script], stdout=subprocess.DEVNULL)
+        if result.returncode != 0:
+            print(f"[!] {os.path.basename(script)} exited with {result.returncode}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Watch charsave/charinfo with inotify and re-render only changed characters.")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS, help="seconds of quiet before a batch is processed")
+    parser.add_argument("--max-delay", type=float, default=MAX_DELAY_SECONDS, help="max seconds a batch may wait during constant saving")
+    parser.add_argument("--workers", type=int, default=1, metavar="N", help="parallel decoders for large batches")
+    args = parser.parse_args()
+
+    # SIGTERM (systemd stop) -> нормален изход
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        CharsaveWatcher(args.debounce, args.max_delay, args.workers).run()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Общ "snapshot" на всички герои от charsave.
+
+Всеки D2S файл се декодира с D2SFile само веднъж на цикъл и се записва в
+нормализиран вид (статистики, акаунт, предмети, поставени в гнезда предмети).
+07.generate_items_json.py, 06.generate_rune_json.py, z1.weball_new.py и
+04.findruneword.py четат snapshot-а, вместо всеки от тях да декодира
+цялата директория наново.
+
+Snapshot-ът е и кеш: при следващото построяване файловете с непроменени
+mtime/size (или sha1) се вземат наготово и се декодират само променените.
+
+На диска е в компактен двоичен вид (snapshot_store.py): load_snapshot()
+връща всички герои, а open_snapshot() дава SnapshotReader за лениво
+зареждане на отделен герой по отместване.
+
+Формат на запис за герой:
+    {
+      "charfile": "sorsi", "charname": "sorsi", "account": "zgan",
+      "stats": {"level": 85, "class": "Sorceress", ...},
+      "items": [{"name", "code", "is_unique", "is_set", "is_rune", "rune_id",
+                 "is_socketed", "is_in_stash", "properties", "socketed"?}, ...],
+      "fingerprint": {"mtime_ns", "size", "sha1"},
+      "decoded": "YYYY-mm-dd HH:MM:SS", "decoded_at": <epoch>
+    }
+"""
+import os
+import sys
+import glob
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+from charinfo_index import build_account_index
+from snapshot_store import SnapshotReader, write_snapshot
+
+# === Configuration ===
+CHAR_DIR = "/usr/local/pvpgn/var/pvpgn/charsave"
+CHARINFO_DIR = "/usr/local/pvpgn/var/pvpgn/charinfo"
+# КЛЮЧОВИЯТ ПЪТ КЪМ TXT ФАЙЛОВЕТЕ
+D2_DATA_DIR = "/home/support/scripts-tools/d2cpp/pvpgnjsonstat/d2gs/items/"
+# НЕ е в logs/, защото 00.start.sh го чисти всеки път
+CACHE_DIR = "/home/support/scripts-tools/d2cpp/pvpgnjsonstat/d2gs/cache"
+SNAPSHOT_FILE = os.path.join(CACHE_DIR, "char_snapshot.bin")
+CHARINFO_INDEX_FILE = os.path.join(CACHE_DIR, "charinfo_index.json")
+
+_D2SFile = None
+
+# Индекс герой -> акаунт; строи се в build_snapshot() преди fork-а на работниците
+ACCOUNT_INDEX: Dict[str, str] = {}
+
+
+# =======================================================
+# --- АГРЕСИВНО ЗАРЕЖДАНЕ НА D2LIB ДАННИТЕ ---
+# =======================================================
+
+def load_d2lib():
+    """
+    Импортира D2SFile (само при нужда - четенето на snapshot-а не иска d2lib)
+    и опитва всички известни методи за зареждане на D2 data files.
+    """
+    global _D2SFile
+    if _D2SFile is not None:
+        return _D2SFile
+
+    # 1. Задаваме променлива на средата (Environment Variable)
+    os.environ['D2_DATA_PATH'] = D2_DATA_DIR
+    print(f"[*] Set environment variable D2_DATA_PATH to: {D2_DATA_DIR}")
+
+    # 2. Сега импортираме D2SFile (след като сме задали Env Var)
+    try:
+        from d2lib.files import D2SFile
+        print("[+] D2SFile imported successfully.")
+    except ImportError:
+        print("[!!!] ERROR: Failed to import d2lib.files.D2SFile. Is the d2lib installed?")
+        sys.exit(1)
+
+    loaded = False
+    try:
+        # Опит 1: По-старият метод
+        D2SFile.set_data_path(D2_DATA_DIR)
+        loaded = True
+        print("[+] SUCCESS: Data loaded via D2SFile.set_data_path.")
+    except AttributeError:
+        pass
+    except Exception as e:
+        print(f"[-] D2SFile.set_data_path failed: {e}")
+
+    if not loaded and hasattr(D2SFile, 'load_data_files'):
+        try:
+            # Опит 2: Модерният метод
+            D2SFile.load_data_files(D2_DATA_DIR)
+            loaded = True
+            print("[+] SUCCESS: Data loaded via D2SFile.load_data_files.")
+        except Exception as e:
+            print(f"[-] D2SFile.load_data_files failed: {e}")
+
+    if not loaded:
+        print("[!!!] WARNING: Explicit D2 data loading failed. Relying on Environment Variable.")
+
+    _D2SFile = D2SFile
+    return _D2SFile
+
+
+# =======================================================
+# --- НОРМАЛИЗИРАНЕ НА ЕДИН ГЕРОЙ ---
+# =======================================================
+
+def _normalize_item(item: Any) -> Dict[str, Any]:
+    """Плосък, picklable/JSON речник с всичко, което репортите ползват от предмета."""
+    rec = {
+        "name": getattr(item, "name", "") or "",
+        "code": getattr(item, "code", "") or "",
+        "is_unique": bool(getattr(item, "is_unique", False)),
+        "is_set": bool(getattr(item, "is_set", False)),
+        "is_rune": bool(getattr(item, "is_rune", False)),
+        "rune_id": getattr(item, "rune_id", None),
+        "is_socketed": bool(getattr(item, "is_socketed", False)),
+        "is_in_stash": bool(getattr(item, "is_in_stash", False)),
+        "properties": list(getattr(item, "magic_attrs", None) or []),
+    }
+    socketed = getattr(item, "socketed_items", None)
+    if socketed:
+        try:
+            rec["socketed"] = [_normalize_item(s) for s in socketed]
+        except Exception:
+            pass
+    return rec
+
+
+def decode_character(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Декодира един D2S файл в нормализиран запис (без fingerprint).
+    Връща None, ако файлът не може да бъде прочетен.
+    """
+    D2SFile = load_d2lib()
+    try:
+        d2s = D2SFile(path)
+    except Exception:
+        print(f"[!] Skipping unreadable file: {os.path.basename(path)}")
+        return None
+
+    char_fname = os.path.basename(path)
+    char_name = getattr(d2s, "char_name", None) or char_fname
+
+    stats = {
+        "level": getattr(d2s, "char_level", 0),
+        "class": getattr(d2s, "char_class", "N/A"),
+        "is_hc": getattr(d2s, "is_hardcore", False),
+        "is_ladder": getattr(d2s, "is_ladder", False),
+        "progression": getattr(d2s, "progression", None),
+        "char_name_raw": char_name
+    }
+    stats.update(getattr(d2s, "attributes", {}) or {})
+
+    all_items = list(getattr(d2s, "items", []))
+    stash_items = getattr(d2s, "stash", None)
+    if stash_items:
+        try:
+            all_items.extend(list(stash_items))
+        except Exception:
+            pass
+
+    now = time.time()
+    return {
+        "charfile": char_fname,
+        "charname": char_name,
+        "account": ACCOUNT_INDEX.get(char_fname, "Unknown"),
+        "stats": stats,
+        "items": [_normalize_item(it) for it in all_items],
+        "decoded": datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S"),
+        "decoded_at": now,
+    }
+
+
+# =======================================================
+# --- ОТПЕЧАТЪЦИ (mtime / size / sha1) ---
+# =======================================================
+
+def file_sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _reuse_record(path: str, st: os.stat_result, record: Optional[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Връща (record, sha1). record е старият запис, ако файлът не е променян.
+    1. mtime + size съвпадат -> файлът дори не се отваря.
+    2. иначе сравняваме sha1 (напр. d2dbs е презаписал същото съдържание).
+    """
+    fp = record.get("fingerprint", {}) if record else {}
+    if fp and fp.get("mtime_ns") == st.st_mtime_ns and fp.get("size") == st.st_size:
+        return record, fp.get("sha1")
+    try:
+        digest = file_sha1(path)
+    except OSError:
+        return None, None
+    if fp and fp.get("sha1") == digest:
+        fp["mtime_ns"] = st.st_mtime_ns
+        fp["size"] = st.st_size
+        return record, digest
+    return None, digest
+
+
+def decode_charsaves(paths: List[str], workers: int = 1) -> List[Optional[Dict[str, Any]]]:
+    """
+    Декодира списък от D2S файлове. При workers > 1 ги разпределя в process pool;
+    pool.map пази реда на входа, така че резултатът е същият като при серийното сканиране.
+    """
+    if workers <= 1 or len(paths) <= 1:
+        return [decode_character(p) for p in paths]
+
+    # d2lib се зарежда в родителя; fork-натите деца го наследяват заедно с ACCOUNT_INDEX
+    load_d2lib()
+    ctx = multiprocessing.get_context("fork")
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        return list(pool.map(decode_character, paths, chunksize=chunksize))
+
+
+# =======================================================
+# --- ЗАПИС / ЧЕТЕНЕ НА SNAPSHOT-А ---
+# =======================================================
+
+def open_snapshot(snapshot_path: str = SNAPSHOT_FILE) -> SnapshotReader:
+    """Лениво четене: SnapshotReader.load('charfile') декодира само този герой."""
+    return SnapshotReader(snapshot_path)
+
+
+def load_snapshot(snapshot_path: str = SNAPSHOT_FILE) -> Optional[Dict[str, Any]]:
+    """
+    Връща целия snapshot като {"generated", "char_dir", "characters": [...]}
+    или None, ако липсва, повреден е или е от друга версия на формата.
+    """
+    try:
+        with SnapshotReader(snapshot_path) as snap:
+            return {
+                "generated": snap.generated,
+                "char_dir": snap.char_dir,
+                "characters": list(snap),
+            }
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[!] Ignoring unreadable snapshot {snapshot_path}: {e}")
+        return None
+
+
+def save_snapshot(snapshot: Dict[str, Any], snapshot_path: str = SNAPSHOT_FILE) -> None:
+    """Записва snapshot-а в двоичния формат (атомарно)."""
+    write_snapshot(snapshot, snapshot_path)
+
+
+def build_snapshot(char_dir: str = CHAR_DIR, snapshot_path: str = SNAPSHOT_FILE,
+                   workers: int = 1, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Построява (инкрементално) snapshot-а на charsave и го записва.
+    Записите са подредени по пътя на файла.
+    """
+    old_snapshot = load_snapshot(snapshot_path) if use_cache else None
+    old_records: Dict[str, Dict[str, Any]] = {}
+    if old_snapshot and old_snapshot.get("char_dir") == char_dir:
+        old_records = {r["charfile"]: r for r in old_snapshot.get("characters", [])}
+
+    # --- 1. Проверка на отпечатъците: кои файлове са променени ---
+    records: Dict[str, Optional[Dict[str, Any]]] = {}
+    dirty: List[Tuple[str, os.stat_result, Optional[str]]] = []
+    paths = sorted(glob.glob(os.path.join(char_dir, "*")))
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if not os.path.isfile(path):
+            continue
+        record, digest = _reuse_record(path, st, old_records.get(os.path.basename(path)))
+        records[path] = record
+        if record is None:
+            dirty.append((path, st, digest))
+
+    # --- 2. Декодиране само на променените (серийно или паралелно) ---
+    # индексът се строи всяко пускане (и без променени saves): акаунтът на
+    # непроменен герой също може да е сменен в charinfo - виж стъпка 4
+    ACCOUNT_INDEX.clear()
+    ACCOUNT_INDEX.update(build_account_index(CHARINFO_DIR, CHARINFO_INDEX_FILE))
+    decoded = decode_charsaves([d[0] for d in dirty], workers)
+    for (path, st, digest), record in zip(dirty, decoded):
+        if record is None:
+            continue
+        record["fingerprint"] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha1": digest}
+        records[path] = record
+
+    # --- 3. Сглобяване в сортиран ред на пътищата ---
+    characters = [records[p] for p in paths if records.get(p) is not None]
+    n_decoded = sum(1 for r in decoded if r is not None)
+    print(f"[*] Snapshot: decoded {n_decoded} changed save(s), {len(characters) - n_decoded} reused.")
+
+    snapshot = {
+        "generated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "char_dir": char_dir,
+        "characters": characters,
+    }
+
+    # --- 4. Акаунтите на преизползваните записи - по актуалния charinfo ---
+    moved = refresh_accounts(snapshot, rebuild_index=False)
+    if moved:
+        print(f"[*] Snapshot: account changed for {moved} character(s).")
+    try:
+        save_snapshot(snapshot, snapshot_path)
+        print(f"[+] Snapshot written: {snapshot_path} ({len(characters)} characters)")
+    except Exception as e:
+        print(f"[!] Failed to write snapshot {snapshot_path}: {e}")
+    return snapshot
+
+
+def refresh_characters(snapshot: Dict[str, Any], charfiles, char_dir: str = CHAR_DIR, workers: int = 1) -> int:
+    """
+    Обновява в паметта само изброените герои (напр. след inotify събития),
+    без да обхожда цялата директория. Изтритите файлове отпадат от snapshot-а.
+    Връща броя на реално променените записи.
+    """
+    records = {r["charfile"]: r for r in snapshot["characters"]}
+    changed = 0
+    dirty: List[Tuple[str, os.stat_result, Optional[str]]] = []
+    for charfile in sorted(set(charfiles)):
+        path = os.path.join(char_dir, charfile)
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is None or not os.path.isfile(path):
+            if records.pop(charfile, None) is not None:
+                changed += 1
+            continue
+        record, digest = _reuse_record(path, st, records.get(charfile))
+        if record is None:
+            dirty.append((path, st, digest))
+
+    if dirty:
+        ACCOUNT_INDEX.clear()
+        ACCOUNT_INDEX.update(build_account_index(CHARINFO_DIR, CHARINFO_INDEX_FILE))
+    decoded = decode_charsaves([d[0] for d in dirty], workers)
+    for (path, st, digest), record in zip(dirty, decoded):
+        charfile = os.path.basename(path)
+        if record is None:
+            # недочетен/невалиден файл (напр. временен файл на d2dbs)
+            if records.pop(charfile, None) is not None:
+                changed += 1
+            continue
+        record["fingerprint"] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha1": digest}
+        records[charfile] = record
+        changed += 1
+
+    snapshot["characters"] = [records[k] for k in sorted(records)]
+    snapshot["generated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return changed
+
+
+def refresh_accounts(snapshot: Dict[str, Any], rebuild_index: bool = True) -> int:
+    """
+    Преизгражда индекса герой -> акаунт (само променените акаунт-директории;
+    rebuild_index=False - ползва вече построения ACCOUNT_INDEX)
+    и обновява полето account. Промененият запис получава нов decoded_at,
+    за да си презапишат рендерите индивидуалния JSON. Връща броя променени.
+    """
+    if rebuild_index:
+        ACCOUNT_INDEX.clear()
+        ACCOUNT_INDEX.update(build_account_index(CHARINFO_DIR, CHARINFO_INDEX_FILE))
+    now = time.time()
+    changed = 0
+    for record in snapshot["characters"]:
+        account = ACCOUNT_INDEX.get(record["charfile"], "Unknown")
+        if record["account"] != account:
+            record["account"] = account
+            record["decoded"] = datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S")
+            record["decoded_at"] = now
+            changed += 1
+    if changed:
+        snapshot["generated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return changed
+
+
+def load_or_build_snapshot(snapshot_path: str = SNAPSHOT_FILE, workers: int = 1) -> Dict[str, Any]:
+    """За скриптовете-консуматори: чете snapshot-а, а ако липсва - построява го."""
+    snapshot = load_snapshot(snapshot_path)
+    if snapshot is None:
+        print(f"[*] No usable snapshot at {snapshot_path}, building it now...")
+        snapshot = build_snapshot(CHAR_DIR, snapshot_path, workers=workers)
+    return snapshot
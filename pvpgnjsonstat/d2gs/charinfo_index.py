@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Индекс герой -> акаунт от директорията charinfo на PvPGN.
+
+Вместо os.listdir() на всеки акаунт за всеки герой (O(герои x акаунти)),
+индексът се строи веднъж на пускане с os.scandir. По желание се пази на диск
+и при следващото пускане се презареждат само акаунт-директориите, чийто
+mtime се е променил (добавен/изтрит герой).
+
+Използване от скриптовете:
+    from charinfo_index import build_account_index
+    account_index = build_account_index(CHARINFO_DIR, CHARINFO_INDEX_FILE)
+    account = account_index.get(char_filename, "Unknown")
+"""
+import os
+import json
+from typing import Dict, Any, Optional
+
+CHARINFO_DIR = "/usr/local/pvpgn/var/pvpgn/charinfo"
+# Пази се в cache/, а не в logs/ (00.start.sh чисти logs/ всеки път)
+CHARINFO_INDEX_FILE = "/home/support/scripts-tools/d2cpp/pvpgnjsonstat/d2gs/cache/charinfo_index.json"
+INDEX_VERSION = 1
+
+
+def _list_account(account_path: str) -> list:
+    """Имената на файловете (героите) в една акаунт-директория."""
+    chars = []
+    try:
+        with os.scandir(account_path) as it:
+            for entry in it:
+                if entry.is_file():
+                    chars.append(entry.name)
+    except OSError:
+        pass
+    return sorted(chars)
+
+
+def _load_state(cache_path: str, charinfo_dir: str) -> Dict[str, Any]:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"[!] Ignoring unreadable charinfo index {cache_path}: {e}")
+        return {}
+    if state.get("version") != INDEX_VERSION or state.get("charinfo_dir") != charinfo_dir:
+        return {}
+    return state
+
+
+def _save_state(cache_path: str, state: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"[!] Failed to write charinfo index {cache_path}: {e}")
+
+
+def build_account_index(charinfo_dir: str = CHARINFO_DIR, cache_path: Optional[str] = None) -> Dict[str, str]:
+    """
+    Връща { 'char_filename': 'account', ... } за всички герои в charinfo_dir.
+
+    При подаден cache_path акаунтите с непроменен mtime се вземат от кеша
+    (едно stat() на акаунт вместо listdir), а новите/променените се сканират.
+    При дублиран герой печели първият акаунт по азбучен ред.
+    """
+    old_accounts = _load_state(cache_path, charinfo_dir).get("accounts", {}) if cache_path else {}
+    accounts: Dict[str, Any] = {}
+    rescanned = 0
+
+    try:
+        with os.scandir(charinfo_dir) as top:
+            for acc in top:
+                try:
+                    if not acc.is_dir():
+                        continue
+                    mtime_ns = acc.stat().st_mtime_ns
+                except OSError:
+                    continue
+
+                cached = old_accounts.get(acc.name)
+                if cached and cached.get("mtime_ns") == mtime_ns:
+                    accounts[acc.name] = cached
+                else:
+                    accounts[acc.name] = {"mtime_ns": mtime_ns, "chars": _list_account(acc.path)}
+                    rescanned += 1
+    except FileNotFoundError:
+        print(f"[!] Charinfo directory not found: {charinfo_dir}")
+        return {}
+
+    index: Dict[str, str] = {}
+    for acc_name in sorted(accounts):
+        for char_name in accounts[acc_name]["chars"]:
+            index.setdefault(char_name, acc_name)
+
+    if cache_path:
+        if rescanned or len(accounts) != len(old_accounts):
+            _save_state(cache_path, {"version": INDEX_VERSION, "charinfo_dir": charinfo_dir, "accounts": accounts})
+        print(f"[*] Charinfo index: {len(accounts)} accounts ({rescanned} rescanned), {len(index)} characters.")
+
+    return index
+
+
+if __name__ == "__main__":
+    idx = build_account_index(CHARINFO_DIR, CHARINFO_INDEX_FILE)
+    for char_name, account in sorted(idx.items()):
+        print(f"{char_name:<20} {account}")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Парсване на изхода от D2GS конзолата за игрите ("gl" и "cl <id>").
+
+Общо за 01.d2gs_collect_games.py (чете директно от конзолата) и
+05.gameinfo2json.py (чете старите cl_<id>_raw.txt файлове).
+"""
+import re
+from typing import Dict, Any, List
+
+HEADER_PATTERN = re.compile(r'\[(.*?)\s*:\s*(.*?)\s*\]')
+
+
+def parse_table(raw: str) -> List[Dict[str, str]]:
+    """
+    Таблица от конзолата -> списък от редове { колона: стойност }.
+    Колоните се вземат от позициите на имената в заглавния ред
+    "+-No.--GameName---------GamePass---..." (таблиците са с фиксирана ширина).
+    """
+    columns = []
+    rows = []
+    for line in raw.splitlines():
+        if line.startswith("+-No"):
+            columns = [(m.group(0).rstrip("."), m.start()) for m in re.finditer(r"[A-Za-z.]+", line)]
+            continue
+        if not columns or not line.startswith("|"):
+            continue
+        body = line.rstrip().rstrip("|")
+        row = {}
+        for i, (name, start) in enumerate(columns):
+            end = columns[i + 1][1] if i + 1 < len(columns) else len(body)
+            row[name] = body[start:end].strip()
+        rows.append(row)
+    return rows
+
+
+def parse_gl_game_ids(raw_gl: str) -> List[str]:
+    """ID-тата на активните игри (колона Dis == "N") от изхода на "gl"."""
+    return [row["ID"] for row in parse_table(raw_gl) if row.get("Dis") == "N" and row.get("ID")]
+
+
+def parse_game_text(raw_cl: str) -> Dict[str, Any]:
+    """Изходът на "cl <id>" -> {"GameInfo": {...}, "Characters": [...]}."""
+    game_info = {}
+    characters = []
+    lines = raw_cl.splitlines(keepends=True)
+
+    # Parse header info [Key : Value]
+    for line in lines:
+        for match in HEADER_PATTERN.finditer(line):
+            key = match.group(1).strip()
+            val = match.group(2).strip()
+            game_info[key] = val if val else None
+
+    # Parse character table
+    char_table_started = False
+    for line in lines:
+        if line.startswith("+-No"):
+            char_table_started = True
+            continue
+        if char_table_started:
+            # Skip separators and empty lines
+            if line.startswith("+---") or line.strip() == "":
+                continue
+            if line.startswith("|"):
+                characters.append({
+                    "No": line[2:6].strip(),
+                    "AcctName": line[6:22].strip(),
+                    "CharName": line[22:40].strip(),
+                    "IPAddress": line[40:58].strip(),
+                    "Class": line[58:64].strip(),
+                    "Level": line[64:72].strip(),
+                    "EnterTime": line[72:80].strip()
+                })
+
+    return {
+        "GameInfo": game_info,
+        "Characters": characters
+    }
+
+
+def calculate_xp_rate(game_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Изчислява XP Rate, базиран на броя на играчите (UserCount)
+    по формулата на D2: XP Rate = (n + 1) / 2
+    """
+    game_info = game_data.get("GameInfo", {})
+    user_count_str = game_info.get("UserCount")
+
+    if not user_count_str:
+        user_count = 0
+    else:
+        try:
+            user_count = int(user_count_str)
+        except ValueError:
+            user_count = 0
+
+    # XP Rate Calculation
+    # Ако UserCount е 0 или 1, множителят е 1.0 (Base XP)
+    if user_count >= 1:
+        xp_rate = (user_count + 1) / 2
+    else:
+        xp_rate = 1.0
+
+    # Добавяне на новото поле към GameInfo
+    game_info["UserCount"] = user_count # Записваме го като int
+    game_info["XPRateMultiplier"] = round(xp_rate, 2)
+
+    # Форматиране на бонуса (напр. "+350%")
+    xp_bonus_percent = (xp_rate - 1.0) * 100
+    game_info["XPBonusPercent"] = f"+{round(xp_bonus_percent):.0f}%"
+
+    game_data["GameInfo"] = game_info
+    return game_data
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Таблица код на предмет -> категория / слот / база, от weapons.txt,
+armor.txt и misc.txt в D2_DATA_DIR.
+
+Вместо CODE_TO_TYPE + търсене на думи в името за всеки предмет, таблицата
+се строи веднъж и всеки предмет е едно dict.get() по кода. Пази се в
+cache/item_classes.json с sha1 на трите txt файла - при смяна на някой от
+тях се строи наново.
+
+Txt файловете тук са от classic (колона type е числов id, без elite и без
+чисто expansion базите), затова:
+  - exceptional кодът се взима от ubercode, elite се извежда от него
+    (9xx -> 7xx, 8xx -> 6xx, xNN -> uNN, колани zNb -> uNc, + ELITE_CODES);
+  - EXPANSION_BASES допълва класовите предмети, диадемите, чармовете,
+    руните и т.н.
+
+    from item_classes import item_categories
+    ITEM_CATEGORY = item_categories()
+    ITEM_CATEGORY.get(code, "other")     # "weapon", "armor", "ring", ...
+
+    python3 item_classes.py [код ...]
+"""
+import os
+import csv
+import sys
+import json
+import hashlib
+from functools import lru_cache
+from typing import Dict, Optional
+
+D2_DATA_DIR = "/home/support/scripts-tools/d2cpp/pvpgnjsonstat/d2gs/items/"
+ITEM_CLASSES_FILE = "/home/support/scripts-tools/d2cpp/pvpgnjsonstat/d2gs/cache/item_classes.json"
+SOURCE_FILES = ("weapons.txt", "armor.txt", "misc.txt")
+CLASSES_VERSION = 1
+
+OTHER = "other"
+
+# type id (ItemTypes.txt на classic) -> (категория, слот)
+ITEM_TYPES = {
+    2: ("armor", "shield"), 3: ("armor", "torso"), 15: ("armor", "feet"),
+    16: ("armor", "gloves"), 37: ("armor", "head"), 19: ("belt", "belt"),
+    10: ("ring", "ring"), 12: ("amulet", "neck"),
+    24: ("weapon", "weapon"), 25: ("weapon", "weapon"), 26: ("weapon", "weapon"),
+    27: ("weapon", "weapon"), 28: ("weapon", "weapon"), 29: ("weapon", "weapon"),
+    30: ("weapon", "weapon"), 31: ("weapon", "weapon"), 32: ("weapon", "weapon"),
+    33: ("weapon", "weapon"), 34: ("weapon", "weapon"), 35: ("weapon", "weapon"),
+    36: ("weapon", "weapon"), 42: ("weapon", "weapon"), 43: ("weapon", "weapon"),
+    5: ("ammo", ""), 6: ("ammo", ""), 9: ("potion", ""), 11: ("potion", ""),
+    38: ("potion", ""), 20: ("gem", ""), 4: ("gold", ""), 18: ("book", ""),
+    22: ("scroll", ""), 39: ("quest", ""), 41: ("key", ""),
+}
+# ако type липсва в ITEM_TYPES - по файла
+FILE_DEFAULTS = {"weapons.txt": ("weapon", "weapon"), "armor.txt": ("armor", ""), "misc.txt": (OTHER, "")}
+
+
+def _tiers(normal, exceptional, elite):
+    return {"normal": normal, "exceptional": exceptional, "elite": elite}
+
+
+# expansion бази, които ги няма в classic txt-тата:
+# (кодове по ниво, имена, категория, слот); i-тият код на всяко ниво е i-тото име
+EXPANSION_BASES = [
+    (_tiers("am1 am2 am3 am4 am5", "am6 am7 am8 am9 ama", "amb amc amd ame amf"),
+     ["Stag Bow", "Reflex Bow", "Maiden Spear", "Maiden Pike", "Maiden Javelin"], "weapon", "weapon"),
+    (_tiers("ob1 ob2 ob3 ob4 ob5", "ob6 ob7 ob8 ob9 oba", "obb obc obd obe obf"),
+     ["Eagle Orb", "Sacred Globe", "Smoked Sphere", "Clasped Orb", "Jared's Stone"], "weapon", "weapon"),
+    (_tiers("ktr wrb axf ces clw btl skr", "9ar 9wb 9xf 9cs 9lw 9tw 9qr", "7ar 7wb 7xf 7cs 7lw 7tw 7qr"),
+     ["Katar", "Wrist Blade", "Hatchet Hands", "Cestus", "Claws", "Blade Talons", "Scissors Katar"],
+     "weapon", "weapon"),
+    (_tiers("dr1 dr2 dr3 dr4 dr5", "dr6 dr7 dr8 dr9 dra", "drb drc drd dre drf"),
+     ["Wolf Head", "Hawk Helm", "Antlers", "Falcon Mask", "Spirit Mask"], "armor", "head"),
+    (_tiers("ba1 ba2 ba3 ba4 ba5", "ba6 ba7 ba8 ba9 baa", "bab bac bad bae baf"),
+     ["Jawbone Cap", "Fanged Helm", "Horned Helm", "Assault Helmet", "Avenger Guard"], "armor", "head"),
+    (_tiers("pa1 pa2 pa3 pa4 pa5", "pa6 pa7 pa8 pa9 paa", "pab pac pad pae paf"),
+     ["Targe", "Rondache", "Heraldic Shield", "Aerin Shield", "Crown Shield"], "armor", "shield"),
+    (_tiers("ne1 ne2 ne3 ne4 ne5", "ne6 ne7 ne8 ne9 nea", "neb nec ned nee nef"),
+     ["Preserved Head", "Zombie Head", "Unraveller Head", "Gargoyle Head", "Demon Head"], "armor", "shield"),
+    (_tiers("ci0 ci1", "", ""), ["Circlet", "Coronet"], "armor", "head"),
+    (_tiers("", "ci2", ""), ["Tiara"], "armor", "head"),
+    (_tiers("", "", "ci3"), ["Diadem"], "armor", "head"),
+    (_tiers("cm1", "", ""), ["Small Charm"], "charm_small", ""),
+    (_tiers("cm2", "", ""), ["Large Charm"], "charm_large", ""),
+    (_tiers("cm3", "", ""), ["Grand Charm"], "charm_grand", ""),
+    (_tiers("jew", "", ""), ["Jewel"], "jewel", ""),
+    (_tiers(" ".join(f"r{i:02d}" for i in range(1, 34)), "", ""),
+     [f"{name} Rune" for name in
+      ["El", "Eld", "Tir", "Nef", "Eth", "Ith", "Tal", "Ral", "Ort", "Thul", "Amn", "Sol",
+       "Shael", "Dol", "Hel", "Io", "Lum", "Ko", "Fal", "Lem", "Pul", "Um", "Mal", "Ist",
+       "Gul", "Vex", "Ohm", "Lo", "Sur", "Ber", "Jah", "Cham", "Zod"]], "rune", ""),
+    (_tiers("pk1 pk2 pk3", "", ""), ["Key of Terror", "Key of Hate", "Key of Destruction"], "key", ""),
+    (_tiers("tes ceh bet fed toa bey mbr dhn std ice tr2", "", ""),
+     ["Twisted Essence of Suffering", "Charged Essence of Hatred", "Burning Essence of Terror",
+      "Festering Essence of Destruction", "Token of Absolution", "Baal's Eye", "Mephisto's Brain",
+      "Diablo's Horn", "Standard of Heroes", "Malah's Potion", "Scroll of Resistance"], "quest", ""),
+]
+
+
+# elite кодове, които не следват правилото в _elite_code
+ELITE_CODES = {"9b7": "7o7"}
+
+
+def _elite_code(exceptional: str) -> Optional[str]:
+    """Elite кодът по exceptional (конвенцията на 1.10 за classic базите)."""
+    if exceptional in ELITE_CODES:
+        return ELITE_CODES[exceptional]
+    head, tail = exceptional[:1], exceptional[1:]
+    if head == "9":
+        # 9m9 -> 7m7, 9h9 -> 7h7
+        return "7" + (tail[:-1] + "7" if tail.endswith("9") else tail)
+    if head == "8":
+        return "6" + tail
+    if head == "x":
+        return "u" + tail
+    if head == "z" and tail.endswith("b"):
+        return "u" + tail[:-1] + "c"
+    return None
+
+
+def _to_int(value: str) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _entry(category: str, slot: str, base: str, tier: str) -> Dict[str, str]:
+    return {"category": category, "slot": slot, "base": base, "tier": tier}
+
+
+def build_item_classes(data_dir: str = D2_DATA_DIR) -> Dict[str, Dict[str, str]]:
+    """{ код: {"category", "slot", "base", "tier"} } от txt файловете + EXPANSION_BASES."""
+    classes: Dict[str, Dict[str, str]] = {}
+    ubercodes: Dict[str, Dict[str, str]] = {}
+
+    for fname in SOURCE_FILES:
+        with open(os.path.join(data_dir, fname), "r", encoding="latin-1", newline="") as f:
+            for row in csv.DictReader(f, delimiter="\t"):
+                code = (row.get("code") or "").strip()
+                if not code or code in classes:
+                    continue
+                category, slot = ITEM_TYPES.get(_to_int(row.get("type")), FILE_DEFAULTS[fname])
+                base = (row.get("name") or code).strip()
+                classes[code] = _entry(category, slot, base, "normal")
+                uber = (row.get("ubercode") or "").strip()
+                if uber and uber != "0":
+                    ubercodes.setdefault(uber, _entry(category, slot, base, "exceptional"))
+
+    # exceptional версията често е отделен ред (със свое име); ако я няма - от базата
+    for code, entry in ubercodes.items():
+        if code in classes:
+            classes[code]["tier"] = "exceptional"
+        else:
+            classes[code] = entry
+    # не всеки exceptional ред е нечий ubercode - по формата на кода
+    for code, entry in list(classes.items()):
+        elite = _elite_code(code) if entry["category"] in ("weapon", "armor", "belt") else None
+        if elite:
+            entry["tier"] = "exceptional"
+            classes.setdefault(elite, {**entry, "tier": "elite"})
+
+    for tiers, names, category, slot in EXPANSION_BASES:
+        for tier, codes in tiers.items():
+            for code, base in zip(codes.split(), names):
+                classes.setdefault(code, _entry(category, slot, base, tier))
+    return classes
+
+
+def file_sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_atomic(path: str, data: Dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[!] Failed to write item classes {path}: {e}")
+
+
+@lru_cache(maxsize=None)
+def load_item_classes(data_dir: str = D2_DATA_DIR,
+                      cache_path: Optional[str] = ITEM_CLASSES_FILE) -> Dict[str, Dict[str, str]]:
+    """
+    Таблицата от кеша, ако sha1 на txt файловете съвпадат; иначе се строи и
+    записва. В рамките на процеса се строи/чете само веднъж (lru_cache).
+    """
+    sources = {fname: file_sha1(os.path.join(data_dir, fname)) for fname in SOURCE_FILES}
+    if cache_path:
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("version") == CLASSES_VERSION and cached.get("sources") == sources:
+                return cached["classes"]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[!] Ignoring unreadable item classes {cache_path}: {e}")
+
+    classes = build_item_classes(data_dir)
+    if cache_path:
+        _write_atomic(cache_path, {"version": CLASSES_VERSION, "sources": sources, "classes": classes})
+        print(f"[*] Item classes: {len(classes)} codes from {', '.join(SOURCE_FILES)} -> {cache_path}")
+    return classes
+
+
+def item_categories(data_dir: str = D2_DATA_DIR, cache_path: Optional[str] = ITEM_CLASSES_FILE) -> Dict[str, str]:
+    """{ код: категория } - за горещия цикъл по предметите."""
+    return {code: entry["category"] for code, entry in load_item_classes(data_dir, cache_path).items()}
+
+
+if __name__ == "__main__":
+    table = load_item_classes()
+    for code in sys.argv[1:] or sorted(table):
+        entry = table.get(code)
+        if entry is None:
+            print(f"{code:<4} {OTHER} (unknown code)")
+        else:
+            print(f"{code:<4} {entry['category']:<12} {entry['slot']:<7} {entry['tier']:<12} {entry['base']}")
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Компактен двоичен формат за snapshot-а на героите (char_snapshot.bin).
+
+Файлът се чете през mmap: заглавието и индексът на героите са с фиксирана
+ширина, така че един герой се зарежда по отместване, без да се парсва
+останалата част от файла. Всички низове (имена, кодове, свойства на
+предметите) са в обща таблица с низове и се декодират само при нужда.
+
+Подредба на файла (little-endian):
+    HEADER                                   - магия, версия, броячи, отместания
+    блокове с данни (по един на герой)        - STAT * n_stats, после предметите
+    индекс на героите  (CHAR_REC * n_chars)    - фиксирана ширина
+    индекс на низовете (STR_REC * n_strings)   - отместване + дължина в STR данните
+    данни на низовете  (utf-8)
+
+Предмет = ITEM_REC + n_props * u32 (id на низ) + n_socketed вложени предмета.
+
+Използване:
+    with SnapshotReader(path) as snap:
+        rec = snap.load("sorsi")          # само този герой
+        for summary in snap.summaries():  # без предметите
+            ...
+"""
+import os
+import sys
+import json
+import mmap
+import struct
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Iterator, Union
+
+MAGIC = b"D2SNAP\x00\x00"
+FORMAT_VERSION = 1
+
+# magic, version, reserved, n_chars, n_strings, char_dir_sid, generated_sid,
+# char_index_off, str_index_off, str_data_off
+HEADER = struct.Struct("<8sHHIIIIQQQ")
+# charfile, charname, account, class (sid), level, flags, n_stats, n_items,
+# data_off, data_len, mtime_ns, size, sha1, decoded_at
+CHAR_REC = struct.Struct("<IIIIHBxIIQIqQ20sd")
+# key sid, тип на стойността, 8 байта стойност
+STAT_REC = struct.Struct("<IB8s")
+# name sid, code sid, rune_id (-1 = няма), flags, n_props, n_socketed
+ITEM_REC = struct.Struct("<IIiBxHH")
+STR_REC = struct.Struct("<II")
+U32 = struct.Struct("<I")
+I64 = struct.Struct("<q")
+F64 = struct.Struct("<d")
+
+# CHAR_REC.flags
+CHAR_HC = 0x01
+CHAR_LADDER = 0x02
+
+# ITEM_REC.flags (по реда на полетата в нормализирания предмет)
+ITEM_FLAGS = ("is_unique", "is_set", "is_rune", "is_socketed", "is_in_stash")
+
+# STAT_REC типове
+T_NONE, T_BOOL, T_INT, T_FLOAT, T_STR, T_JSON = range(6)
+
+
+# =======================================================
+# --- ЗАПИС ---
+# =======================================================
+
+class _StringTable:
+    """Интернира низовете; всеки уникален низ се записва веднъж."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def sid(self, s: Optional[str]) -> int:
+        s = "" if s is None else s
+        sid = self.ids.get(s)
+        if sid is None:
+            sid = len(self.strings)
+            self.ids[s] = sid
+            self.strings.append(s)
+        return sid
+
+
+def _pack_stat(strings: _StringTable, key: str, value: Any) -> bytes:
+    if value is None:
+        tag, raw = T_NONE, bytes(8)
+    elif isinstance(value, bool):
+        tag, raw = T_BOOL, I64.pack(int(value))
+    elif isinstance(value, int) and -(1 << 63) <= value < (1 << 63):
+        tag, raw = T_INT, I64.pack(value)
+    elif isinstance(value, float):
+        tag, raw = T_FLOAT, F64.pack(value)
+    elif isinstance(value, str):
+        tag, raw = T_STR, I64.pack(strings.sid(value))
+    else:
+        tag, raw = T_JSON, I64.pack(strings.sid(json.dumps(value, ensure_ascii=False)))
+    return STAT_REC.pack(strings.sid(key), tag, raw)
+
+
+def _pack_item(strings: _StringTable, item: Dict[str, Any], out: bytearray) -> None:
+    flags = 0
+    for bit, field in enumerate(ITEM_FLAGS):
+        if item.get(field):
+            flags |= 1 << bit
+    rune_id = item.get("rune_id")
+    props = item.get("properties") or []
+    socketed = item.get("socketed") or []
+    out += ITEM_REC.pack(strings.sid(item.get("name")), strings.sid(item.get("code")),
+                         -1 if rune_id is None else int(rune_id), flags, len(props), len(socketed))
+    for p in props:
+        out += U32.pack(strings.sid(p if isinstance(p, str) else str(p)))
+    for child in socketed:
+        _pack_item(strings, child, out)
+
+
+def write_snapshot(snapshot: Dict[str, Any], path: str) -> None:
+    """
+    Записва snapshot (речника от char_snapshot.build_snapshot) в двоичен вид,
+    атомарно (tmp файл + os.replace).
+    """
+    strings = _StringTable()
+    characters = snapshot.get("characters", [])
+
+    data = bytearray()
+    char_recs = []
+    base = HEADER.size
+    for rec in characters:
+        stats = rec.get("stats", {})
+        items = rec.get("items", [])
+        fp = rec.get("fingerprint", {}) or {}
+
+        block = bytearray()
+        for key, value in stats.items():
+            block += _pack_stat(strings, key, value)
+        for item in items:
+            _pack_item(strings, item, block)
+
+        flags = (CHAR_HC if stats.get("is_hc") else 0) | (CHAR_LADDER if stats.get("is_ladder") else 0)
+        sha1 = bytes.fromhex(fp["sha1"]) if fp.get("sha1") else bytes(20)
+        char_recs.append(CHAR_REC.pack(
+            strings.sid(rec["charfile"]), strings.sid(rec["charname"]), strings.sid(rec["account"]),
+            strings.sid(str(stats.get("class", "N/A"))), max(0, min(0xFFFF, int(stats.get("level") or 0))), flags,
+            len(stats), len(items), base + len(data), len(block),
+            fp.get("mtime_ns", 0), fp.get("size", 0), sha1, rec.get("decoded_at", 0.0)))
+        data += block
+
+    char_dir_sid = strings.sid(snapshot.get("char_dir", ""))
+    generated_sid = strings.sid(snapshot.get("generated", ""))
+
+    str_index = bytearray()
+    str_data = bytearray()
+    for s in strings.strings:
+        encoded = s.encode("utf-8")
+        str_index += STR_REC.pack(len(str_data), len(encoded))
+        str_data += encoded
+
+    char_index_off = base + len(data)
+    str_index_off = char_index_off + CHAR_REC.size * len(char_recs)
+    str_data_off = str_index_off + len(str_index)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(char_recs), len(strings.strings),
+                         char_dir_sid, generated_sid, char_index_off, str_index_off, str_data_off)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(data)
+        f.write(b"".join(char_recs))
+        f.write(str_index)
+        f.write(str_data)
+    os.replace(tmp_path, path)
+
+
+# =======================================================
+# --- ЧЕТЕНЕ (mmap, лениво) ---
+# =======================================================
+
+class SnapshotReader:
+    """
+    Лениво четене на char_snapshot.bin. Нищо не се декодира предварително:
+    summary()/load() четат само индекса на героя, неговия блок и нужните низове.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path}: empty snapshot file")
+        self._buf = memoryview(self._mm)
+        if len(self._buf) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path}: truncated snapshot header")
+
+        (magic, version, _reserved, self.n_chars, self.n_strings, char_dir_sid, generated_sid,
+         self._char_index_off, self._str_index_off, self._str_data_off) = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: not a character snapshot (bad magic)")
+        if version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{path}: unsupported snapshot format version {version}")
+
+        self._strings: Dict[int, str] = {}
+        self._by_charfile: Optional[Dict[str, int]] = None
+        self.char_dir = self.string(char_dir_sid)
+        self.generated = self.string(generated_sid)
+
+    # --- context manager / затваряне ---
+    def close(self) -> None:
+        if getattr(self, "_buf", None) is not None:
+            self._buf.release()
+            self._buf = None
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self) -> "SnapshotReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.n_chars
+
+    # --- низове ---
+    def string(self, sid: int) -> str:
+        s = self._strings.get(sid)
+        if s is None:
+            off, length = STR_REC.unpack_from(self._buf, self._str_index_off + sid * STR_REC.size)
+            start = self._str_data_off + off
+            s = str(self._buf[start:start + length], "utf-8")
+            self._strings[sid] = s
+        return s
+
+    # --- индекс на героите ---
+    def _char_rec(self, i: int) -> tuple:
+        if not 0 <= i < self.n_chars:
+            raise IndexError(i)
+        return CHAR_REC.unpack_from(self._buf, self._char_index_off + i * CHAR_REC.size)
+
+    def index_of(self, charfile: str) -> int:
+        """Номер на героя по име на файла (KeyError, ако го няма)."""
+        if self._by_charfile is None:
+            self._by_charfile = {self.string(U32.unpack_from(self._buf, self._char_index_off + i * CHAR_REC.size)[0]): i
+                                 for i in range(self.n_chars)}
+        return self._by_charfile[charfile]
+
+    def charfiles(self) -> List[str]:
+        return [self.string(self._char_rec(i)[0]) for i in range(self.n_chars)]
+
+    def summary(self, i: int) -> Dict[str, Any]:
+        """Заглавните полета на героя, без статистики и предмети."""
+        (charfile, charname, account, cls, level, flags, _n_stats, n_items,
+         _off, _len, _mtime, _size, _sha1, decoded_at) = self._char_rec(i)
+        return {
+            "charfile": self.string(charfile),
+            "charname": self.string(charname),
+            "account": self.string(account),
+            "level": level,
+            "class": self.string(cls),
+            "is_hc": bool(flags & CHAR_HC),
+            "is_ladder": bool(flags & CHAR_LADDER),
+            "n_items": n_items,
+            "decoded_at": decoded_at,
+        }
+
+    def summaries(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self.n_chars):
+            yield self.summary(i)
+
+    # --- пълен запис на един герой ---
+    def _unpack_stat(self, pos: int) -> tuple:
+        key_sid, tag, raw = STAT_REC.unpack_from(self._buf, pos)
+        if tag == T_NONE:
+            value = None
+        elif tag == T_BOOL:
+            value = bool(I64.unpack(raw)[0])
+        elif tag == T_INT:
+            value = I64.unpack(raw)[0]
+        elif tag == T_FLOAT:
+            value = F64.unpack(raw)[0]
+        elif tag == T_STR:
+            value = self.string(I64.unpack(raw)[0])
+        else:
+            value = json.loads(self.string(I64.unpack(raw)[0]))
+        return self.string(key_sid), value
+
+    def _unpack_item(self, pos: int) -> tuple:
+        name_sid, code_sid, rune_id, flags, n_props, n_socketed = ITEM_REC.unpack_from(self._buf, pos)
+        pos += ITEM_REC.size
+        item = {"name": self.string(name_sid), "code": self.string(code_sid)}
+        for bit, field in enumerate(ITEM_FLAGS[:3]):
+            item[field] = bool(flags & (1 << bit))
+        item["rune_id"] = None if rune_id < 0 else rune_id
+        for bit, field in enumerate(ITEM_FLAGS[3:], start=3):
+            item[field] = bool(flags & (1 << bit))
+        props = []
+        for _ in range(n_props):
+            props.append(self.string(U32.unpack_from(self._buf, pos)[0]))
+            pos += U32.size
+        item["properties"] = props
+        if n_socketed:
+            children = []
+            for _ in range(n_socketed):
+                child, pos = self._unpack_item(pos)
+                children.append(child)
+            item["socketed"] = children
+        return item, pos
+
+    def load(self, key: Union[int, str]) -> Dict[str, Any]:
+        """
+        Пълният запис на един герой (същата форма като в char_snapshot),
+        по номер или по име на файла.
+        """
+        i = key if isinstance(key, int) else self.index_of(key)
+        (charfile, charname, account, _cls, _level, _flags, n_stats, n_items,
+         data_off, _data_len, mtime_ns, size, sha1, decoded_at) = self._char_rec(i)
+
+        pos = data_off
+        stats = {}
+        for _ in range(n_stats):
+            k, v = self._unpack_stat(pos)
+            stats[k] = v
+            pos += STAT_REC.size
+        items = []
+        for _ in range(n_items):
+            item, pos = self._unpack_item(pos)
+            items.append(item)
+
+        return {
+            "charfile": self.string(charfile),
+            "charname": self.string(charname),
+            "account": self.string(account),
+            "stats": stats,
+            "items": items,
+            "decoded": datetime.fromtimestamp(decoded_at).strftime("%Y-%m-%d %H:%M:%S"),
+            "decoded_at": decoded_at,
+            "fingerprint": {"mtime_ns": mtime_ns, "size": size, "sha1": sha1.hex() if any(sha1) else None},
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self.n_chars):
+            yield self.load(i)
+
+
+if __name__ == "__main__":
+    # python3 snapshot_store.py <char_snapshot.bin> [charfile]
+    if len(sys.argv) < 2:
+        print("Usage: snapshot_store.py <snapshot.bin> [charfile]")
+        sys.exit(1)
+    with SnapshotReader(sys.argv[1]) as snap:
+        if len(sys.argv) > 2:
+            print(json.dumps(snap.load(sys.argv[2]), ensure_ascii=False, indent=2))
+        else:
+            print(f"[*] {snap.path}: {len(snap)} characters, generated {snap.generated}")
+            for s in snap.summaries():
+                print(f"{s['charfile']:<20} {s['account']:<16} {s['class']:<12} lvl {s['level']:<3} items {s['n_items']}")
@@ -1,5 +1,6 @@
 #!/bin/bash
 
+# (if 01.pvpgn_json_portal.py runs with --daemon, this step can be dropped)
 /usr/bin/python3 /home/support/scripts-tools/d2cpp/python-tools/d2gs-py/01.pvpgn_json_portal.py
 sleep 0.5
 /usr/bin/python3 /home/support/scripts-tools/d2cpp/python-tools/d2gs-py/02.d2gs_live_monitor_full_json.py
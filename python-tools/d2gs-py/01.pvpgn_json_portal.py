@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
-import subprocess
+import os
+import sys
+import math
+import time
+import signal
 import xml.etree.ElementTree as ET
 import json
 import argparse
 import sqlite3
+from collections import Counter
 from pathlib import Path
 from datetime import datetime
 
+from pvpgn_server_xml import iter_server_xml
+
 # PvPGN XML paths (от parseradb.py)
 PVPSTATUS_FILE = Path("/usr/local/pvpgn/var/pvpgn/logs/pvpgnstatus.xml")
 SERVER_STATUS_FILE = Path("/usr/local/pvpgn/var/pvpgn/status/server.xml")
@@ -31,10 +38,22 @@ NETWORK_PORTS = {
 # Предполага се, че базата данни не е нужна за JSON експорта, но я запазваме като опция
 BASE_DIR = Path("/home/support/scripts-tools/pvpgn-sqlite/chatgpt/backend/")
 DB_PATH = BASE_DIR / "pvpgn.sqlite"
+# Суровите снимки се пазят 48 часа, по-старите остават само като почасови обобщения
+RAW_RETENTION_HOURS = 48
 
 # JSON output path - НОВ ПЪТ ПО ПОДРАЗБИРАНЕ
 DEFAULT_JSON_PATH = Path("/var/www/html/pvpjsonstat/logs/pvpgn_server_status.json")
 
+# Режим --daemon: интервал (секунди) за всеки колектор. XML файловете се
+# препарсват само ако mtime/размерът им са се променили.
+COLLECTOR_INTERVALS = {
+    "proc": 5,          # uptime, load, памет, диск
+    "sockets": 5,       # /proc/net/tcp
+    "pvpgnstatus": 10,  # pvpgnstatus.xml
+    "server_xml": 10,   # server.xml (users/games)
+    "database": 60,     # снимка в SQLite (само с --database)
+}
+
 
 # -------------------- Функции за Събиране на Данни (от parseradb.py) --------------------
 
@@ -84,37 +103,78 @@ def get_memory():
     }
 
 
-def get_disk_root():
-    output = subprocess.check_output(
-        ["df", "-h", "/"], text=True
-    ).strip().splitlines()
+def human_size(num_bytes):
+    """Като "df -h": степени на 1024, закръгляне нагоре, един знак след точката под 10."""
+    value = float(num_bytes)
+    for unit in ("", "K", "M", "G", "T", "P"):
+        if value < 1024 or unit == "P":
+            break
+        value /= 1024
+    if not unit:
+        return str(int(value))
+    if value < 10:
+        return f"{math.ceil(value * 10) / 10:.1f}{unit}"
+    return f"{math.ceil(value)}{unit}"
 
-    _, size, used, avail, use_percent, _ = output[1].split()
+
+def get_disk_root():
+    # os.statvfs вместо "df -h /" (без отделен процес); числата са като при df
+    st = os.statvfs("/")
+    total = st.f_blocks * st.f_frsize
+    avail = st.f_bavail * st.f_frsize
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    used_percent = math.ceil(used * 100 / (used + avail)) if used + avail else 0
 
     return {
-        "total": size,
-        "available": avail,
-        "used_percent": use_percent,
+        "total": human_size(total),
+        "available": human_size(avail),
+        "used_percent": f"{used_percent}%",
+        "total_bytes": total,
+        "available_bytes": avail,
     }
 
 
-def count_connections(port):
-    try:
-        output = subprocess.check_output(
-            ["ss", "-tn", "state", "all", f"sport = :{port}"],
-            text=True
-        )
-        return max(0, len(output.strip().splitlines()) - 1)
-    except subprocess.CalledProcessError:
-        return 0
+# Кодовете на състоянията в /proc/net/tcp (include/net/tcp_states.h)
+TCP_STATES = {
+    "01": "ESTABLISHED", "02": "SYN_SENT", "03": "SYN_RECV", "04": "FIN_WAIT1",
+    "05": "FIN_WAIT2", "06": "TIME_WAIT", "07": "CLOSE", "08": "CLOSE_WAIT",
+    "09": "LAST_ACK", "0A": "LISTEN", "0B": "CLOSING", "0C": "NEW_SYN_RECV",
+}
+PROC_NET_TCP = ("/proc/net/tcp", "/proc/net/tcp6")
+
+
+def count_sockets_by_port(ports):
+    """
+    Един проход по /proc/net/tcp и tcp6 (вместо по един "ss" на порт):
+    { port: { state: брой } } за сокетите с локален порт в ports.
+    """
+    counts = {port: Counter() for port in ports}
+    for path in PROC_NET_TCP:
+        try:
+            with open(path, "r") as f:
+                next(f, None)  # заглавен ред
+                for line in f:
+                    fields = line.split()
+                    if len(fields) < 4:
+                        continue
+                    port = int(fields[1].rsplit(":", 1)[1], 16)
+                    if port in counts:
+                        counts[port][TCP_STATES.get(fields[3], fields[3])] += 1
+        except FileNotFoundError:
+            continue  # без IPv6
+    return counts
 
 
 def get_network_connections():
+    counts = count_sockets_by_port(NETWORK_PORTS)
     data = {}
     for port, service in NETWORK_PORTS.items():
+        states = counts[port]
         data[str(port)] = {
             "service": service,
-            "connections": count_connections(port)
+            # всички сокети на порта (както "ss state all sport = :port")
+            "connections": sum(states.values()),
+            "states": dict(states),
         }
     return data
 
@@ -139,32 +199,26 @@ def parse_pvpgn_details():
     if not SERVER_STATUS_FILE.exists():
         return [], []
 
-    tree = ET.parse(SERVER_STATUS_FILE)
-    root = tree.getroot()
-
     users = []
     games = []
 
-    users_node = root.find("Users")
-    if users_node is not None:
-        for u in users_node.findall("user"):
+    # поточно (XMLParser с expat target, без дърво) - паметта не зависи от броя на потребителите
+    for kind, rec in iter_server_xml(SERVER_STATUS_FILE):
+        if kind == "user":
             users.append({
-                "name": u.findtext("name"),
-                "client_tag": u.findtext("clienttag"),
-                "client_name": CLIENT_MAP.get(u.findtext("clienttag"), "Unknown"),
-                "version": u.findtext("version"),
-                "country": u.findtext("country"),
-                "game_id": int(u.findtext("gameid", 0)),
+                "name": rec.get("name"),
+                "client_tag": rec.get("clienttag"),
+                "client_name": CLIENT_MAP.get(rec.get("clienttag"), "Unknown"),
+                "version": rec.get("version"),
+                "country": rec.get("country"),
+                "game_id": int(rec.get("gameid", 0)),
             })
-
-    games_node = root.find("Games")
-    if games_node is not None:
-        for g in games_node.findall("game"):
+        elif kind == "game":
             games.append({
-                "id": int(g.findtext("id", 0)),
-                "name": g.findtext("name"),
-                "client_tag": g.findtext("clienttag"),
-                "client_name": CLIENT_MAP.get(g.findtext("clienttag"), "Unknown"),
+                "id": int(rec.get("id", 0)),
+                "name": rec.get("name"),
+                "client_tag": rec.get("clienttag"),
+                "client_name": CLIENT_MAP.get(rec.get("clienttag"), "Unknown"),
             })
 
     return users, games
@@ -217,7 +271,8 @@ def print_console(data):
 
     print("=== Network Connections ===")
     for port, info in data["network"]["connections"].items():
-        print(f"{port} ({info['service']}): {info['connections']} connections")
+        states = ", ".join(f"{state} {n}" for state, n in sorted(info["states"].items()))
+        print(f"{port} ({info['service']}): {info['connections']} connections" + (f" ({states})" if states else ""))
     print()
 
     print("=== Users ===")
@@ -231,26 +286,284 @@ def print_console(data):
     print()
 
 
-def write_json(data, json_path):
+def write_json(data, json_path, quiet=False):
     # Създава директорията, ако не съществува
     json_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(json_path, "w") as f:
+    # tmp + os.replace - уебът никога не чете наполовина записан файл
+    tmp_path = json_path.with_name(json_path.name + ".tmp")
+    with open(tmp_path, "w") as f:
         json.dump(data, f, indent=2)
-    print(f"JSON written to {json_path}")
+    os.replace(tmp_path, json_path)
+    if not quiet:
+        print(f"JSON written to {json_path}")
+
+
+# -------------------- SQLite история (опцията --database) --------------------
+# Една транзакция на снимка (executemany за users/games/connections), WAL, за да
+# може уебът да чете, докато се пише. Снимките по-стари от RAW_RETENTION_HOURS
+# се свиват до почасови обобщения (*_hourly) и суровите редове се трият.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    ts INTEGER PRIMARY KEY,
+    uptime_seconds INTEGER,
+    load_1m REAL, load_5m REAL, load_15m REAL,
+    cpu_cores INTEGER,
+    mem_total_mb INTEGER, mem_used_mb INTEGER, mem_available_mb INTEGER,
+    disk_total TEXT, disk_available TEXT, disk_used_percent TEXT,
+    pvpgn_uptime INTEGER, users_online INTEGER, games_online INTEGER
+);
+CREATE TABLE IF NOT EXISTS connections (
+    ts INTEGER NOT NULL, port INTEGER NOT NULL, service TEXT, connections INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_connections_ts ON connections(ts);
+CREATE TABLE IF NOT EXISTS users (
+    ts INTEGER NOT NULL, name TEXT, client_tag TEXT, version TEXT, country TEXT, game_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_users_ts ON users(ts);
+CREATE INDEX IF NOT EXISTS idx_users_name_ts ON users(name, ts);
+CREATE TABLE IF NOT EXISTS games (
+    ts INTEGER NOT NULL, game_id INTEGER, name TEXT, client_tag TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_games_ts ON games(ts);
+CREATE INDEX IF NOT EXISTS idx_games_name_ts ON games(name, ts);
+
+CREATE TABLE IF NOT EXISTS snapshots_hourly (
+    hour INTEGER PRIMARY KEY, samples INTEGER,
+    load_1m_avg REAL, load_1m_max REAL,
+    mem_used_mb_avg REAL, mem_used_mb_max INTEGER,
+    users_online_avg REAL, users_online_max INTEGER,
+    games_online_avg REAL, games_online_max INTEGER
+);
+CREATE TABLE IF NOT EXISTS connections_hourly (
+    hour INTEGER NOT NULL, port INTEGER NOT NULL, service TEXT,
+    connections_avg REAL, connections_max INTEGER,
+    PRIMARY KEY (hour, port)
+);
+CREATE TABLE IF NOT EXISTS users_hourly (
+    hour INTEGER NOT NULL, name TEXT NOT NULL, client_tag TEXT, samples INTEGER,
+    PRIMARY KEY (hour, name)
+);
+CREATE INDEX IF NOT EXISTS idx_users_hourly_name ON users_hourly(name, hour);
+CREATE TABLE IF NOT EXISTS games_hourly (
+    hour INTEGER NOT NULL, name TEXT NOT NULL, client_tag TEXT, samples INTEGER,
+    PRIMARY KEY (hour, name)
+);
+CREATE INDEX IF NOT EXISTS idx_games_hourly_name ON games_hourly(name, hour);
+"""
+
+
+def open_db(db_path):
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def snapshot_ts(data):
+    """"2025-12-20 17:01:30" -> unix секунди (ключът на всички таблици)."""
+    return int(datetime.strptime(data["timestamp"], "%Y-%m-%d %H:%M:%S").timestamp())
 
 
-# Функциите за SQLite вмъкване (само за опцията --database)
 def insert_snapshot(conn, data):
-    # ... (съдържанието на оригиналната функция) ...
-    pass # Изпусната за краткост, тъй като не е основна цел
+    ts = snapshot_ts(data)
+    server = data["server"]
+    load, mem, disk = server["load_average"], server["memory"], server["disk"]
+    pvpgn = data["pvpgn"]
+    conn.execute(
+        "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (ts, server["uptime_seconds"], load["1m"], load["5m"], load["15m"], server["cpu_cores"],
+         mem["total_mb"], mem["used_mb"], mem["available_mb"],
+         disk["total"], disk["available"], disk["used_percent"],
+         pvpgn["uptime"], pvpgn["users_online"], pvpgn["games_online"]),
+    )
+    conn.executemany(
+        "INSERT INTO connections VALUES (?, ?, ?, ?)",
+        [(ts, int(port), info["service"], info["connections"])
+         for port, info in data["network"]["connections"].items()],
+    )
+    return ts
 
 def insert_users(conn, users, timestamp):
-    # ... (съдържанието на оригиналната функция) ...
-    pass # Изпусната за краткост, тъй като не е основна цел
+    conn.executemany(
+        "INSERT INTO users VALUES (?, ?, ?, ?, ?, ?)",
+        [(timestamp, u["name"], u["client_tag"], u["version"], u["country"], u["game_id"]) for u in users],
+    )
 
 def insert_games(conn, games, timestamp):
-    # ... (съдържанието на оригиналната функция) ...
-    pass # Изпусната за краткост, тъй като не е основна цел
+    conn.executemany(
+        "INSERT INTO games VALUES (?, ?, ?, ?)",
+        [(timestamp, g["id"], g["name"], g["client_tag"]) for g in games],
+    )
+
+
+def downsample(conn, now_ts):
+    """Цели часове по-стари от RAW_RETENTION_HOURS -> *_hourly, суровите редове се трият."""
+    cutoff = (now_ts - RAW_RETENTION_HOURS * 3600) // 3600 * 3600
+    conn.execute(
+        """INSERT OR REPLACE INTO snapshots_hourly
+           SELECT ts / 3600 * 3600, COUNT(*), AVG(load_1m), MAX(load_1m), AVG(mem_used_mb), MAX(mem_used_mb),
+                  AVG(users_online), MAX(users_online), AVG(games_online), MAX(games_online)
+           FROM snapshots WHERE ts < ? GROUP BY ts / 3600""", (cutoff,))
+    conn.execute(
+        """INSERT OR REPLACE INTO connections_hourly
+           SELECT ts / 3600 * 3600, port, MAX(service), AVG(connections), MAX(connections)
+           FROM connections WHERE ts < ? GROUP BY ts / 3600, port""", (cutoff,))
+    for table in ("users", "games"):
+        conn.execute(
+            f"""INSERT OR REPLACE INTO {table}_hourly
+                SELECT ts / 3600 * 3600, name, MAX(client_tag), COUNT(*)
+                FROM {table} WHERE ts < ? AND name IS NOT NULL GROUP BY ts / 3600, name""", (cutoff,))
+    for table in ("snapshots", "connections", "users", "games"):
+        conn.execute(f"DELETE FROM {table} WHERE ts < ?", (cutoff,))
+
+
+def write_database(data, db_path):
+    conn = open_db(db_path)
+    try:
+        ts = snapshot_ts(data)
+        with conn:  # една транзакция за цялата снимка
+            # второ пускане в същата секунда замества снимката, не я дублира
+            for table in ("connections", "users", "games"):
+                conn.execute(f"DELETE FROM {table} WHERE ts = ?", (ts,))
+            insert_snapshot(conn, data)
+            insert_users(conn, data["users"], ts)
+            insert_games(conn, data["games"], ts)
+        with conn:
+            downsample(conn, ts)
+    finally:
+        conn.close()
+    print(f"Snapshot stored in {db_path}")
+
+
+# -------------------- Daemon режим --------------------
+
+class MetricsDaemon:
+    """
+    Дълго живеещ процес вместо cron + collect_all(): всеки колектор има свой
+    интервал, XML файловете се парсват само при промяна, а JSON се пише
+    (атомарно) само когато съдържанието е различно от последно записаното.
+    """
+
+    def __init__(self, json_path, intervals, database=False, debug=False):
+        self.json_path = json_path
+        self.intervals = intervals
+        self.database = database
+        self.debug = debug
+        self.parts = {
+            "server": None,
+            "network": None,
+            "pvpgn": {"uptime": 0, "users_online": 0, "games_online": 0},
+            "users": [],
+            "games": [],
+        }
+        self.file_stamps = {}
+        self.next_run = {name: 0.0 for name in intervals}
+        self.last_written = None
+        self.cpu_cores = get_cpu_cores()  # не се променя докато процесът работи
+
+    def file_changed(self, path):
+        """mtime/размер на файла различни от миналия път (или файлът се е появил/изчезнал)."""
+        try:
+            st = os.stat(path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if path in self.file_stamps and self.file_stamps[path] == stamp:
+            return False
+        self.file_stamps[path] = stamp
+        return True
+
+    def collect_proc(self):
+        self.parts["server"] = {
+            "uptime_seconds": get_uptime(),
+            "load_average": get_load_average(),
+            "cpu_cores": self.cpu_cores,
+            "memory": get_memory(),
+            "disk": get_disk_root(),
+        }
+
+    def collect_sockets(self):
+        self.parts["network"] = {"connections": get_network_connections()}
+
+    def collect_pvpgnstatus(self):
+        if self.file_changed(PVPSTATUS_FILE):
+            self.parts["pvpgn"] = parse_pvpgn_summary()
+
+    def collect_server_xml(self):
+        if self.file_changed(SERVER_STATUS_FILE):
+            self.parts["users"], self.parts["games"] = parse_pvpgn_details()
+
+    def snapshot(self):
+        return {
+            "timestamp": get_timestamp(),
+            "server": self.parts["server"],
+            "network": self.parts["network"],
+            "pvpgn": self.parts["pvpgn"],
+            "users": self.parts["users"],
+            "games": self.parts["games"],
+        }
+
+    def run_due(self, now):
+        collectors = {
+            "proc": self.collect_proc,
+            "sockets": self.collect_sockets,
+            "pvpgnstatus": self.collect_pvpgnstatus,
+            "server_xml": self.collect_server_xml,
+        }
+        ran = False
+        for name, collect in collectors.items():
+            if now >= self.next_run[name]:
+                try:
+                    collect()
+                except Exception as e:
+                    # един счупен колектор не спира останалите; старите му данни остават
+                    print(f"[!] Collector {name} failed: {e}", file=sys.stderr)
+                self.next_run[name] = now + self.intervals[name]
+                ran = True
+        if not ran:
+            return
+        # докато някой колектор не е минал успешно поне веднъж, няма какво да се пише
+        # (иначе JSON-ът е с "server": null, а insert_snapshot пада на None)
+        missing = [name for name, part in self.parts.items() if part is None]
+        if missing:
+            if self.debug:
+                print(f"[*] Waiting for first data from: {', '.join(missing)}")
+            return
+
+        data = self.snapshot()
+        content = {k: v for k, v in data.items() if k != "timestamp"}
+        if content != self.last_written:
+            write_json(data, self.json_path, quiet=not self.debug)
+            self.last_written = content
+            if self.debug:
+                print_console(data)
+
+        if self.database and now >= self.next_run["database"]:
+            try:
+                write_database(data, DB_PATH)
+            except Exception as e:
+                # като колекторите: грешка в снимката не спира демона
+                print(f"[!] Database snapshot failed: {e}", file=sys.stderr)
+            self.next_run["database"] = now + self.intervals["database"]
+
+    def run(self):
+        print(f"[*] Metrics daemon started, intervals: {self.intervals}, JSON: {self.json_path}")
+        while True:
+            now = time.monotonic()
+            self.run_due(now)
+            due = [t for name, t in self.next_run.items() if name != "database" or self.database]
+            time.sleep(max(0.1, min(due) - time.monotonic()))
+
+
+def parse_interval(value):
+    """"sockets=2" -> ("sockets", 2.0) за --interval."""
+    name, _, seconds = value.partition("=")
+    if name not in COLLECTOR_INTERVALS or not seconds:
+        raise argparse.ArgumentTypeError(f"expected NAME=SECONDS with NAME in {', '.join(COLLECTOR_INTERVALS)}")
+    return name, float(seconds)
 
 
 # -------------------- MAIN --------------------
@@ -260,8 +573,21 @@ def main():
     parser_arg.add_argument("-D", "--debug", action="store_true", help="Print debug output to console")
     parser_arg.add_argument("-J", "--json", nargs='?', const=str(DEFAULT_JSON_PATH), default=None, help=f"Write JSON output. Optional path (default: {DEFAULT_JSON_PATH})")
     parser_arg.add_argument("-DB", "--database", action="store_true", help="Insert data into SQLite database")
+    parser_arg.add_argument("--daemon", action="store_true", help="Run continuously, each collector on its own interval")
+    parser_arg.add_argument("--interval", action="append", type=parse_interval, default=[], metavar="NAME=SECONDS",
+                            help=f"Daemon collector interval override ({', '.join(COLLECTOR_INTERVALS)})")
     args = parser_arg.parse_args()
 
+    if args.daemon:
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        intervals = dict(COLLECTOR_INTERVALS, **dict(args.interval))
+        json_path = Path(args.json) if args.json else DEFAULT_JSON_PATH
+        try:
+            MetricsDaemon(json_path, intervals, database=args.database, debug=args.debug).run()
+        except KeyboardInterrupt:
+            pass
+        return
+
     # Collect all data
     data = collect_all()
 
@@ -274,13 +600,8 @@ def main():
         write_json(data, json_path)
 
     if args.database:
-        # Вмъкване в базата данни (трябва да се добави пълният код на insert_* функциите)
-        conn = sqlite3.connect(DB_PATH)
-        try:
-            # Тук трябва да се извикат insert_snapshot, insert_users, insert_games
-            print("Database insertion functionality requires the full content of insert_* functions.")
-        finally:
-            conn.close()
+        # Вмъкване в SQLite историята
+        write_database(data, DB_PATH)
             
     # Ако няма подадени аргументи, по подразбиране експортира JSON
     if not args.debug and not args.json and not args.database:
@@ -3,15 +3,24 @@ import re
 import sys
 import argparse
 import json
+import asyncio
 import datetime
-import telnetlib
 from pathlib import Path
 
+from d2gs_console import poll_servers, parse_server_spec
+
 # --- CONFIG ---
 HOST = "127.0.0.1"
 PORT = 8888
 PASSWORD = "abcd123"
 
+# Всички D2GS на realm-а (питат се едновременно); "name" е ключът в JSON-а.
+# Първият е основният - неговите данни остават и на горно ниво (за уеб-а).
+SERVERS = [
+    {"name": "d2gs", "host": HOST, "port": PORT, "password": PASSWORD},
+]
+POLL_TIMEOUT = 30  # секунди за пълен цикъл на един сървър
+
 # Нов път по подразбиране за JSON експорт
 DEFAULT_JSON_PATH = Path("/var/www/html/pvpjsonstat/logs/d2gs_server_status.json")
 
@@ -30,28 +39,13 @@ CLASS_MAP = {
 def timestamp():
     return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-# --- TELNET HELPER ---
-def run_telnet_command(command):
-    try:
-        tn = telnetlib.Telnet(HOST, PORT, timeout=10)
-        tn.read_until(b"Password: ")
-        tn.write(PASSWORD.encode("ascii") + b"\n")
-        tn.read_until(b"D2GS> ")
-        tn.write(command.encode("ascii") + b"\n")
-        # Прочитане до следващия промпт или таймаут
-        output = tn.read_until(b"D2GS> ", timeout=5).decode("utf-8")
-        tn.write(b"exit\n")
-        tn.close()
-        # Премахва входния промпт и командата, връща само чистия изход
-        # Може да има вариации в промпта, така че използваме split, за да вземем последния блок
-        output_parts = output.split(f"\n{command}\n", 1)
-        if len(output_parts) > 1:
-            return output_parts[-1].strip()
-        else:
-            return output.strip()
-    except Exception as e:
-        print(f"Telnet connection failed for command '{command}': {e}", file=sys.stderr)
-        return ""
+# --- CONSOLE SWEEP ---
+async def sweep_server(console):
+    """status + gl, после всички cl + uptime: два пакета команди по една сесия."""
+    raw_status, raw_gl = await console.run_many(["status", "gl"])
+    games = parse_gl(raw_gl)
+    replies = await console.run_many([f"cl {g['game_id']}" for g in games] + ["uptime"])
+    return build_server_report(raw_status, games, replies[:-1], replies[-1])
 
 # --- PARSERS ---
 
@@ -209,6 +203,19 @@ def parse_uptime(raw_uptime):
         "uptime_duration": uptime_duration
     }
 
+def build_server_report(raw_status="", games=(), raw_cls=(), raw_uptime=""):
+    """Всички данни за един D2GS (празни стойности, ако сървърът не е отговорил)."""
+    uptime_data = parse_uptime(raw_uptime) # Връща dict с двата елемента
+    return {
+        "server_status": parse_status(raw_status),
+        "connections": parse_connections(raw_status),
+        "network": parse_network_stats(raw_status),
+        "games": list(games),
+        "characters": {g['game_id']: parse_cl(raw_cl) for g, raw_cl in zip(games, raw_cls)},
+        "uptime_duration": uptime_data["uptime_duration"], # Новият ключ за визуализация
+        "start_time": uptime_data["start_time"]          # Новият ключ за анализ
+    }
+
 # --- HELPER FUNCTION FOR JSON WRITING ---
 def write_json(data, json_path):
     """Помагателна функция за записване на JSON изхода."""
@@ -224,6 +231,7 @@ def main():
     parser.add_argument("-D", "--debug", action="store_true", help="Print debug output")
     # Променено: -J сега приема опционален път, по подразбиране е /var/www/html/d2gs_status.json
     parser.add_argument("-J", "--json", nargs='?', const=str(DEFAULT_JSON_PATH), default=None, help=f"Generate JSON file. Optional path (default: {DEFAULT_JSON_PATH})")
+    parser.add_argument("-S", "--server", action="append", metavar="NAME=HOST:PORT", help="D2GS to poll (repeatable; default: SERVERS from the config)")
     args = parser.parse_args()
     
     json_path = args.json
@@ -232,35 +240,22 @@ def main():
     if not args.debug and not args.json:
         json_path = DEFAULT_JSON_PATH
 
-    timestamp_now = timestamp()
-    
-    # --- STATUS ---
-    raw_status = run_telnet_command("status")
-    server_status = parse_status(raw_status)
-    connections = parse_connections(raw_status)
-    network = parse_network_stats(raw_status)
+    servers = [parse_server_spec(spec) for spec in args.server] if args.server else SERVERS
 
-    # --- GL/CL ---
-    raw_gl = run_telnet_command("gl")
-    games = parse_gl(raw_gl)
-    characters = {}
-    for g in games:
-        raw_cl = run_telnet_command(f"cl {g['game_id']}")
-        characters[g['game_id']] = parse_cl(raw_cl)
+    timestamp_now = timestamp()
+    results = asyncio.run(poll_servers(servers, sweep_server, timeout=POLL_TIMEOUT))
 
-    # --- UPTIME --- 
-    raw_uptime = run_telnet_command("uptime")
-    uptime_data = parse_uptime(raw_uptime) # Връща dict с двата елемента
+    reports = {}
+    for name, result in results.items():
+        if "error" in result:
+            print(f"D2GS '{name}' poll failed: {result['error']}", file=sys.stderr)
+            result = {**build_server_report(), "error": result["error"]}
+        reports[name] = result
 
     output = {
         "timestamp": timestamp_now,
-        "server_status": server_status,
-        "connections": connections,
-        "network": network,
-        "games": games,
-        "characters": characters,
-        "uptime_duration": uptime_data["uptime_duration"], # Новият ключ за визуализация
-        "start_time": uptime_data["start_time"]          # Новият ключ за анализ
+        **reports[servers[0]["name"]],
+        "servers": reports,
     }
 
     if args.debug:
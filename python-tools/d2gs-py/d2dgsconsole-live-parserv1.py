@@ -1,16 +1,19 @@
 #!/usr/bin/env python3
-import telnetlib
+import sys
 import time
 import argparse
 import re
 from datetime import datetime
 import json
 
+from d2gs_console import D2GSConsole, D2GSConsoleError
+
 # --- CONFIGURATION ---
 HOST = "127.0.0.1"
 PORT = 8888
 PASSWORD = "abcd123"
 LOOP_INTERVAL = 60  # seconds
+MAX_WAIT = 5  # seconds to wait for the "D2GS> " prompt after a command
 JSON_DIR = "/home/support/scripts-tools/pvpgn-sqlite/chatgpt/backend/data/json"
 
 # --- Class translation ---
@@ -28,10 +31,8 @@ CLASS_MAP = {
 def get_timestamp():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def fetch_status(tn):
-    tn.write(b"status\n")
-    time.sleep(1)
-    return tn.read_very_eager().decode("utf-8", errors="ignore")
+def fetch_status(console):
+    return console.run("status", allow_partial=True)
 
 def parse_status(raw_status):
     server = {}
@@ -89,10 +90,8 @@ def parse_network_stats(raw_status):
     return network_stats
 
 # --- GL/CL ---
-def fetch_gl(tn):
-    tn.write(b"gl\n")
-    time.sleep(1)
-    return tn.read_very_eager().decode("utf-8", errors="ignore")
+def fetch_gl(console):
+    return console.run("gl", allow_partial=True)
 
 def parse_gl(raw_gl):
     games = []
@@ -123,10 +122,11 @@ def parse_gl(raw_gl):
     return games
 
 
-def fetch_cl(tn, game_id):
-    tn.write(f"cl {game_id}\n".encode("ascii"))
-    time.sleep(1)
-    return tn.read_very_eager().decode("utf-8", errors="ignore")
+def fetch_cls(console, game_ids):
+    """Всички cl наведнъж (pipelined); отговорите са в реда на game_ids."""
+    if not game_ids:
+        return []
+    return console.run_many([f"cl {gid}" for gid in game_ids], allow_partial=True)
 
 def parse_cl(raw_cl):
     characters = []
@@ -151,23 +151,37 @@ def parse_cl(raw_cl):
 
 # --- MAIN ---
 def main(debug=False, json_mode=False):
-    tn = telnetlib.Telnet(HOST, PORT)
-    tn.read_until(b"Password: ")
-    tn.write(PASSWORD.encode("ascii")+b"\n")
-    tn.read_until(b"D2GS> ")
+    console = D2GSConsole(HOST, PORT, PASSWORD, command_timeout=MAX_WAIT)
 
     while True:
         timestamp = get_timestamp()
-        raw_status = fetch_status(tn)
+        sweep_start = time.perf_counter()
+        before = dict(console.stats)
+        try:
+            raw_status = fetch_status(console)
+            raw_gl = fetch_gl(console)
+            games = parse_gl(raw_gl)
+            raw_cls = fetch_cls(console, [game["game_id"] for game in games])
+        except D2GSConsoleError as e:
+            print(f"[{timestamp}] D2GS console unavailable: {e}", file=sys.stderr)
+            time.sleep(LOOP_INTERVAL)
+            continue
+
         server_status, connection_status = parse_status(raw_status)
         network_stats = parse_network_stats(raw_status)
-        raw_gl = fetch_gl(tn)
-        games = parse_gl(raw_gl)
         all_characters = {}
-        for game in games:
-            raw_cl = fetch_cl(tn, game["game_id"])
-            characters = parse_cl(raw_cl)
-            all_characters[game["game_id"]] = characters
+        for game, raw_cl in zip(games, raw_cls):
+            all_characters[game["game_id"]] = parse_cl(raw_cl)
+
+        # Метрики на цикъла: непълен отговор = промптът не дойде до MAX_WAIT
+        sweep = {
+            "duration_ms": round((time.perf_counter() - sweep_start) * 1000, 1),
+            "commands": console.stats["commands"] - before["commands"],
+            "partial_replies": console.stats["partial"] - before["partial"],
+            "reconnects": console.stats["reconnects"] - before["reconnects"],
+        }
+        if sweep["partial_replies"]:
+            print(f"[{timestamp}] WARNING: {sweep['partial_replies']} partial console replies (>{MAX_WAIT}s)", file=sys.stderr)
 
         if debug:
             print(f"\n--- [{timestamp}] SERVER STATUS ---")
@@ -182,6 +196,8 @@ def main(debug=False, json_mode=False):
             print(f"--- CHARACTERS ---")
             for gid, chars in all_characters.items():
                 print(f"Game {gid}: {chars}")
+            print(f"--- SWEEP ---")
+            print(sweep)
 
         if json_mode:
             data = {
@@ -190,7 +206,8 @@ def main(debug=False, json_mode=False):
                 "connection_status": connection_status,
                 "network_stats": network_stats,
                 "games": games,
-                "characters": all_characters
+                "characters": all_characters,
+                "sweep": sweep
             }
             filename = f"{JSON_DIR}/{timestamp.replace(' ','_').replace(':','')}.json"
             with open(filename, "w") as f:
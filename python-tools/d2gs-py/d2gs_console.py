@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Клиент за администраторската конзола на D2GS (telnet, порт 8888).
+
+Държи една отворена и автентикирана сесия вместо нова връзка + парола за
+всяка команда. Отговорът на всяка команда е текстът до следващия промпт
+"D2GS> "; run_many() праща няколко команди наведнъж (pipelining) и после
+чете толкова отговора. При прекъсната връзка клиентът се свързва отново и
+повтаря само командите без отговор.
+
+    with D2GSConsole(HOST, PORT, PASSWORD) as console:
+        raw_status = console.run("status")
+        raw_cls = console.run_many([f"cl {gid}" for gid in game_ids])
+
+AsyncD2GSConsole е asyncio вариантът; poll_servers() пита няколко D2GS
+едновременно (без telnetlib, който е премахнат в Python 3.13):
+
+    async def job(console):
+        return await console.run("status")
+    results = asyncio.run(poll_servers(SERVERS, job))   # { "gs1": "...", ... }
+"""
+import re
+import sys
+import time
+import socket
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+HOST = "127.0.0.1"
+PORT = 8888
+PASSWORD = "abcd123"
+
+PROMPT = b"D2GS> "
+PASSWORD_PROMPT = re.compile(rb"pass(word)?:\s*", re.IGNORECASE)
+
+# telnet (RFC 854): IAC + WILL/WONT/DO/DONT + option; SB ... IAC SE
+IAC, DONT, DO, WONT, WILL, SB, SE = 255, 254, 253, 252, 251, 250, 240
+
+
+class D2GSConsoleError(Exception):
+    """Конзолата не отговори (връзка, парола или таймаут) и след повторен опит."""
+
+
+class D2GSTimeout(D2GSConsoleError):
+    """Промптът не дойде до крайния срок (отговорът може да е наполовина получен)."""
+
+
+class TelnetFilter:
+    """Маха telnet преговорите от потока и отказва всички опции (като telnetlib)."""
+
+    def __init__(self):
+        self._tail = b""
+
+    def reset(self) -> None:
+        self._tail = b""
+
+    def feed(self, chunk: bytes) -> Tuple[bytes, bytes]:
+        """Връща (чистите данни, отговор за изпращане към сървъра)."""
+        data = self._tail + chunk
+        self._tail = b""
+        out = bytearray()
+        reply = bytearray()
+        i = 0
+        while i < len(data):
+            b = data[i]
+            if b != IAC:
+                out.append(b)
+                i += 1
+                continue
+            if i + 1 >= len(data):
+                self._tail = data[i:]
+                break
+            cmd = data[i + 1]
+            if cmd == IAC:
+                out.append(IAC)
+                i += 2
+            elif cmd in (WILL, WONT, DO, DONT):
+                if i + 2 >= len(data):
+                    self._tail = data[i:]
+                    break
+                opt = data[i + 2]
+                if cmd in (DO, DONT):
+                    reply += bytes((IAC, WONT, opt))
+                else:
+                    reply += bytes((IAC, DONT, opt))
+                i += 3
+            elif cmd == SB:
+                end = data.find(bytes((IAC, SE)), i + 2)
+                if end < 0:
+                    self._tail = data[i:]
+                    break
+                i = end + 2
+            else:
+                i += 2
+        return bytes(out), bytes(reply)
+
+
+def _find_marker(buf: bytearray, marker) -> Tuple[int, int]:
+    """(начало, край) на marker (bytes или компилиран regex) в buf или (-1, -1)."""
+    if isinstance(marker, bytes):
+        pos = buf.find(marker)
+        return (pos, pos + len(marker)) if pos >= 0 else (-1, -1)
+    m = marker.search(buf)
+    return (m.start(), m.end()) if m else (-1, -1)
+
+
+class D2GSConsole:
+    def __init__(self, host: str = HOST, port: int = PORT, password: str = PASSWORD,
+                 connect_timeout: float = 10, command_timeout: float = 5, retries: int = 1):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.connect_timeout = connect_timeout
+        self.command_timeout = command_timeout
+        self.retries = retries
+        self._sock: Optional[socket.socket] = None
+        self._buf = bytearray()
+        self._telnet = TelnetFilter()
+        # Броячи за мониторинг: изпратени команди, непълни отговори, повторни връзки
+        self.stats = {"commands": 0, "partial": 0, "reconnects": 0}
+
+    # --- връзка ---
+    def connect(self) -> None:
+        self.close()
+        deadline = time.monotonic() + self.connect_timeout
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+        self._read_until(PASSWORD_PROMPT, deadline)
+        self._send(self.password + "\n")
+        self._read_until(PROMPT, deadline)
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.sendall(b"exit\n")
+            except OSError:
+                pass
+            self._sock.close()
+        self._sock = None
+        self._buf.clear()
+        self._telnet.reset()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- команди ---
+    def run(self, command: str, allow_partial: bool = False) -> str:
+        return self.run_many([command], allow_partial)[0]
+
+    def run_many(self, commands: List[str], allow_partial: bool = False) -> List[str]:
+        """
+        Праща всички команди наведнъж и връща отговорите им в същия ред.
+
+        allow_partial=True: ако промптът не дойде за command_timeout, връща
+        каквото е получено (stats["partial"] += 1) и отваря нова сесия за
+        останалите команди, вместо да вдига D2GSTimeout.
+        """
+        results: List[str] = []
+        attempts = 0
+        while len(results) < len(commands):
+            pending = commands[len(results):]
+            try:
+                if self._sock is None:
+                    if attempts:
+                        self.stats["reconnects"] += 1
+                    self.connect()
+                self._send("".join(cmd + "\n" for cmd in pending))
+                for cmd in pending:
+                    self.stats["commands"] += 1
+                    try:
+                        raw = self._read_until(PROMPT, time.monotonic() + self.command_timeout)
+                    except D2GSTimeout:
+                        if not allow_partial:
+                            raise
+                        self.stats["partial"] += 1
+                        results.append(_clean_reply(bytes(self._buf), cmd))
+                        # остатъкът от отговора ще дойде по-късно - сесията е разсинхронизирана
+                        self.close()
+                        break
+                    results.append(_clean_reply(raw, cmd))
+            except (OSError, D2GSConsoleError) as e:
+                self.close()
+                attempts += 1
+                if attempts > self.retries:
+                    raise D2GSConsoleError(f"{self.host}:{self.port} '{pending[0]}': {e}") from e
+                print(f"[!] D2GS console {self.host}:{self.port} lost ({e}), reconnecting...", file=sys.stderr)
+        return results
+
+    # --- ниско ниво ---
+    def _send(self, text: str) -> None:
+        self._sock.sendall(text.encode("ascii", errors="replace"))
+
+    def _read_until(self, marker, deadline: float) -> bytes:
+        """Чете до marker (bytes или компилиран regex); връща текста преди него."""
+        while True:
+            pos, end = _find_marker(self._buf, marker)
+            if pos >= 0:
+                data = bytes(self._buf[:pos])
+                del self._buf[:end]
+                return data
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise D2GSTimeout(f"timeout waiting for {marker!r}")
+            self._sock.settimeout(remaining)
+            try:
+                chunk = self._sock.recv(4096)
+            except socket.timeout:
+                raise D2GSTimeout(f"timeout waiting for {marker!r}") from None
+            if not chunk:
+                raise D2GSConsoleError("connection closed by server")
+            data, reply = self._telnet.feed(chunk)
+            if reply:
+                self._sock.sendall(reply)
+            self._buf += data
+
+
+def _clean_reply(raw: bytes, command: str) -> str:
+    """Текстът между промптовете, без ехото на самата команда."""
+    text = raw.decode("utf-8", errors="replace").replace("\r", "")
+    lines = text.split("\n")
+    if lines and lines[0].strip() == command:
+        lines = lines[1:]
+    return "\n".join(lines).strip()
+
+
+class AsyncD2GSConsole:
+    """Същото като D2GSConsole, но с asyncio streams (за паралелно питане на няколко D2GS)."""
+
+    def __init__(self, host: str = HOST, port: int = PORT, password: str = PASSWORD,
+                 connect_timeout: float = 10, command_timeout: float = 5, retries: int = 1):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.connect_timeout = connect_timeout
+        self.command_timeout = command_timeout
+        self.retries = retries
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._buf = bytearray()
+        self._telnet = TelnetFilter()
+
+    async def connect(self) -> None:
+        await self.close()
+        try:
+            await asyncio.wait_for(self._login(), self.connect_timeout)
+        except asyncio.TimeoutError:
+            raise D2GSConsoleError("timeout during login") from None
+
+    async def _login(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        await self._read_until(PASSWORD_PROMPT)
+        await self._send(self.password + "\n")
+        await self._read_until(PROMPT)
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            try:
+                self._writer.write(b"exit\n")
+                self._writer.close()
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+        self._reader = self._writer = None
+        self._buf.clear()
+        self._telnet.reset()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def run(self, command: str) -> str:
+        return (await self.run_many([command]))[0]
+
+    async def run_many(self, commands: List[str]) -> List[str]:
+        """Праща всички команди наведнъж и връща отговорите им в същия ред."""
+        results: List[str] = []
+        attempts = 0
+        while len(results) < len(commands):
+            pending = commands[len(results):]
+            try:
+                if self._writer is None:
+                    await self.connect()
+                await self._send("".join(cmd + "\n" for cmd in pending))
+                for cmd in pending:
+                    try:
+                        raw = await asyncio.wait_for(self._read_until(PROMPT), self.command_timeout)
+                    except asyncio.TimeoutError:
+                        raise D2GSConsoleError(f"timeout waiting for {PROMPT!r}") from None
+                    results.append(_clean_reply(raw, cmd))
+            except (OSError, D2GSConsoleError) as e:
+                await self.close()
+                attempts += 1
+                if attempts > self.retries:
+                    raise D2GSConsoleError(f"{self.host}:{self.port} '{pending[0]}': {e}") from e
+                print(f"[!] D2GS console {self.host}:{self.port} lost ({e}), reconnecting...", file=sys.stderr)
+        return results
+
+    async def _send(self, text: str) -> None:
+        self._writer.write(text.encode("ascii", errors="replace"))
+        await self._writer.drain()
+
+    async def _read_until(self, marker) -> bytes:
+        while True:
+            pos, end = _find_marker(self._buf, marker)
+            if pos >= 0:
+                data = bytes(self._buf[:pos])
+                del self._buf[:end]
+                return data
+            chunk = await self._reader.read(4096)
+            if not chunk:
+                raise D2GSConsoleError("connection closed by server")
+            data, reply = self._telnet.feed(chunk)
+            if reply:
+                self._writer.write(reply)
+            self._buf += data
+
+
+def parse_server_spec(spec: str) -> Dict[str, Any]:
+    """'name=host:port' (name и port са по желание) -> {'name', 'host', 'port', 'password'}."""
+    name, sep, addr = spec.partition("=")
+    if not sep:
+        name, addr = spec, spec
+    host, _, port = addr.partition(":")
+    return {"name": name, "host": host, "port": int(port or PORT), "password": PASSWORD}
+
+
+async def poll_servers(servers: List[Dict[str, Any]], job: Callable[[AsyncD2GSConsole], Awaitable[Any]],
+                       timeout: float = 30) -> Dict[str, Any]:
+    """
+    Пуска job(console) едновременно за всеки сървър и връща { name: резултат }.
+    Общото време е колкото на най-бавния сървър; недостъпен сървър дава
+    {"error": "..."} вместо резултат и не спира останалите.
+    """
+    async def one(server):
+        console = AsyncD2GSConsole(server["host"], server["port"], server.get("password", PASSWORD))
+        try:
+            return await asyncio.wait_for(job(console), timeout)
+        except asyncio.TimeoutError:
+            return {"error": f"{server['host']}:{server['port']}: no result within {timeout}s"}
+        except (OSError, D2GSConsoleError) as e:
+            return {"error": str(e)}
+        finally:
+            await console.close()
+
+    results = await asyncio.gather(*(one(s) for s in servers))
+    return {s["name"]: r for s, r in zip(servers, results)}
+
+
+if __name__ == "__main__":
+    # Ръчна проверка: python3 d2gs_console.py status gl
+    cmds = sys.argv[1:] or ["status"]
+    with D2GSConsole() as console:
+        for cmd, out in zip(cmds, console.run_many(cmds)):
+            print(f"### {cmd}\n{out}\n")
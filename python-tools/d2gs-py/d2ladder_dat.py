@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Четене на бинарния ladder файл на d2dbs (ladder.D2DV) без d2ladder.xml.
+
+d2dbs пише XML експорта само периодично, а бинарният файл е това, което
+самият d2dbs държи актуално. Форматът (little-endian, bn_int/bn_short/bn_byte):
+
+    header:  maxtype (u32), checksum (u32)
+    index:   maxtype x { type (u32), offset (u32), number (u32) }
+    записи:  на offset, number x { experience (u32), status (u16),
+                                   level (u8), class (u8), charname[16] }
+
+Файлът се отваря с mmap и записите се декодират със struct.iter_unpack
+директно върху memoryview - без копие на данните.
+
+iter_ladder_dat() връща същото като iter_ladders() в 06_build_ladder.py:
+(ladder, chars), където ladder = {"type", "mode", "class"} и всеки char =
+{"rank", "name", "level", "experience", "class", "prefix", "status"} -
+текст, както в XML-а.
+
+    python3 d2ladder_dat.py [ladder.D2DV] [--type 27]
+"""
+import os
+import sys
+import mmap
+import json
+import struct
+from typing import Dict, Iterator, List, Tuple
+
+LADDER_DAT_FILE = "/usr/local/pvpgn/var/pvpgn/ladders/ladder.D2DV"
+
+HEADER = struct.Struct("<II")          # maxtype, checksum
+INDEX = struct.Struct("<III")          # type, offset, number
+RECORD = struct.Struct("<IHBB16s")     # experience, status, level, class, charname
+MAX_TYPES = 64                         # d2dbs има 35; повече = повреден/чужд файл
+
+CHAR_CLASSES = ["Amazon", "Sorceress", "Necromancer", "Paladin", "Barbarian", "Druid", "Assassin"]
+FEMALE_CLASSES = {0, 1, 6}
+
+# тип -> (режим, начало на групата); класът на ladder-а е type - начало
+LADDER_MODES = [(27, "Expansion"), (19, "Expansion HC"), (9, "Standard"), (0, "Hardcore")]
+LADDER_CLASSES = ["OverAll"] + CHAR_CLASSES
+
+# титли по трудност (1..3) - (мъжка, женска)
+PREFIXES = {
+    # (expansion, hardcore)
+    (False, False): [("Sir", "Dame"), ("Lord", "Lady"), ("Baron", "Baroness")],
+    (False, True): [("Count", "Countess"), ("Duke", "Duchess"), ("King", "Queen")],
+    (True, False): [("Slayer", "Slayer"), ("Champion", "Champion"), ("Patriarch", "Matriarch")],
+    (True, True): [("Destroyer", "Destroyer"), ("Conqueror", "Conqueror"), ("Guardian", "Guardian")],
+}
+
+# charstatus битове (d2cs)
+STATUS_HARDCORE = 0x04
+STATUS_DEAD = 0x08
+STATUS_EXPANSION = 0x20
+
+
+def ladder_info(type_id: int) -> Dict[str, str]:
+    for start, mode in LADDER_MODES:
+        if type_id >= start:
+            index = type_id - start
+            cls = LADDER_CLASSES[index] if index < len(LADDER_CLASSES) else ""
+            return {"type": str(type_id), "mode": mode, "class": cls}
+    return {"type": str(type_id), "mode": "", "class": ""}
+
+
+def char_prefix(status: int, chclass: int) -> str:
+    expansion = bool(status & STATUS_EXPANSION)
+    hardcore = bool(status & STATUS_HARDCORE)
+    # прогресът (завършени актове) е в битове 8-11: 5 акта на трудност в LoD, 4 в classic
+    difficulty = min(((status >> 8) & 0x0f) // (5 if expansion else 4), 3)
+    if not difficulty:
+        return ""
+    male, female = PREFIXES[(expansion, hardcore)][difficulty - 1]
+    return female if chclass in FEMALE_CLASSES else male
+
+
+def _decode_chars(view: memoryview) -> List[Dict[str, str]]:
+    chars = []
+    for experience, status, level, chclass, raw_name in RECORD.iter_unpack(view):
+        name = raw_name.split(b"\0", 1)[0].decode("latin-1")
+        if not name:
+            continue  # празно място в ladder-а
+        chars.append({
+            "rank": str(len(chars) + 1),
+            "name": name,
+            "level": str(level),
+            "experience": str(experience),
+            "class": CHAR_CLASSES[chclass] if chclass < len(CHAR_CLASSES) else str(chclass),
+            "prefix": char_prefix(status, chclass),
+            "status": "dead" if status & STATUS_HARDCORE and status & STATUS_DEAD else "alive",
+        })
+    return chars
+
+
+def iter_ladder_dat(path: str = LADDER_DAT_FILE) -> Iterator[Tuple[Dict[str, str], List[Dict[str, str]]]]:
+    """(ladder, chars) за всеки тип в index-а; ValueError при повреден файл."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size:
+            raise ValueError(f"{path}: too short for a ladder header ({size} bytes)")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as buf:
+            maxtype, _checksum = HEADER.unpack_from(buf, 0)
+            index_end = HEADER.size + maxtype * INDEX.size
+            if maxtype > MAX_TYPES or index_end > size:
+                raise ValueError(f"{path}: bad ladder header (maxtype={maxtype})")
+
+            ladders = []
+            for type_id, offset, number in INDEX.iter_unpack(buf[HEADER.size:index_end]):
+                end = offset + number * RECORD.size
+                if end > size:
+                    raise ValueError(f"{path}: ladder type {type_id} points past end of file")
+                ladders.append((ladder_info(type_id), _decode_chars(buf[offset:end])))
+    # mmap се затваря преди yield - потребителят може да държи генератора колкото иска
+    yield from ladders
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Dump the d2dbs binary ladder as JSON.")
+    parser.add_argument("path", nargs="?", default=LADDER_DAT_FILE)
+    parser.add_argument("--type", type=int, help="only this ladder type (e.g. 27)")
+    args = parser.parse_args()
+
+    out = [{**ladder, "chars": chars} for ladder, chars in iter_ladder_dat(args.path)
+           if args.type is None or ladder["type"] == str(args.type)]
+    json.dump(out, sys.stdout, ensure_ascii=False, indent=2)
+    print()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Бързо четене на заглавието и статистиките ("gf") на D2S (charsave, v96).
+
+D2SFile декодира всички предмети, а повечето справки искат само име, клас,
+ниво, hardcore/ladder, прогрес и атрибутите. Тук се чете само началото на
+файла (HEAD_READ байта): фиксираното заглавие със struct, а "gf" блокът е
+битов поток (9-битов id + стойност с ширина по ItemStatCost.txt), който се
+обръща в едно int и се реже с готови маски - без обхождане бит по бит.
+
+Полетата са със същите имена като при D2SFile (char_name, char_class,
+char_level, is_hardcore, is_ladder, progression, attributes, ...), така че
+getattr(d2s, ...) в скриптовете работи и с двете.
+
+    from d2s_header import read_d2s_header
+    hdr = read_d2s_header(path)
+    hdr.char_name, hdr.char_level, hdr.attributes["strength"]
+    d2s = hdr.full()      # пълен D2SFile (предмети) - само ако трябва
+
+    python3 d2s_header.py [CHAR_DIR | файл ...]
+"""
+import os
+import sys
+import json
+import struct
+from typing import Any, Dict, Iterator, List, Optional
+
+CHAR_DIR = "/usr/local/pvpgn/var/pvpgn/charsave"
+# КЛЮЧОВИЯТ ПЪТ КЪМ TXT ФАЙЛОВЕТЕ (само за full())
+D2_DATA_DIR = "/home/support/scripts-tools/d2cpp/pvpgnjsonstat/d2gs/items/"
+
+D2S_MAGIC = 0xAA55AA55
+D2S_VERSION = 96                       # 1.10 - 1.14
+# magic, version, filesize, checksum, active weapon, name[16], status, progression,
+# ?, class, ?, level, created, last played
+HEADER = struct.Struct("<IIIII16sBBHBHBII")
+STATS_OFFSET = 765                     # "gf" при v96
+SKILLS_LEN = 30
+# заглавие + "gf" (16 стата x най-много 41 бита) с резерв
+HEAD_READ = 1024
+
+CHAR_CLASSES = ["Amazon", "Sorceress", "Necromancer", "Paladin", "Barbarian", "Druid", "Assassin"]
+
+STATUS_HARDCORE = 0x04
+STATUS_DIED = 0x08
+STATUS_EXPANSION = 0x20
+STATUS_LADDER = 0x40
+
+# stat id -> (име като в D2SFile.attributes, ширина в битове от ItemStatCost.txt CSvBits)
+STAT_FIELDS = {
+    0: ("strength", 10),
+    1: ("energy", 10),
+    2: ("dexterity", 10),
+    3: ("vitality", 10),
+    4: ("unused_stats", 10),
+    5: ("unused_skills", 8),
+    6: ("current_hp", 21),
+    7: ("max_hp", 21),
+    8: ("current_mana", 21),
+    9: ("max_mana", 21),
+    10: ("current_stamina", 21),
+    11: ("max_stamina", 21),
+    12: ("level", 7),
+    13: ("experience", 32),
+    14: ("gold", 25),
+    15: ("stashed_gold", 25),
+}
+# живот/мана/стамина са с фиксирана запетая (8 бита дроб)
+FIXED_POINT_STATS = {6, 7, 8, 9, 10, 11}
+STAT_ID_BITS = 9
+STATS_END = (1 << STAT_ID_BITS) - 1
+MASKS = [(1 << n) - 1 for n in range(33)]
+
+
+class D2SHeader:
+    """Заглавието и атрибутите на един D2S; items_offset сочи "JM" блока с предметите."""
+
+    def __init__(self, path: str, data: memoryview):
+        self.path = path
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path}: too short for a D2S header ({len(data)} bytes)")
+        (magic, self.version, self.file_size, self.checksum, _weapon, raw_name, status,
+         self.progression, _, chclass, _, self.char_level, _, last_played) = HEADER.unpack_from(data, 0)
+        if magic != D2S_MAGIC:
+            raise ValueError(f"{path}: not a D2S file (magic {magic:#x})")
+        if self.version != D2S_VERSION:
+            raise ValueError(f"{path}: unsupported D2S version {self.version}")
+
+        self.char_name = raw_name.split(b"\0", 1)[0].decode("latin-1")
+        self.status = status
+        self.is_hardcore = bool(status & STATUS_HARDCORE)
+        self.is_died = bool(status & STATUS_DIED)
+        self.is_dead = self.is_hardcore and self.is_died
+        self.is_expansion = bool(status & STATUS_EXPANSION)
+        self.is_ladder = bool(status & STATUS_LADDER)
+        self.char_class_id = chclass
+        self.char_class = CHAR_CLASSES[chclass] if chclass < len(CHAR_CLASSES) else str(chclass)
+        self.last_played = last_played
+
+        self.attributes: Dict[str, Any] = {}
+        self.skills: List[int] = []
+        self.items_offset: Optional[int] = None
+        self._parse_stats(data)
+        self._full = None
+
+    def _parse_stats(self, data: memoryview) -> None:
+        if bytes(data[STATS_OFFSET:STATS_OFFSET + 2]) != b"gf":
+            raise ValueError(f"{self.path}: stats section ('gf') not found at {STATS_OFFSET}")
+        start = STATS_OFFSET + 2
+        bits = int.from_bytes(data[start:], "little")
+        pos = 0
+        attributes = {}
+        while True:
+            stat_id = (bits >> pos) & STATS_END
+            pos += STAT_ID_BITS
+            if stat_id == STATS_END:
+                break
+            field = STAT_FIELDS.get(stat_id)
+            if field is None:
+                raise ValueError(f"{self.path}: unknown stat id {stat_id} in 'gf' section")
+            name, width = field
+            value = (bits >> pos) & MASKS[width]
+            pos += width
+            attributes[name] = value / 256 if stat_id in FIXED_POINT_STATS else value
+        self.attributes = attributes
+
+        # след "gf" (до байт) идва "if" + 30 байта умения, после "JM" с предметите
+        skills_at = start + (pos + 7) // 8
+        if bytes(data[skills_at:skills_at + 2]) == b"if" and len(data) >= skills_at + 2 + SKILLS_LEN:
+            self.skills = list(data[skills_at + 2:skills_at + 2 + SKILLS_LEN])
+            self.items_offset = skills_at + 2 + SKILLS_LEN
+
+    def full(self):
+        """Пълният D2SFile (с предметите) - зарежда d2lib и декодира файла при първо извикване."""
+        if self._full is None:
+            os.environ.setdefault('D2_DATA_PATH', D2_DATA_DIR)
+            from d2lib.files import D2SFile
+            self._full = D2SFile(self.path)
+        return self._full
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "char_name": self.char_name,
+            "char_class": self.char_class,
+            "char_level": self.char_level,
+            "is_hardcore": self.is_hardcore,
+            "is_dead": self.is_dead,
+            "is_expansion": self.is_expansion,
+            "is_ladder": self.is_ladder,
+            "progression": self.progression,
+            "last_played": self.last_played,
+            "attributes": self.attributes,
+        }
+
+
+def read_d2s_header(path: str) -> D2SHeader:
+    """Чете само началото на файла; ValueError, ако не е D2S v96."""
+    with open(path, "rb") as f:
+        data = f.read(HEAD_READ)
+    with memoryview(data) as view:
+        return D2SHeader(path, view)
+
+
+def iter_d2s_headers(char_dir: str = CHAR_DIR) -> Iterator[D2SHeader]:
+    """Заглавията на всички файлове в charsave (по име); нечетимите се пропускат с [!]."""
+    with os.scandir(char_dir) as it:
+        entries = sorted((e for e in it if e.is_file()), key=lambda e: e.name)
+    for entry in entries:
+        try:
+            yield read_d2s_header(entry.path)
+        except (OSError, ValueError) as e:
+            print(f"[!] {entry.name}: {e}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    targets = sys.argv[1:] or [CHAR_DIR]
+    out = []
+    for target in targets:
+        if os.path.isdir(target):
+            out.extend(h.as_dict() for h in iter_d2s_headers(target))
+        else:
+            out.append(read_d2s_header(target).as_dict())
+    json.dump(out, sys.stdout, ensure_ascii=False, indent=2)
+    print()
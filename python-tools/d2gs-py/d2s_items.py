@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Лениво обхождане на предметите на героя от "JM" блока на D2S (v96).
+
+При v96 всеки предмет (и всеки поставен в гнездо) започва на цял байт с
+"JM", а първите 111 бита са фиксирано заглавие: флагове, местоположение,
+панел, 4-буквен код и брой запълнени гнезда. Тук се чете само то:
+  - кодът се взима от заглавието и филтърът (codes=) се прилага веднага;
+  - краят на предмета е следващото валидно "JM" заглавие, така че
+    свойствата (афиксите) изобщо не се декодират;
+  - поставените в гнездо (location 6) идват след родителя си и се
+    пропускат, освен ако include_socketed=True.
+Обхожда се само списъкът на героя (без труп и наемник).
+
+    from d2s_items import iter_items, read_char_items, RUNE_CODES
+    for item in iter_items(path, codes=RUNE_CODES):
+        item.name, item.is_in_stash
+    hdr, runes = read_char_items(path, codes=RUNE_CODES)   # + hdr.char_name, ...
+
+За пълните свойства - D2SHeader.full() (d2lib).
+"""
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from d2s_header import D2SHeader
+
+LIST_MAGIC = b"JM"
+SIMPLE_ITEM_LEN = 14                   # най-късият предмет (руни, отвари, скъпоценни камъни)
+ITEM_VERSIONS = {100, 101}
+CODE_RE = re.compile(rb"[a-z0-9]{3} ")
+
+# location_id
+LOC_STORED, LOC_EQUIPPED, LOC_BELT, LOC_CURSOR, LOC_SOCKETED = 0, 1, 2, 4, 6
+# panel (alt position) при LOC_STORED
+PANEL_INVENTORY, PANEL_CUBE, PANEL_STASH = 1, 4, 5
+
+RUNE_NAMES = {
+    f"r{i:02d}": f"{name} Rune" for i, name in enumerate(
+        ["El", "Eld", "Tir", "Nef", "Eth", "Ith", "Tal", "Ral", "Ort", "Thul", "Amn", "Sol",
+         "Shael", "Dol", "Hel", "Io", "Lum", "Ko", "Fal", "Lem", "Pul", "Um", "Mal", "Ist",
+         "Gul", "Vex", "Ohm", "Lo", "Sur", "Ber", "Jah", "Cham", "Zod"], start=1)
+}
+RUNE_CODES = frozenset(RUNE_NAMES)
+
+
+def _bit(v: int, pos: int) -> bool:
+    return bool((v >> pos) & 1)
+
+
+class D2SItem:
+    """Само фиксираното заглавие на предмета; raw са байтовете му (до следващия предмет)."""
+
+    __slots__ = ("code", "offset", "raw", "is_identified", "has_sockets", "is_ear", "is_simple",
+                 "is_ethereal", "is_personalized", "is_runeword", "location_id", "equipped_id",
+                 "x", "y", "panel", "socketed_count", "parent")
+
+    def __init__(self, code: str, offset: int, header: int):
+        self.code = code
+        self.offset = offset
+        self.raw = b""
+        self.is_identified = _bit(header, 20)
+        self.has_sockets = _bit(header, 27)
+        self.is_ear = _bit(header, 32)
+        self.is_simple = _bit(header, 37)
+        self.is_ethereal = _bit(header, 38)
+        self.is_personalized = _bit(header, 40)
+        self.is_runeword = _bit(header, 42)
+        self.location_id = (header >> 58) & 0x7
+        self.equipped_id = (header >> 61) & 0xf
+        self.x = (header >> 65) & 0xf
+        self.y = (header >> 69) & 0xf
+        self.panel = (header >> 73) & 0x7
+        self.socketed_count = 0 if self.is_ear else (header >> 108) & 0x7
+        self.parent: Optional[str] = None  # кодът на предмета с гнездото
+
+    @property
+    def name(self) -> str:
+        return RUNE_NAMES.get(self.code, self.code)
+
+    @property
+    def is_rune(self) -> bool:
+        return self.code in RUNE_CODES
+
+    @property
+    def is_socketed(self) -> bool:
+        """Поставен в гнездо на друг предмет (не "има гнезда" - за това е has_sockets)."""
+        return self.location_id == LOC_SOCKETED
+
+    @property
+    def is_in_stash(self) -> bool:
+        return self.location_id == LOC_STORED and self.panel == PANEL_STASH
+
+    @property
+    def is_in_cube(self) -> bool:
+        return self.location_id == LOC_STORED and self.panel == PANEL_CUBE
+
+    def __repr__(self) -> str:
+        return f"<D2SItem {self.code} @{self.offset} loc={self.location_id} panel={self.panel}>"
+
+
+def _item_header(data: bytes, pos: int) -> Optional[int]:
+    """Заглавието (първите SIMPLE_ITEM_LEN байта като int), ако на pos започва предмет."""
+    if data[pos:pos + 2] != LIST_MAGIC or pos + SIMPLE_ITEM_LEN > len(data):
+        return None
+    header = int.from_bytes(data[pos:pos + SIMPLE_ITEM_LEN], "little")
+    if ((header >> 48) & 0x3ff) not in ITEM_VERSIONS:
+        return None
+    if _bit(header, 32):  # ухо - без код
+        return header
+    if not CODE_RE.fullmatch(((header >> 76) & 0xffffffff).to_bytes(4, "little")):
+        return None
+    return header
+
+
+def _item_code(header: int) -> str:
+    if _bit(header, 32):
+        return "ear"
+    return ((header >> 76) & 0xffffffff).to_bytes(4, "little").decode("ascii").rstrip()
+
+
+def _next_item(data: bytes, start: int) -> int:
+    """Началото на следващия предмет след start, на списъка след него ("JM" на трупа) или края."""
+    pos = data.find(LIST_MAGIC, start + SIMPLE_ITEM_LEN)
+    while pos != -1:
+        if _item_header(data, pos) is not None:
+            return pos
+        # заглавие на следващия списък: "JM" + брой, после "jf"/"JM"/край на файла
+        if data[pos + 4:pos + 6] in (b"jf", LIST_MAGIC) or pos + 4 == len(data):
+            return pos
+        pos = data.find(LIST_MAGIC, pos + 1)  # "JM" вътре в данните на предмета
+    return len(data)
+
+
+def iter_items(path: str, codes: Optional[Iterable[str]] = None, include_socketed: bool = False,
+               data: Optional[bytes] = None) -> Iterator[D2SItem]:
+    """
+    Предметите на героя по реда във файла. codes - само тези кодове (филтър по
+    заглавието, без декодиране на свойства). Поставените в гнездо се връщат
+    (след родителя си, с .parent = кода му) само при include_socketed=True.
+    """
+    if data is None:
+        with open(path, "rb") as f:
+            data = f.read()
+    with memoryview(data) as view:
+        hdr = D2SHeader(path, view)
+    return _walk_items(path, data, hdr.items_offset, codes, include_socketed)
+
+
+def read_char_items(path: str, codes: Optional[Iterable[str]] = None,
+                    include_socketed: bool = False) -> Tuple[D2SHeader, List[D2SItem]]:
+    """Заглавието на героя (име, клас, ...) и предметите му с едно четене на файла."""
+    with open(path, "rb") as f:
+        data = f.read()
+    with memoryview(data) as view:
+        hdr = D2SHeader(path, view)
+    return hdr, list(_walk_items(path, data, hdr.items_offset, codes, include_socketed))
+
+
+def _walk_items(path: str, data: bytes, pos: Optional[int], codes: Optional[Iterable[str]],
+                include_socketed: bool) -> Iterator[D2SItem]:
+    if pos is None or data[pos:pos + 2] != LIST_MAGIC:
+        raise ValueError(f"{path}: item list ('JM') not found")
+    wanted = frozenset(codes) if codes is not None else None
+
+    remaining = int.from_bytes(data[pos + 2:pos + 4], "little")   # без поставените в гнезда
+    pos += 4
+    parent, children_left = None, 0
+    while remaining or children_left:
+        header = _item_header(data, pos)
+        if header is None:
+            raise ValueError(f"{path}: no item header at offset {pos}")
+        end = _next_item(data, pos)
+        code = _item_code(header)
+
+        is_child = children_left > 0
+        if is_child:
+            children_left -= 1
+        else:
+            remaining -= 1
+
+        if (include_socketed or not is_child) and (wanted is None or code in wanted):
+            item = D2SItem(code, pos, header)
+            item.raw = data[pos:end]
+            if is_child:
+                item.parent = parent
+            yield item
+
+        if not is_child:
+            parent = code
+            # у ухото битове 108-110 са част от името, не брой гнезда
+            children_left = 0 if _bit(header, 32) or _bit(header, 37) else (header >> 108) & 0x7
+        pos = end
+
+
+def count_runes(path: str) -> Dict[str, int]:
+    """{"Jah Rune": 2, ...} - свободните руни на един герой."""
+    counts: Dict[str, int] = {}
+    for item in iter_items(path, codes=RUNE_CODES):
+        counts[item.name] = counts.get(item.name, 0) + 1
+    return counts
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="List the items of a D2S save from the item headers only.")
+    parser.add_argument("path")
+    parser.add_argument("--code", action="append", help="only these item codes (repeatable)")
+    parser.add_argument("--runes", action="store_true", help="only runes (r01-r33)")
+    parser.add_argument("--socketed", action="store_true", help="include items placed in sockets")
+    args = parser.parse_args()
+
+    codes = RUNE_CODES if args.runes else args.code
+    for item in iter_items(args.path, codes=codes, include_socketed=args.socketed):
+        where = "socketed in " + item.parent if item.is_socketed else \
+            "stash" if item.is_in_stash else "cube" if item.is_in_cube else f"location {item.location_id}"
+        print(f"{item.offset:6d}  {item.code:<4} {item.name:<12} {where}")
@@ -1,15 +1,16 @@
 #!/usr/bin/env python3
 import re
 import json
-import subprocess
 import os # NEW: Added for file path operations
 import sys # NEW: Added for error output
-from datetime import datetime, timezone # MODIFIED: Added timezone
+from datetime import datetime, timedelta, timezone # MODIFIED: Added timezone
+
+from log_tailer import load_state, save_state, read_new_lines
 
 # ---- CONFIG ----
 BNETD_LOG = "/usr/local/pvpgn/var/pvpgn/logs/bnetd.log"
 D2CS_LOG  = "/usr/local/pvpgn/var/pvpgn/logs/d2cs.log"
-LINES = 1000
+LINES = 1000  # само при първо пускане (няма state): започва от последните LINES реда
 TIME_FMT = "%b %d %H:%M:%S"
 CURRENT_YEAR = datetime.now().year
 
@@ -20,16 +21,27 @@ FULL_GAMES_OUTPUT_PATH = os.path.join(OUTPUT_DIR, 'active_games.json')
 RECENT_GAMES_OUTPUT_PATH = os.path.join(OUTPUT_DIR, 'recent_games.json')
 RECENT_GAMES_COUNT = 100 # Брой последни унищожени игри за втория файл
 
+# --- INCREMENTAL STATE ---
+# Offset-ите в логовете + състоянието на игрите между пусканията: всяко
+# пускане чете само новите редове (вместо tail -n 1000 | grep всеки път).
+STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "pvpgn_log_state.json")
+KEEP_DESTROYED = 500     # колко унищожени игри се помнят
+STALE_AFTER_HOURS = 48   # неунищожена игра без активност толкова време се изтрива
+D2CS_FILTER = re.compile(r"\[info")
+BNETD_FILTER = re.compile(r"\[(info|debug|trace)")
+
 
 # ---- STATE ----
-games = {}
-char_account = {}
+state = load_state(STATE_FILE)
+games = state.setdefault("games", {})
+char_account = state.setdefault("char_account", {})
+file_positions = state.setdefault("files", {})
 
 # ---- HELPERS ----
 def tail(file, regex):
-    cmd = f"tail -n {LINES} {file} | grep -E '{regex}'"
-    out = subprocess.getoutput(cmd)
-    return out.splitlines() if out else []
+    """Новите редове от file (след последното пускане), филтрирани с regex."""
+    pos = file_positions.setdefault(file, {})
+    return [line for line in read_new_lines(file, pos, bootstrap_lines=LINES) if regex.search(line)]
 
 def parse_ts(line):
     dt = datetime.strptime(line[:15], TIME_FMT)
@@ -41,11 +53,36 @@ def get_game(name):
         "players": {}
     })
 
+def new_game(name):
+    """Създаване на игра: името може да се ползва отново след game_destroy."""
+    g = games.get(name)
+    if g and g.get("state") == "destroyed":
+        # старата (приключила) игра остава за recent_games под уникален ключ
+        g["name"] = name
+        games[f"{name}@{g.get('destroyed_at', '')}"] = games.pop(name)
+    return get_game(name)
+
+def last_activity(g):
+    stamps = [v for k, v in g.items() if k.endswith("_at")]
+    for p in g["players"].values():
+        stamps += [v for k, v in p.items() if k.endswith("_at")]
+    return max(stamps) if stamps else ""
+
+def prune_games():
+    """Пази последните KEEP_DESTROYED унищожени игри и маха забравените активни."""
+    destroyed = sorted((n for n, g in games.items() if g.get("state") == "destroyed"),
+                       key=lambda n: games[n].get("destroyed_at", ""), reverse=True)
+    for name in destroyed[KEEP_DESTROYED:]:
+        del games[name]
+    cutoff = (datetime.now() - timedelta(hours=STALE_AFTER_HOURS)).isoformat()
+    for name in [n for n, g in games.items() if g.get("state") != "destroyed" and last_activity(g) < cutoff]:
+        del games[name]
+
 # =========================
 # d2cs.log  (INFO)
 # ... (Останалата логика за парсване остава непроменена)
 # =========================
-for line in tail(D2CS_LOG, r"\[info"):
+for line in tail(D2CS_LOG, D2CS_FILTER):
     try:
         ts = parse_ts(line)
     except Exception:
@@ -57,7 +94,7 @@ for line in tail(D2CS_LOG, r"\[info"):
         if not m:
             continue
         game = m.group(1)
-        g = get_game(game)
+        g = new_game(game)
         g["created_at"] = ts
         g["state"] = "created"
 
@@ -91,7 +128,7 @@ for line in tail(D2CS_LOG, r"\[info"):
 # =========================
 # bnetd.log (INFO|DEBUG|TRACE)
 # =========================
-for line in tail(BNETD_LOG, r"\[(info|debug|trace)"):
+for line in tail(BNETD_LOG, BNETD_FILTER):
     try:
         ts = parse_ts(line)
     except Exception:
@@ -103,7 +140,7 @@ for line in tail(BNETD_LOG, r"\[(info|debug|trace)"):
         if not m:
             continue
         game = m.group(1)
-        g = get_game(game)
+        g = new_game(game)
         g["requested_at"] = ts
         g["state"] = "requested"
 
@@ -154,6 +191,12 @@ for g in games.values():
         if "account" not in p:
             p["account"] = char_account.get(char)
 
+prune_games()
+try:
+    save_state(STATE_FILE, state)
+except OSError as e:
+    print(f"ERROR: Failed to save log state to {STATE_FILE}: {e}", file=sys.stderr)
+
 # =========================
 # NEW: OUTPUT TO TWO JSON FILES
 # =========================
@@ -178,7 +221,7 @@ for game_name, game_data in games.items():
     if game_data.get('state') == 'destroyed' and game_data.get('destroyed_at'):
         # Копираме данните и добавяме името на играта
         game_data_copy = game_data.copy()
-        game_data_copy['name'] = game_name
+        game_data_copy.setdefault('name', game_name)
         destroyed_games_list.append(game_data_copy)
 
 # 2. Sort destroyed games by 'destroyed_at' (newest first)
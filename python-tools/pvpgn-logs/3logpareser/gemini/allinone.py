@@ -1,18 +1,28 @@
+import os
 import re
+import sys
 import json
+import heapq
 from datetime import datetime, timedelta
 from collections import defaultdict
+from operator import itemgetter
 
 # --- КОНФИГУРАЦИЯ И КОНСТАНТИ ---
 OUTPUT_FILE = "/var/www/html/pvpjsonstat/new/testalllogs.json"
 BNETD_LOG_PATH = "/usr/local/pvpgn/var/pvpgn/logs/bnetd.log"
-D2GS_LOG_PATH = "/var/snap/docker/common/var-lib-docker/overlay2/e1efc394f148bc384bd68e45a1be13c240d75d8f3b64445962438720d6d0346e/diff/root/.wine/drive_c/d2gs/d2gs.log" 
 D2CS_LOG_PATH = "/usr/local/pvpgn/var/pvpgn/logs/d2cs.log"
+# d2gs.log е в overlay2 на контейнера и пътят се сменя при пресъздаване -
+# намира се от d2gs_log_locator (кеширан път, метаданни на контейнера)
+PVPGN_LOGS_DIR = "/home/support/scripts-tools/d2cpp/python-tools/pvpgn-logs"
+sys.path.insert(0, PVPGN_LOGS_DIR)
+from d2gs_log_locator import find_d2gs_log
+from event_store import EventStore
+
+# Колонно хранилище за game_events (общо с log_parser_focused.py)
+EVENT_STORE_DIR = os.path.join(PVPGN_LOGS_DIR, "cache", "events")
 
 
 YEAR = 2025 
-DATE_FORMAT_BNETD = "%b %d %H:%M:%S"
-DATE_FORMAT_D2GS = "%m/%d %H:%M:%S.%f"
 GHOST_TIMEOUT = timedelta(hours=6)
 
 # Платформа/Тип Клиент
@@ -43,21 +53,26 @@ parsed_data = {
 }
 
 game_name_counts = defaultdict(int)
-active_games = {} # Key: game_name, Value: unique_game_id
+active_games = {} # Key: game_name, Value: unique_game_id (последната игра с това име)
 
 # --- ПОМОЩНИ ФУНКЦИИ ---
 
+MONTHS = {m: i for i, m in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], 1)}
+
 def parse_bnetd_timestamp(ts_str):
+    """'Dec 18 17:57:38' (bnetd/d2cs) -> unix ts; по фиксирани позиции, без strptime."""
     try:
-        dt_obj_no_year = datetime.strptime(ts_str, DATE_FORMAT_BNETD)
-        return dt_obj_no_year.replace(year=YEAR)
-    except ValueError:
+        return datetime(YEAR, MONTHS[ts_str[0:3]], int(ts_str[4:6]),
+                        int(ts_str[7:9]), int(ts_str[10:12]), int(ts_str[13:15])).timestamp()
+    except (KeyError, ValueError):
         return None
 
 def parse_d2gs_timestamp(ts_str):
+    """'12/18 17:57:38' (d2gs, без милисекундите) -> unix ts."""
     try:
-        dt_obj_no_year = datetime.strptime(ts_str, DATE_FORMAT_D2GS)
-        return dt_obj_no_year.replace(year=YEAR)
+        return datetime(YEAR, int(ts_str[0:2]), int(ts_str[3:5]), int(ts_str[6:8]),
+                        int(ts_str[9:11]), int(ts_str[12:14])).timestamp()
     except ValueError:
         return None
 
@@ -81,208 +96,219 @@ def get_platform_from_line(line):
         return match.group(1).strip()
     return "Unknown/N/A"
 
-# --- ПАРСЕРИ ---
-
-def parse_bnetd_log(file_path):
-    RE_CREATE = re.compile(r"(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}).*game_create: game \"(.*?)\" \(pass \"(.*?)\"\).*type (\d+).*created")
-    RE_DESTROY = re.compile(r"(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}).*game_destroy: game deleted")
-    
-    current_game_name = None
-    
+def close_game(game_id, ts):
+    game = parsed_data["games"][game_id]
+    if game["end_ts"] is None:
+        game["end_ts"] = ts
+        game["duration_secs"] = round(ts - game["start_ts"], 2)
+        game["is_active"] = False
+
+# --- ЧЕТЕНЕ НА ЛОГОВЕТЕ ---
+# Всеки ред се разбива веднъж: времето е на фиксирани позиции, после
+# "функция: съобщение". Трите лога се сливат по време (heapq.merge) и се
+# обработват в един проход, така че create/enter/destroy от различните
+# логове идват в реалния си ред.
+
+def read_pvpgn_log(file_path, source, functions):
+    """bnetd.log / d2cs.log: 'Dec 18 17:57:38 [info ] function: message'."""
+    ts_str, ts = None, None
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
             for line in f:
-                line = line.strip()
-                if not line: continue
-                
-                match_date = re.match(r"(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})", line)
-                if not match_date: continue
-                timestamp = parse_bnetd_timestamp(match_date.group(1))
-                if not timestamp: continue
-
-                match = RE_CREATE.search(line)
-                if match:
-                    game_name = match.group(2)
-                    game_id = get_unique_game_id(game_name, create=True)
-                    current_game_name = game_name
-                    
-                    parsed_data["games"][game_id] = {
-                        "game_id": game_id,
-                        "name": game_name,
-                        "length_chars": len(game_name),
-                        "platform_type": get_platform_from_line(line), # НОВО: Платформа/Тип
-                        "game_type": int(match.group(4)),
-                        "start_ts": timestamp.timestamp(),
-                        "end_ts": None,
-                        "duration_secs": None,
-                        "is_active": True, # НОВО: Активна по дефиниция
-                        "source_logs": ["bnetd"]
-                    }
-                    active_games[game_name] = game_id
-
-                match = RE_DESTROY.search(line)
-                if match and current_game_name in active_games:
-                    game_id = active_games[current_game_name]
-                    game = parsed_data["games"][game_id]
-                    
-                    if game["end_ts"] is None:
-                        game["end_ts"] = timestamp.timestamp()
-                        duration = game["end_ts"] - game["start_ts"]
-                        game["duration_secs"] = round(duration, 2)
-                        game["is_active"] = False
-                        
-                    del active_games[current_game_name]
-                    current_game_name = None
-                    
+                start = 16
+                if line[start:start + 1] == "[":
+                    start = line.find("] ", start) + 2
+                    if start == 1: continue
+                sep = line.find(": ", start)
+                if sep < 0: continue
+                function = line[start:sep]
+                if function not in functions: continue
+
+                if line[:15] != ts_str:
+                    ts_str = line[:15]
+                    ts = parse_bnetd_timestamp(ts_str)
+                if ts is None: continue
+                yield ts, source, function, line[sep + 2:].rstrip()
     except FileNotFoundError:
-        print(f"Грешка: BNETD лог файлът не беше намерен на {file_path}")
-    except Exception as e:
-        print(f"Грешка при парсване на BNETD лога: {e}")
-
-
-def parse_d2cs_log(file_path):
-    # D2CS логиката за CREAT/DESTROY не се променя, но добавя source_logs и is_active=False
-    RE_CREATE = re.compile(r"(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}).*d2cs_game_create: game (\S+).*created")
-    RE_DESTROY = re.compile(r"(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}).*game_destroy: game (\S+) removed from game list")
+        print(f"Грешка: {source.upper()} лог файлът не беше намерен на {file_path}")
 
+def read_d2gs_log(file_path, functions):
+    """d2gs.log: '12/18 17:57:38.123 D2GSCBEnterGame: message'."""
+    ts_str, ts = None, None
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
             for line in f:
-                line = line.strip()
-                if not line: continue
-                
-                match_date = re.match(r"(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})", line)
-                if not match_date: continue
-                timestamp = parse_bnetd_timestamp(match_date.group(1))
-                if not timestamp: continue
-                
-                # 1. СЪЗДАВАНЕ НА ИГРА (D2CS)
-                match = RE_CREATE.search(line)
-                if match:
-                    game_name = match.group(2)
-                    game_id = get_unique_game_id(game_name, create=True)
-                    
-                    if game_id not in parsed_data["games"]:
-                        parsed_data["games"][game_id] = {
-                            "game_id": game_id,
-                            "name": game_name,
-                            "length_chars": len(game_name),
-                            "platform_type": "Unknown/D2CS",
-                            "game_type": None,
-                            "start_ts": timestamp.timestamp(),
-                            "end_ts": None,
-                            "duration_secs": None,
-                            "is_active": True,
-                            "source_logs": ["d2cs"]
-                        }
-                    elif "d2cs" not in parsed_data["games"][game_id]["source_logs"]:
-                        parsed_data["games"][game_id]["source_logs"].append("d2cs")
-
-
-                # 2. УНИЩОЖАВАНЕ НА ИГРА (D2CS)
-                match = RE_DESTROY.search(line)
-                if match:
-                    game_name = match.group(2)
-                    game_id = get_unique_game_id(game_name, create=False)
-                    
-                    if game_id in parsed_data["games"]:
-                        game = parsed_data["games"][game_id]
-                        if "d2cs" not in game["source_logs"]:
-                            game["source_logs"].append("d2cs")
-
-                        if game["end_ts"] is None:
-                            game["end_ts"] = timestamp.timestamp()
-                            duration = game["end_ts"] - game["start_ts"]
-                            game["duration_secs"] = round(duration, 2)
-                            game["is_active"] = False
-                    
+                sep = line.find(": ", 19)
+                if sep < 0: continue
+                function = line[19:sep]
+                if function not in functions: continue
+
+                # секундата се парсва веднъж, милисекундите се добавят
+                if line[:14] != ts_str:
+                    ts_str = line[:14]
+                    ts = parse_d2gs_timestamp(ts_str)
+                if ts is None: continue
+                try:
+                    ms = int(line[15:18])
+                except ValueError:
+                    continue
+                yield ts + ms / 1000, "d2gs", function, line[sep + 2:].rstrip()
     except FileNotFoundError:
-        print(f"Грешка: D2CS лог файлът не беше намерен на {file_path}")
-    except Exception as e:
-        print(f"Грешка при парсване на D2CS лога: {e}")
+        print(f"Грешка: D2GS лог файлът не беше намерен на {file_path}")
 
+# --- ОБРАБОТКА НА СЪБИТИЯТА ---
+# active_games държи последната игра с дадено име (и след като е затворена),
+# за да се вържат към нея събития от другите логове, дошли малко по-късно.
+
+def on_game_create(ts, source, function, match):
+    game_name = match.group(1)
+    game_id = active_games.get(game_name)
+
+    # Същата игра, видяна от другия лог (bnetd + d2cs) - не е нова игра
+    if game_id is not None:
+        game = parsed_data["games"][game_id]
+        if game["end_ts"] is None and source not in game["source_logs"]:
+            game["source_logs"].append(source)
+            if source == "bnetd":
+                game["platform_type"] = get_platform_from_line(match.string)
+                game["game_type"] = int(match.group(3))
+            return
+
+    game_id = get_unique_game_id(game_name, create=True)
+    parsed_data["games"][game_id] = {
+        "game_id": game_id,
+        "name": game_name,
+        "length_chars": len(game_name),
+        "platform_type": get_platform_from_line(match.string) if source == "bnetd" else "Unknown/D2CS",
+        "game_type": int(match.group(3)) if source == "bnetd" else None,
+        "start_ts": ts,
+        "end_ts": None,
+        "duration_secs": None,
+        "is_active": True,
+        "source_logs": [source]
+    }
+    active_games[game_name] = game_id
+
+# bnetd пише името на унищожената игра само на debug ниво; без него
+# "game deleted" се отнася за последната създадена игра (както досега)
+bnetd_destroy_state = {"pending": None, "last_created": None}
+
+def on_bnetd_create(ts, source, function, match):
+    on_game_create(ts, source, function, match)
+    bnetd_destroy_state["last_created"] = match.group(1)
+
+def on_bnetd_destroy_named(ts, source, function, match):
+    bnetd_destroy_state["pending"] = match.group(1)
+
+def on_bnetd_destroy(ts, source, function, match):
+    game_name = bnetd_destroy_state["pending"] or bnetd_destroy_state["last_created"]
+    bnetd_destroy_state["pending"] = None
+    if game_name == bnetd_destroy_state["last_created"]:
+        bnetd_destroy_state["last_created"] = None
+    game_id = active_games.get(game_name)
+    if game_id is not None:
+        close_game(game_id, ts)
+
+def on_d2cs_destroy(ts, source, function, match):
+    game_id = active_games.get(match.group(1))
+    if game_id is None:
+        return
+    game = parsed_data["games"][game_id]
+    if "d2cs" not in game["source_logs"]:
+        game["source_logs"].append("d2cs")
+    close_game(game_id, ts)
+
+def on_d2gs_char_event(ts, source, function, match):
+    event_type_raw = function[len("D2GSCB"):]
+    groups = match.groupdict()
+    char_name = groups['charname']
+    char_class_abbr = groups['class']
+
+    # Пълно име на класа
+    full_class_name = CLASS_MAPPING.get(char_class_abbr, char_class_abbr)
+
+    # 1. Актуализиране на данните за героя
+    char_data = parsed_data["characters"].setdefault(char_name, {
+        "char_name": char_name,
+        "account": groups.get('account', "zliazub"),
+        "class": full_class_name,
+        "level": int(groups['level']) if groups['level'] else None,
+        "total_saves": 0,
+        "total_ladder_updates": 0,
+        "first_seen_ts": ts,
+        "last_seen_ts": 0,
+        "games_played_count": 0
+    })
+
+    char_data["last_seen_ts"] = ts
+
+    # Актуализиране на ниво и клас, ако са налични
+    if groups['level']: char_data["level"] = int(groups['level'])
+    if full_class_name: char_data["class"] = full_class_name
+
+    # Увеличаване на броячи
+    if event_type_raw == "SaveDatabaseCharacter":
+        char_data["total_saves"] += 1
+    elif event_type_raw == "UpdateCharacterLadder":
+        char_data["total_ladder_updates"] += 1
+    elif event_type_raw == "EnterGame":
+        char_data["games_played_count"] += 1
+
+    # 2. Добавяне на събитие към масива game_events (играта към момента на събитието)
+    parsed_data["game_events"].append({
+        "ts": ts,
+        "char_name": char_name,
+        "event_type": event_type_raw,
+        "game_name": groups['gamename'],
+        "unique_game_id": active_games.get(groups['gamename']),
+        "game_server_id": int(groups['gameid']),
+        # текстът от лога (за колоната message в event store)
+        "message": f"{function}: {match.string}"
+    })
+
+RE_CHAR_EVENT = re.compile(
+    r"(?P<charname>\w+)\s*"
+    r"(?:\(\*(?P<account>\w+)\))?"
+    r".*?"
+    r"(?:\[L=(?P<level>\d+),C=(?P<class>\w+)\])?"
+    r".*?"
+    r"game\s*'(?P<gamename>\S+)',\s*id=(?P<gameid>\d+)"
+)
+
+# (лог, функция) -> [(компилиран шаблон за съобщението, обработчик), ...]
+DISPATCH = {
+    ("bnetd", "game_create"): [(re.compile(r"game \"(.*?)\" \(pass \"(.*?)\"\).*type (\d+).*created"), on_bnetd_create)],
+    ("bnetd", "game_destroy"): [(re.compile(r"game deleted"), on_bnetd_destroy),
+                                (re.compile(r"game \"(.*?)\" .*removed from list"), on_bnetd_destroy_named)],
+    ("d2cs", "d2cs_game_create"): [(re.compile(r"game (\S+).*created"), on_game_create)],
+    ("d2cs", "game_destroy"): [(re.compile(r"game (\S+) removed from game list"), on_d2cs_destroy)],
+}
+for event in ("EnterGame", "LeaveGame", "SaveDatabaseCharacter", "UpdateCharacterLadder", "CloseGame"):
+    DISPATCH[("d2gs", "D2GSCB" + event)] = [(RE_CHAR_EVENT, on_d2gs_char_event)]
 
-def parse_d2gs_log(file_path):
-    """
-    Парсира D2GS лога за данни за героите и събитията.
-    КОРЕКЦИЯ: Имплементира пълните имена на класовете.
-    """
-    
-    RE_CHAR_EVENT = re.compile(
-        r"(?P<ts>\d{2}/\d{2}\s+\d{2}:\d{2}:\d{2}\.\d{3}).*?"
-        r"D2GSCB(?P<event>EnterGame|LeaveGame|SaveDatabaseCharacter|UpdateCharacterLadder|CloseGame):\s*"
-        r"(?P<charname>\w+)\s*"
-        r"(?:\(\*(?P<account>\w+)\))?"
-        r".*?"
-        r"(?:\[L=(?P<level>\d+),C=(?P<class>\w+)\])?"
-        r".*?"
-        r"game\s*'(?P<gamename>\S+)',\s*id=(?P<gameid>\d+)"
-    )
 
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line: continue
-                
-                match = RE_CHAR_EVENT.search(line)
-                if match:
-                    groups = match.groupdict()
-                    timestamp = parse_d2gs_timestamp(groups['ts'])
-                    if not timestamp: continue
-                        
-                    event_type_raw = groups['event']
-                    char_name = groups['charname']
-                    char_class_abbr = groups['class']
-                    
-                    # Пълно име на класа
-                    full_class_name = CLASS_MAPPING.get(char_class_abbr, char_class_abbr)
-
-                    # 1. Актуализиране на данните за героя
-                    if char_name:
-                        char_data = parsed_data["characters"].setdefault(char_name, {
-                            "char_name": char_name,
-                            "account": groups.get('account', "zliazub"),
-                            "class": full_class_name, # НОВО: Пълно име
-                            "level": int(groups['level']) if groups['level'] else None,
-                            "total_saves": 0,
-                            "total_ladder_updates": 0,
-                            "first_seen_ts": timestamp.timestamp(),
-                            "last_seen_ts": 0,
-                            "games_played_count": 0
-                        })
-
-                        char_data["last_seen_ts"] = timestamp.timestamp()
-                        
-                        # Актуализиране на ниво и клас, ако са налични
-                        if groups['level']: char_data["level"] = int(groups['level'])
-                        if full_class_name: char_data["class"] = full_class_name
-                        
-                        # Увеличаване на броячи
-                        if event_type_raw == "SaveDatabaseCharacter":
-                            char_data["total_saves"] += 1
-                        elif event_type_raw == "UpdateCharacterLadder":
-                            char_data["total_ladder_updates"] += 1
-                        elif event_type_raw == "EnterGame":
-                            char_data["games_played_count"] += 1
-
-                    # 2. Добавяне на събитие към масива game_events
-                    unique_game_id = get_unique_game_id(groups['gamename'], create=False)
-                    
-                    if char_name:
-                        parsed_data["game_events"].append({
-                            "ts": timestamp.timestamp(), 
-                            "char_name": char_name,
-                            "event_type": event_type_raw,
-                            "game_name": groups['gamename'],
-                            "unique_game_id": unique_game_id,
-                            "game_server_id": int(groups['gameid'])
-                        })
-                    
-    except FileNotFoundError:
-        print(f"Грешка: D2GS лог файлът не беше намерен на {file_path}")
-    except Exception as e:
-        print(f"Грешка при парсване на D2GS лога: {e}")
+def process_logs(d2gs_log_path):
+    """Един проход по трите лога, слети по време."""
+    functions = defaultdict(set)
+    for source, function in DISPATCH:
+        functions[source].add(function)
+
+    streams = heapq.merge(
+        read_pvpgn_log(BNETD_LOG_PATH, "bnetd", functions["bnetd"]),
+        read_pvpgn_log(D2CS_LOG_PATH, "d2cs", functions["d2cs"]),
+        read_d2gs_log(d2gs_log_path, functions["d2gs"]) if d2gs_log_path else iter(()),
+        key=itemgetter(0),
+    )
+    # липсващ файл се обработва в четците; грешка в един ред пропуска само него
+    for ts, source, function, message in streams:
+        for pattern, handler in DISPATCH.get((source, function), ()):
+            match = pattern.match(message)
+            if match:
+                try:
+                    handler(ts, source, function, match)
+                except Exception as e:
+                    print(f"Грешка при парсване на {source} ред ({function}: {message}): {e}")
+                break
 
 
 def calculate_summary_stats():
@@ -362,12 +388,36 @@ def finalize_data():
 
 # --- ОСНОВНА ФУНКЦИЯ ---
 
+def store_game_events():
+    """game_events -> колонното хранилище (заявки по време / герой / игра без целия JSON)."""
+    characters = parsed_data["characters"]
+    if isinstance(characters, list):
+        characters = {c["char_name"]: c for c in characters}
+    rows = [{
+        "ts": event["ts"],
+        "event_type": event["event_type"],
+        "source": "d2gs.log",
+        "game": event["game_name"],
+        "char": event["char_name"],
+        "account": characters.get(event["char_name"], {}).get("account"),
+        "message": event["message"],
+    } for event in parsed_data["game_events"]]
+    try:
+        added = EventStore(EVENT_STORE_DIR).append(rows)
+        print(f"   * Event store: {added} нови събития в {EVENT_STORE_DIR}")
+    except Exception as e:
+        print(f"\n❌ Грешка при запис в event store: {e}")
+
 def main():
     print("--- 🚀 Стартиране на Интегрирания Парсинг Скрипт (ФИНАЛНА ВЕРСИЯ) ---")
     
-    parse_bnetd_log(BNETD_LOG_PATH)
-    parse_d2cs_log(D2CS_LOG_PATH)
-    parse_d2gs_log(D2GS_LOG_PATH)
+    try:
+        d2gs_log_path = find_d2gs_log()
+    except FileNotFoundError as e:
+        print(f"Грешка: {e}")
+        d2gs_log_path = None
+
+    process_logs(d2gs_log_path)
     
     finalize_data()
     
@@ -382,5 +432,7 @@ def main():
     except Exception as e:
         print(f"\n❌ Грешка при записване на JSON файла: {e}")
 
+    store_game_events()
+
 if __name__ == "__main__":
     main()
@@ -7,39 +7,36 @@ import sys
 
 # ==================== КОНФИГУРАЦИЯ ====================
 START_YEAR = 2025
-# Коренна директория, където Docker/Snap съхранява overlay2
-OVERLAY_ROOT = "/var/snap/docker/common/var-lib-docker/overlay2"
 
-# ==================== ФУНКЦИЯ ЗА НАМИРАНЕ НА ЛОГ ФАЙЛА ====================
-def find_d2gs_log(root=OVERLAY_ROOT):
-    """
-    Търси d2gs.log във всички поддиректории на Docker's overlay2.
-    """
-    print(f"--> Търсене на d2gs.log под {root}...")
-    # Използваме sys.stderr, за да не замърсяваме stdout, ако ще го пренасочвате
-    
-    # Добавена е проверка дали директорията съществува
-    if not os.path.isdir(root):
-        raise FileNotFoundError(f"Коренната директория {root} не съществува или е недостъпна.")
-
-    for dirpath, _, filenames in os.walk(root):
-        if "d2gs.log" in filenames:
-            log_path = os.path.join(dirpath, "d2gs.log")
-            print(f"*** Намерен d2gs.log: {log_path}", file=sys.stderr)
-            return log_path
-    raise FileNotFoundError("d2gs.log не е намерен в overlay2 структурите. Проверете OVERLAY_ROOT.")
+# ==================== НАМИРАНЕ НА ЛОГ ФАЙЛА ====================
+# find_d2gs_log() е в python-tools/pvpgn-logs/d2gs_log_locator.py: кеширан път,
+# после метаданните на контейнера и чак накрая обхождане на overlay2
+PVPGN_LOGS_DIR = "/home/support/scripts-tools/d2cpp/python-tools/pvpgn-logs"
+sys.path.insert(0, PVPGN_LOGS_DIR)
+from d2gs_log_locator import find_d2gs_log
 
 # ==================== ФУНКЦИИ ЗА ПАРСВАНЕ НА СЪДЪРЖАНИЕТО ====================
 
+LOG_PATTERN = re.compile(
+    r"^(?P<month>\d{1,2})/(?P<day>\d{1,2})\s+"
+    r"(?P<hour>\d{1,2}):(?P<minute>\d{1,2}):(?P<second>\d{1,2})\.(?P<millisecond>\d{3})\s+"
+    r"(?P<function>\w+):\s*(?P<message>.*)$"
+)
+# КОРИГИРАН РЕГЕКС: Обединяване на 'game list' и 'game' в една именувана група
+GAME_NAME_PATTERN = re.compile(r"(?:game list|game) '(?P<game_name>[^']+)'")
+# D2GS ID на играта ("..., id=12(exp,...)")
+GAME_ID_PATTERN = re.compile(r"\bid=(?P<d2gs_id>\d+)")
+GAME_DETAILS_PATTERN = re.compile(
+    r"Created game '[^']+', \d+,(?P<type>[^,]+),(?P<difficulty>[^,]+),(?P<mode>[^,]+),(?P<ladder>[^,]+), seqno=\d+"
+)
+# Регекс за име на герой (CharName) (*Account) [L=Level,C=Class]@IP
+ENTER_PATTERN = re.compile(r"(?P<char_name>\S+)\(\*(?P<account>[^)]+)\)\[L=(?P<level>\d+),C=(?P<class>[^\]]+)\]@(?P<ip>\S+) enter game")
+# Регекс за CharName(*Account) [L=Level,C=Class] leave game
+LEAVE_PATTERN = re.compile(r"(?P<char_name>\S+)\(\*(?P<account>[^)]+)\)\[L=\d+,C=[^\]]+\] leave game")
+
 def parse_d2gs_log_entry(log_line, year):
     """Парсва една линия от лога и извлича дата, време, функция и съобщение."""
-    log_pattern = re.compile(
-        r"^(?P<month>\d{1,2})/(?P<day>\d{1,2})\s+"
-        r"(?P<hour>\d{1,2}):(?P<minute>\d{1,2}):(?P<second>\d{1,2})\.(?P<millisecond>\d{3})\s+"
-        r"(?P<function>\w+):\s*(?P<message>.*)$"
-    )
-
-    match = log_pattern.match(log_line.strip())
+    match = LOG_PATTERN.match(log_line.strip())
     if not match:
         return None
 
@@ -58,12 +55,28 @@ def parse_d2gs_log_entry(log_line, year):
     del data['month'], data['day'], data['hour'], data['minute'], data['second'], data['millisecond']
     return data
 
-def parse_d2gs_game_cycle(log_content, year=START_YEAR):
+def parse_d2gs_game_cycle(log_lines, year=START_YEAR):
     """
-    Парсва целия лог и групира събитията в обобщен формат Игра -> Играчи.
+    Парсва лога и групира събитията в обобщен формат Игра -> Играчи.
+    log_lines е итерируемо от редове (отворен файл - чете се поточно, без
+    целия лог в паметта) или целият лог като един низ.
     """
-    log_lines = log_content.splitlines()
+    if isinstance(log_lines, str):
+        log_lines = log_lines.splitlines()
     game_data = {}
+    # Индекси на отворените игри (destroyed_at is None), поддържани при
+    # създаване/затваряне - всеки ред намира играта си за O(1):
+    #   име -> [unique_game_id, ...] по реда на създаване
+    #   D2GS id -> unique_game_id
+    open_by_name = {}
+    open_by_d2gs_id = {}
+
+    def close_game(uid):
+        same_name = open_by_name.get(game_data[uid]["game_name"], [])
+        if uid in same_name:
+            same_name.remove(uid)
+        for d2gs_id in [k for k, v in open_by_d2gs_id.items() if v == uid]:
+            del open_by_d2gs_id[d2gs_id]
 
     for line in log_lines:
         parsed_line = parse_d2gs_log_entry(line, year)
@@ -75,19 +88,19 @@ def parse_d2gs_game_cycle(log_content, year=START_YEAR):
         timestamp = parsed_line['timestamp']
 
         current_game_id = None
-        # КОРИГИРАН РЕГЕКС: Обединяване на 'game list' и 'game' в една именувана група
-        game_name_match = re.search(r"(?:game list|game) '(?P<game_name>[^']+)'", message)
+        game_name_match = GAME_NAME_PATTERN.search(message)
 
         if game_name_match:
             game_name = game_name_match.group('game_name')
-            
-            # Логика за намиране на текущата активна игра по име
-            unique_game_id_found = None
-            for uid, data in game_data.items():
-                # Търси се най-новата активна игра с това име
-                if data["game_name"] == game_name and data.get("destroyed_at") is None:
-                    unique_game_id_found = uid
-                    break
+            d2gs_id_match = GAME_ID_PATTERN.search(message)
+            d2gs_id = d2gs_id_match.group('d2gs_id') if d2gs_id_match else None
+
+            # Текущата активна игра: по D2GS id (ако е на същото име), иначе
+            # първата отворена игра с това име
+            unique_game_id_found = open_by_d2gs_id.get(d2gs_id)
+            if unique_game_id_found is None or game_data[unique_game_id_found]["game_name"] != game_name:
+                same_name = open_by_name.get(game_name)
+                unique_game_id_found = same_name[0] if same_name else None
             
             # 1. СЪЗДАВАНЕ НА ИГРА (Game Creation - Start of Cycle)
             if function in ("D2GSGameListInsert", "D2CSCreateEmptyGame"):
@@ -95,6 +108,8 @@ def parse_d2gs_game_cycle(log_content, year=START_YEAR):
                 ctime_suffix = timestamp.replace('-', '').replace('T', '').replace(':', '').split('.')[0]
                 unique_game_id = f"{game_name}_{ctime_suffix}"
                 current_game_id = unique_game_id
+                if unique_game_id in game_data:
+                    close_game(unique_game_id)
                 
                 # Инициализиране на обекта за играта
                 game_data[unique_game_id] = {
@@ -108,13 +123,13 @@ def parse_d2gs_game_cycle(log_content, year=START_YEAR):
                     "incomplete": True,
                     "players": {}
                 }
+                open_by_name.setdefault(game_name, []).append(unique_game_id)
+                if d2gs_id is not None:
+                    open_by_d2gs_id[d2gs_id] = unique_game_id
 
                 if function == "D2CSCreateEmptyGame":
                     # Извличане на параметрите на играта (Type, Difficulty, Mode/Hardcore, Ladder)
-                    details_match = re.search(
-                        r"Created game '[^']+', \d+,(?P<type>[^,]+),(?P<difficulty>[^,]+),(?P<mode>[^,]+),(?P<ladder>[^,]+), seqno=\d+", 
-                        message
-                    )
+                    details_match = GAME_DETAILS_PATTERN.search(message)
                     if details_match:
                         details = details_match.groupdict()
                         game_data[unique_game_id]["difficulty"] = details.get('difficulty')
@@ -125,11 +140,12 @@ def parse_d2gs_game_cycle(log_content, year=START_YEAR):
             # 2. СЪБИТИЯ С ИГРАЧИ (Player Events)
             elif unique_game_id_found:
                 current_game_id = unique_game_id_found
+                if d2gs_id is not None:
+                    open_by_d2gs_id[d2gs_id] = current_game_id
 
                 # D2GSCBEnterGame: Влизане на играч
                 if function == "D2GSCBEnterGame":
-                    # Регекс за име на герой (CharName) (*Account) [L=Level,C=Class]@IP
-                    match = re.search(r"(?P<char_name>\S+)\(\*(?P<account>[^)]+)\)\[L=(?P<level>\d+),C=(?P<class>[^\]]+)\]@(?P<ip>\S+) enter game", message)
+                    match = ENTER_PATTERN.search(message)
                     if match:
                         details = match.groupdict()
                         char_name = details['char_name'].strip()
@@ -147,8 +163,7 @@ def parse_d2gs_game_cycle(log_content, year=START_YEAR):
 
                 # D2GSCBLeaveGame: Излизане на играч
                 elif function == "D2GSCBLeaveGame":
-                    # Регекс за CharName(*Account) [L=Level,C=Class] leave game
-                    match = re.search(r"(?P<char_name>\S+)\(\*(?P<account>[^)]+)\)\[L=\d+,C=[^\]]+\] leave game", message)
+                    match = LEAVE_PATTERN.search(message)
                     if match:
                         char_name = match.group('char_name').strip()
                         
@@ -170,6 +185,7 @@ def parse_d2gs_game_cycle(log_content, year=START_YEAR):
                             if "leave game" in message: 
                                 game_data[current_game_id]["destroyed_at"] = timestamp
                                 game_data[current_game_id]["incomplete"] = False
+                                close_game(current_game_id)
 
     # Връща всички намерени игри (за да видим и незавършените)
     return list(game_data.values())
@@ -186,13 +202,10 @@ if __name__ == "__main__":
         # 1. Намиране на пътя до лога
         log_file_path = find_d2gs_log()
         
-        # 2. Четене на лога
+        # 2. + 3. Поточно четене и парсване на лога (ред по ред)
+        print(f"--> Лог с обем: {os.path.getsize(log_file_path)} байта.", file=sys.stderr)
         with open(log_file_path, 'r', encoding='utf-8') as f:
-            full_log_content = f.read()
-            print(f"--> Прочетен лог с обем: {len(full_log_content)} байта.", file=sys.stderr)
-
-        # 3. Парсване на съдържанието
-        parsed_games = parse_d2gs_game_cycle(full_log_content)
+            parsed_games = parse_d2gs_game_cycle(f)
         
         # 4. Запис на резултата във файл
         output_filename = "parsed_d2gs_games_output.json"
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Намиране на d2gs.log в Docker контейнера (overlay2) без обхождане на overlay2.
+
+Редът на търсене:
+  1. кешираният път (cache/d2gs_log_path.json) - един stat, ако файлът още е там;
+  2. метаданните на Docker: image/overlay2/layerdb/mounts/<container>/mount-id
+     дава директорията на контейнера в overlay2 -> <mount-id>/diff/<LOG_IN_CONTAINER>
+     (при няколко контейнера - с най-скоро променения лог);
+  3. краен вариант: os.walk на overlay2 (както досега).
+Намереният път се записва в кеша, така че пълно търсене има само след
+пресъздаване на контейнера.
+
+    from d2gs_log_locator import find_d2gs_log
+    log_path = find_d2gs_log()
+"""
+import os
+import sys
+import glob
+import json
+from typing import Optional
+
+DOCKER_ROOT = "/var/snap/docker/common/var-lib-docker"
+OVERLAY_ROOT = os.path.join(DOCKER_ROOT, "overlay2")
+# Пътят на лога вътре в контейнера (wine prefix на D2GS)
+LOG_IN_CONTAINER = "root/.wine/drive_c/d2gs/d2gs.log"
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "d2gs_log_path.json")
+
+
+def _load_cached(cache_file: str) -> Optional[str]:
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            path = json.load(f).get("path")
+    except (OSError, ValueError, AttributeError):
+        return None
+    return path if path and os.path.isfile(path) else None
+
+
+def _save_cached(cache_file: str, path: str) -> None:
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp_path = cache_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"path": path}, f)
+        os.replace(tmp_path, cache_file)
+    except OSError as e:
+        print(f"WARNING: could not cache d2gs.log path in {cache_file}: {e}", file=sys.stderr)
+
+
+def _from_container_mounts(docker_root: str) -> Optional[str]:
+    """d2gs.log в горния (diff) слой на някой от контейнерите, по mount-id от layerdb."""
+    overlay_root = os.path.join(docker_root, "overlay2")
+    best_path, best_mtime = None, -1.0
+    for mount_id_file in glob.glob(os.path.join(docker_root, "image", "overlay2", "layerdb", "mounts", "*", "mount-id")):
+        try:
+            with open(mount_id_file, "r") as f:
+                mount_id = f.read().strip()
+            path = os.path.join(overlay_root, mount_id, "diff", LOG_IN_CONTAINER)
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            continue
+        if mtime > best_mtime:
+            best_path, best_mtime = path, mtime
+    return best_path
+
+
+def _walk_overlay(overlay_root: str) -> Optional[str]:
+    """Бавният път: обхождане на целия overlay2 (само ако метаданните не помогнат)."""
+    if not os.path.isdir(overlay_root):
+        return None
+    for dirpath, _, filenames in os.walk(overlay_root):
+        if "d2gs.log" in filenames:
+            return os.path.join(dirpath, "d2gs.log")
+    return None
+
+
+def find_d2gs_log(docker_root: str = DOCKER_ROOT, cache_file: str = CACHE_FILE) -> str:
+    """Пътят до d2gs.log; FileNotFoundError, ако не е намерен никъде."""
+    path = _load_cached(cache_file)
+    if path:
+        return path
+
+    path = _from_container_mounts(docker_root)
+    if not path:
+        print(f"--> d2gs.log не е в метаданните на контейнерите, търсене под {docker_root}/overlay2...", file=sys.stderr)
+        path = _walk_overlay(os.path.join(docker_root, "overlay2"))
+    if not path:
+        raise FileNotFoundError(f"d2gs.log не е намерен в overlay2 структурите под {docker_root}.")
+
+    print(f"*** Намерен d2gs.log: {path}", file=sys.stderr)
+    _save_cached(cache_file, path)
+    return path
+
+
+if __name__ == "__main__":
+    print(find_d2gs_log())
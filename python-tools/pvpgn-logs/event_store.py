@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Колонно хранилище за събитията от логовете (bnetd / d2cs / d2gs).
+
+Вместо един огромен JSON списък, който уебът трябва да свали и обходи:
+  - по един сегмент на ден (YYYY-MM-DD.seg), събитията са сортирани по време;
+  - колоните са типизирани масиви (array): ts (double), event_type/source (uint16),
+    game/char/account (uint32 id, 0 = няма), message (utf-8 текст);
+  - имената (тип, източник, игра, герой, акаунт) са в общ речник
+    (dictionaries.json), в сегментите са само id-тата;
+  - заглавието на сегмента пази min/max ts и кои game/char/account id-та
+    има в него, така че заявка за герой/игра пропуска ненужните дни,
+    без да чете колоните им.
+
+    store = EventStore(STORE_DIR)
+    store.append([{"ts": 1734537698.0, "event_type": "game_create", "source": "bnetd",
+                   "game": "Baal1", "char": None, "account": "acc", "message": "..."}])
+    for ev in store.events_for_character("MyChar", start=datetime(2025, 12, 1)):
+        ...
+
+append() слива с вече записаното за деня: еднаквите събития не се
+дублират, ако същият лог се парсне отново (всеки скрипт препарсва целия лог).
+Няколко скрипта пишат в същото хранилище, затова append() държи flock върху
+LOCK_FILE и вътре в него чете наново речника и сегментите.
+
+Ръчна заявка:
+    python3 event_store.py [STORE_DIR] --char MyChar --from 2025-12-01 --to 2025-12-31
+"""
+import os
+import sys
+import json
+import glob
+import fcntl
+import bisect
+from array import array
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "events")
+
+SEGMENT_MAGIC = b"PVPEVT1\n"
+DICT_FILE = "dictionaries.json"
+LOCK_FILE = ".lock"
+
+# колона -> typecode на array ("text" за съобщението)
+COLUMNS = {
+    "ts": "d",
+    "event_type": "H",
+    "source": "H",
+    "game": "I",
+    "char": "I",
+    "account": "I",
+    "message": "text",
+}
+NAME_COLUMNS = ("event_type", "source", "game", "char", "account")
+# за тези колони заглавието на сегмента пази кои id-та присъстват
+INDEXED_COLUMNS = ("game", "char", "account")
+
+TimeArg = Union[None, float, int, datetime, str]
+
+
+def _to_ts(value: TimeArg, end_of_day: bool = False) -> Optional[float]:
+    """
+    float/int (unix), datetime или ISO низ ('2025-12-18', '2025-12-18T17:00:00') -> unix ts.
+    Само дата като край на интервал (end_of_day) означава целия ден.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        date_only = "T" not in value and " " not in value
+        value = datetime.fromisoformat(value)
+        if date_only and end_of_day:
+            value = value.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return value.timestamp()
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+
+
+class EventStore:
+    def __init__(self, root: str = DEFAULT_STORE_DIR):
+        self.root = root
+        self._names: Dict[str, List[Optional[str]]] = {}
+        self._ids: Dict[str, Dict[str, int]] = {}
+        self._load_dictionaries()
+
+    # ---------- речници ----------
+
+    def _load_dictionaries(self) -> None:
+        try:
+            with open(os.path.join(self.root, DICT_FILE), "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            stored = {}
+        for col in NAME_COLUMNS:
+            names = [None] + stored.get(col, [])
+            self._names[col] = names
+            self._ids[col] = {name: i for i, name in enumerate(names) if i}
+
+    def _save_dictionaries(self) -> None:
+        data = {col: self._names[col][1:] for col in NAME_COLUMNS}
+        self._write_atomic(os.path.join(self.root, DICT_FILE), json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def _intern(self, col: str, name: Optional[str]) -> int:
+        if not name:
+            return 0
+        ids = self._ids[col]
+        i = ids.get(name)
+        if i is None:
+            i = ids[name] = len(self._names[col])
+            self._names[col].append(name)
+        return i
+
+    # ---------- сегменти ----------
+
+    def _segment_path(self, day: str) -> str:
+        return os.path.join(self.root, f"{day}.seg")
+
+    @staticmethod
+    def _write_atomic(path: str, payload: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read_header(f) -> Optional[Dict[str, Any]]:
+        if f.readline() != SEGMENT_MAGIC:
+            return None
+        header = json.loads(f.readline())
+        header["data_start"] = f.tell()
+        return header
+
+    def _read_columns(self, f, header: Dict[str, Any], names: Iterable[str]) -> Dict[str, Any]:
+        out = {}
+        swap = header.get("byteorder", sys.byteorder) != sys.byteorder
+        for name in names:
+            offset, length = header["columns"][name]
+            f.seek(header["data_start"] + offset)
+            raw = f.read(length)
+            if COLUMNS[name] == "text":
+                out[name] = raw.decode("utf-8").split("\n") if header["count"] else []
+            else:
+                col = array(COLUMNS[name])
+                col.frombytes(raw)
+                if swap:
+                    col.byteswap()
+                out[name] = col
+        return out
+
+    def _load_segment(self, day: str) -> List[tuple]:
+        """Целият сегмент като списък от редове (tuple по реда на COLUMNS)."""
+        try:
+            with open(self._segment_path(day), "rb") as f:
+                header = self._read_header(f)
+                if header is None:
+                    return []
+                cols = self._read_columns(f, header, COLUMNS)
+        except FileNotFoundError:
+            return []
+        return list(zip(*(cols[name] for name in COLUMNS)))
+
+    def _write_segment(self, day: str, rows: List[tuple]) -> None:
+        rows.sort(key=lambda r: r[0])
+        columns = {}
+        body = bytearray()
+        for i, name in enumerate(COLUMNS):
+            if COLUMNS[name] == "text":
+                raw = "\n".join(r[i] for r in rows).encode("utf-8")
+            else:
+                raw = array(COLUMNS[name], (r[i] for r in rows)).tobytes()
+            columns[name] = [len(body), len(raw)]
+            body += raw
+        names = list(COLUMNS)
+        header = {
+            "count": len(rows),
+            "ts_min": rows[0][0] if rows else None,
+            "ts_max": rows[-1][0] if rows else None,
+            "byteorder": sys.byteorder,
+            "columns": columns,
+            "ids": {col: sorted({r[names.index(col)] for r in rows} - {0}) for col in INDEXED_COLUMNS},
+        }
+        payload = SEGMENT_MAGIC + json.dumps(header).encode("utf-8") + b"\n" + bytes(body)
+        self._write_atomic(self._segment_path(day), payload)
+
+    # ---------- запис ----------
+
+    def append(self, events: Iterable[Dict[str, Any]]) -> int:
+        """
+        Добавя събития ({"ts", "event_type", "source", "game", "char", "account", "message"}).
+        Сливането с записаното е по брой: ако едно и също събитие вече е в
+        сегмента n пъти, а сега идва m пъти, остават max(n, m) копия -
+        повторно парсване на същия лог не дублира нищо. Връща броя нови събития.
+        """
+        events = list(events)
+        if not events:
+            return 0
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, LOCK_FILE), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # друг процес може да е писал след конструктора - речникът се чете
+            # наново, преди да се раздадат нови id-та
+            self._load_dictionaries()
+            return self._append_locked(events)
+
+    def _append_locked(self, events: List[Dict[str, Any]]) -> int:
+        by_day: Dict[str, List[tuple]] = {}
+        for ev in events:
+            ts = _to_ts(ev["ts"])
+            row = (ts,) + tuple(self._intern(col, ev.get(col)) for col in NAME_COLUMNS) \
+                + ((ev.get("message") or "").replace("\n", " "),)
+            by_day.setdefault(_day(ts), []).append(row)
+        if not by_day:
+            return 0
+
+        # речникът първо: сегментите сочат към id-та в него
+        self._save_dictionaries()
+
+        added = 0
+        for day, rows in by_day.items():
+            existing = Counter(self._load_segment(day))
+            incoming = Counter(rows)
+            new = incoming - existing
+            if not new:
+                continue
+            added += sum(new.values())
+            self._write_segment(day, list((existing | incoming).elements()))
+        return added
+
+    # ---------- заявки ----------
+
+    def days(self) -> List[str]:
+        return sorted(os.path.basename(p)[:-4] for p in glob.glob(os.path.join(self.root, "*.seg")))
+
+    def query(self, start: TimeArg = None, end: TimeArg = None, event_type: Optional[str] = None,
+              source: Optional[str] = None, game: Optional[str] = None, char: Optional[str] = None,
+              account: Optional[str] = None, with_message: bool = True) -> Iterator[Dict[str, Any]]:
+        """Събитията в [start, end] (включително), подредени по време, филтрирани по име."""
+        # речникът само расте - по-новият покрива id-тата и в по-старите сегменти
+        self._load_dictionaries()
+        start_ts, end_ts = _to_ts(start), _to_ts(end, end_of_day=True)
+        filters = {}
+        for col, name in (("event_type", event_type), ("source", source), ("game", game),
+                          ("char", char), ("account", account)):
+            if name is None:
+                continue
+            i = self._ids[col].get(name)
+            if i is None:
+                return  # непознато име - няма такива събития
+            filters[col] = i
+
+        first_day = _day(start_ts) if start_ts is not None else None
+        last_day = _day(end_ts) if end_ts is not None else None
+        wanted = ["ts", *NAME_COLUMNS] + (["message"] if with_message else [])
+
+        for day in self.days():
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            with open(self._segment_path(day), "rb") as f:
+                header = self._read_header(f)
+                if header is None or not header["count"]:
+                    continue
+                if any(col in INDEXED_COLUMNS and filters[col] not in header["ids"][col] for col in filters):
+                    continue
+                if (start_ts is not None and header["ts_max"] < start_ts) or \
+                        (end_ts is not None and header["ts_min"] > end_ts):
+                    continue
+                cols = self._read_columns(f, header, wanted)
+
+            ts_col = cols["ts"]
+            lo = bisect.bisect_left(ts_col, start_ts) if start_ts is not None else 0
+            hi = bisect.bisect_right(ts_col, end_ts) if end_ts is not None else len(ts_col)
+            for i in range(lo, hi):
+                if any(cols[col][i] != want for col, want in filters.items()):
+                    continue
+                ev = {"ts": ts_col[i], "timestamp": datetime.fromtimestamp(ts_col[i]).isoformat()}
+                for col in NAME_COLUMNS:
+                    ev[col] = self._names[col][cols[col][i]]
+                if with_message:
+                    ev["message"] = cols["message"][i]
+                yield ev
+
+    def events_in_range(self, start: TimeArg, end: TimeArg, **filters) -> Iterator[Dict[str, Any]]:
+        return self.query(start=start, end=end, **filters)
+
+    def events_for_character(self, char: str, start: TimeArg = None, end: TimeArg = None, **filters) -> Iterator[Dict[str, Any]]:
+        return self.query(start=start, end=end, char=char, **filters)
+
+    def events_for_game(self, game: str, start: TimeArg = None, end: TimeArg = None, **filters) -> Iterator[Dict[str, Any]]:
+        return self.query(start=start, end=end, game=game, **filters)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Query the PvPGN log event store.")
+    parser.add_argument("store", nargs="?", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--from", dest="start", help="ISO date/time, e.g. 2025-12-18 or 2025-12-18T17:00:00")
+    parser.add_argument("--to", dest="end", help="ISO date/time (inclusive)")
+    parser.add_argument("--type", dest="event_type")
+    parser.add_argument("--source")
+    parser.add_argument("--game")
+    parser.add_argument("--char")
+    parser.add_argument("--account")
+    parser.add_argument("--no-message", action="store_true")
+    args = parser.parse_args()
+
+    events = EventStore(args.store).query(start=args.start, end=args.end, event_type=args.event_type,
+                                          source=args.source, game=args.game, char=args.char,
+                                          account=args.account, with_message=not args.no_message)
+    json.dump(list(events), sys.stdout, ensure_ascii=False)
+    print()
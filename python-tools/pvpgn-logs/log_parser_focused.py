@@ -5,6 +5,8 @@ import json
 from datetime import datetime
 from glob import glob
 
+from event_store import EventStore
+
 # --- Конфигурация ---
 # Файлове, които скриптът ще търси
 LOG_FILES = [
@@ -12,6 +14,8 @@ LOG_FILES = [
     'd2cs.log'
 ]
 OUTPUT_FILE = 'log_events_focused.json' # Може да използвате същото име
+# Колонно хранилище (по ден) - за заявки по време / герой / игра без целия JSON
+EVENT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "events")
 
 # Извлечени ключови функции, върху които да се фокусираме
 FOCUSED_KEYS = {
@@ -33,6 +37,25 @@ LOG_LINE_REGEX = re.compile(
     r"^(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2})\s+\[(info|debug|warn|error|trace)\s*\]\s*([^:]+):\s+(.*)$"
 )
 
+# Герой / игра / акаунт от съобщението (първото съвпадение за всяко поле)
+ENTITY_PATTERNS = [
+    re.compile(r'character (?P<char>\S+) (?:to|from) game (?P<game>\S+)'),
+    re.compile(r'character (?P<char>[^\s(]+)\(\*(?P<account>[^)\s]+)\)'),
+    re.compile(r'"(?P<account>[^"]+)" (?:logged in|logged out|joined game "(?P<game>[^"]+)")'),
+    re.compile(r'game "(?P<game>[^"]+)"'),
+    re.compile(r'^game (?P<game>\S+) (?:\(|removed)'),
+]
+
+def extract_entities(message):
+    found = {}
+    for pattern in ENTITY_PATTERNS:
+        m = pattern.search(message)
+        if m:
+            for key, value in m.groupdict().items():
+                if value and key not in found:
+                    found[key] = value
+    return found
+
 def to_iso_date(date_str):
     """
     Преобразува лог timestamp (напр. "Dec 20 09:36:44") в ISO 8601 формат.
@@ -116,5 +139,30 @@ def main():
     except Exception as e:
         print(f"ERROR: Failed to write output JSON file: {e}")
 
+    store_events(all_events)
+
+
+def store_events(all_events):
+    """Записва събитията и в колонното хранилище (сливане по ден, без дубликати)."""
+    rows = []
+    for event in all_events:
+        try:
+            ts = datetime.fromisoformat(event['timestamp']).timestamp()
+        except ValueError:
+            continue
+        message = event['details']['full_message']
+        rows.append({
+            "ts": ts,
+            "event_type": event['event_type'],
+            "source": event['source_file'],
+            "message": message,
+            **extract_entities(message),
+        })
+    try:
+        added = EventStore(EVENT_STORE_DIR).append(rows)
+        print(f"Event store: {added} new events in {EVENT_STORE_DIR}")
+    except Exception as e:
+        print(f"ERROR: Failed to update event store: {e}")
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Инкрементално четене на лог файлове (bnetd.log, d2cs.log, d2gs.log ...).
+
+За всеки файл се пази позиция {"inode", "offset"}; при следващото пускане
+се четат само новите пълни редове. Обработва:
+  - ротация (нов inode): дочита се старият файл (bnetd.log.1, bnetd.log-2025...)
+    от запазения offset, после новият от началото;
+  - truncate (copytruncate): размерът е по-малък от offset -> от началото;
+  - първо пускане: започва от последните bootstrap_lines реда (като tail -n),
+    или от началото на файла при bootstrap_lines=None.
+Недописан последен ред не се чете - ще бъде прочетен следващия път.
+
+    state = load_state(STATE_FILE)
+    pos = state.setdefault("files", {}).setdefault(LOG, {})
+    for line in read_new_lines(LOG, pos, bootstrap_lines=1000):
+        ...
+    save_state(STATE_FILE, state)
+"""
+import os
+import glob
+import json
+from typing import Any, Dict, Iterator, Optional
+
+COMPRESSED_SUFFIXES = (".gz", ".bz2", ".xz", ".zst")
+
+
+def load_state(state_path: str) -> Dict[str, Any]:
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"WARNING: ignoring unreadable tailer state {state_path}: {e}")
+        return {}
+
+
+def save_state(state_path: str, state: Dict[str, Any]) -> None:
+    """Атомарен запис (tmp + os.replace), за да не се загубят offset-ите при срив."""
+    os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, state_path)
+
+
+def _find_rotated(path: str, inode: int) -> Optional[str]:
+    """Ротираният файл със стария inode (logrotate: path.1 / path-YYYYMMDD), ако още го има."""
+    for candidate in glob.glob(path + ".*") + glob.glob(path + "-*"):
+        if candidate.endswith(COMPRESSED_SUFFIXES):
+            continue
+        try:
+            if os.stat(candidate).st_ino == inode:
+                return candidate
+        except OSError:
+            continue
+    return None
+
+
+def _tail_offset(path: str, size: int, lines: int, block: int = 64 * 1024) -> int:
+    """Offset на началото на последните `lines` реда (без да чете целия файл)."""
+    if lines <= 0:
+        return size
+    with open(path, "rb") as f:
+        pos = size
+        newlines = 0
+        while pos > 0:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            # последният \n на файла приключва последния ред, не започва нов
+            if pos + step == size and chunk.endswith(b"\n"):
+                chunk = chunk[:-1]
+            idx = len(chunk)
+            while True:
+                idx = chunk.rfind(b"\n", 0, idx)
+                if idx < 0:
+                    break
+                newlines += 1
+                if newlines == lines:
+                    return pos + idx + 1
+    return 0
+
+
+def _read_from(path: str, pos: Dict[str, Any], offset: int, final: bool = False) -> Iterator[str]:
+    """Редовете от offset нататък; pos["offset"] се мести след всеки пълен ред."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n") and not final:
+                break  # ред, който още се пише
+            offset += len(raw)
+            pos["offset"] = offset
+            yield raw.decode("utf-8", errors="replace").rstrip("\r\n")
+
+
+def read_new_lines(path: str, pos: Dict[str, Any], bootstrap_lines: Optional[int] = 0) -> Iterator[str]:
+    """
+    Генератор на новите редове в path; обновява pos ({"inode", "offset"}) на място.
+    Генераторът трябва да се изчерпи, преди pos да се запише.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return
+
+    old_inode = pos.get("inode")
+    offset = pos.get("offset")
+
+    if old_inode is not None and old_inode != st.st_ino:
+        rotated = _find_rotated(path, old_inode)
+        if rotated:
+            yield from _read_from(rotated, {"offset": offset}, offset or 0, final=True)
+        offset = 0
+    elif offset is None:
+        offset = 0 if bootstrap_lines is None else _tail_offset(path, st.st_size, bootstrap_lines)
+    elif st.st_size < offset:
+        offset = 0
+
+    pos["inode"] = st.st_ino
+    pos["offset"] = offset
+    yield from _read_from(path, pos, offset)
+
+
+if __name__ == "__main__":
+    # Ръчна проверка: python3 log_tailer.py /path/to/state.json /path/to/log
+    import sys
+    state_file, log_file = sys.argv[1], sys.argv[2]
+    state = load_state(state_file)
+    file_pos = state.setdefault("files", {}).setdefault(log_file, {})
+    count = sum(1 for _ in read_new_lines(log_file, file_pos, bootstrap_lines=10))
+    save_state(state_file, state)
+    print(f"{count} new lines, now at {file_pos}")
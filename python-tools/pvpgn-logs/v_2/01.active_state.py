@@ -1,63 +1,43 @@
 #!/usr/bin/env python3
 
 import json
-from datetime import datetime
+import os
 from pathlib import Path
-import re
 
-D2CS_LOG = "/usr/local/pvpgn/var/pvpgn/logs/d2cs.log"
-OUT = "/var/www/html/pvpjsonstat/logs/active/active_state.json"
+from d2cs_games import D2csGameTracker, D2CS_LOG
 
-YEAR = datetime.now().year
+OUT = "/var/www/html/pvpjsonstat/logs/active/active_state.json"
+# Checkpoint (отворени игри + offset в d2cs.log) - всяко пускане чете само новите редове
+STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "active_state.ckpt.json")
 
-def parse_ts(line):
-    dt = datetime.strptime(line[:15], "%b %d %H:%M:%S")
-    return dt.replace(year=YEAR).isoformat()
+tracker = D2csGameTracker(STATE_FILE, D2CS_LOG)
+tracker.update()
 
 games = {}
 players = {}
 
-re_game_create = re.compile(r"d2cs_game_create: game (\S+)")
-re_game_add = re.compile(r"game_add_character: added character (\S+) to game (\S+)")
-re_game_del = re.compile(r"game_del_character: removed character (\S+) from game (\S+)")
-re_game_destroy = re.compile(r"game_destroy: game (\S+) removed")
-
-with open(D2CS_LOG, "r", errors="ignore") as f:
-    for line in f:
-        ts = parse_ts(line)
-
-        if m := re_game_create.search(line):
-            game = m.group(1)
-            games[game] = {
-                "created_at": ts,
-                "players": {}
-            }
-
-        elif m := re_game_add.search(line):
-            char, game = m.group(1), m.group(2)
-            if game in games:
-                games[game]["players"][char] = ts
-                players[char] = {"game": game}
-
-        elif m := re_game_del.search(line):
-            char, game = m.group(1), m.group(2)
-            if game in games:
-                games[game]["players"].pop(char, None)
-            players.pop(char, None)
-
-        elif m := re_game_destroy.search(line):
-            game = m.group(1)
-            if game in games:
-                for char in list(games[game]["players"].keys()):
-                    players.pop(char, None)
-                del games[game]
+for game_name, game in tracker.open_games.items():
+    games[game_name] = {
+        "created_at": game["created_at"],
+        "players": {}
+    }
+    # в играта са героите с отворена сесия (последното влизане)
+    for char, pdata in game["players"].items():
+        open_sessions = [s for s in pdata["sessions"] if s["leave"] is None]
+        if open_sessions:
+            games[game_name]["players"][char] = open_sessions[-1]["join"]
+            players[char] = {"game": game_name}
 
 state = {
     "games": games,
     "players": players
 }
 
-with open(OUT, "w") as f:
+Path(OUT).parent.mkdir(parents=True, exist_ok=True)
+tmp_out = OUT + ".tmp"
+with open(tmp_out, "w") as f:
     json.dump(state, f, indent=2)
+os.replace(tmp_out, OUT)
+tracker.save()
 
 print(f"[OK] Active state written to {OUT}")
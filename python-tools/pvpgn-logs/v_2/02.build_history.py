@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
-import os, json, re
+import os, json
 from datetime import datetime
 
+from d2cs_games import D2csGameTracker
+
 # === CONFIG ===
-YEAR = datetime.now().year
 MIN_DURATION = 30  # минимална продължителност на играта в секунди
 WORK_DIR = "/var/www/html/pvpjsonstat/logs"  # работна папка
 LOG_D2CS = "/usr/local/pvpgn/var/pvpgn/logs/d2cs.log"  # лог файл
@@ -16,88 +17,40 @@ ACTIVE_FILE = os.path.join(WORK_DIR, "active_state.json")
 # Създаваме папките, ако не съществуват
 os.makedirs(GAMES_DIR, exist_ok=True)
 
-# === REGEX за логовете ===
-re_create = re.compile(r"d2cs_game_create: game (\S+)")
-re_add = re.compile(r"game_add_character: added character (\S+) to game (\S+)")
-re_del = re.compile(r"game_del_character: removed character (\S+) from game (\S+)")
-re_destroy = re.compile(r"game_destroy: game (\S+) removed")
-
-# === Функция за парсване на timestamp от реда на лог файла ===
-def parse_ts(line):
-    dt = datetime.strptime(line[:15], "%b %d %H:%M:%S")
-    return dt.replace(year=YEAR)
-
-# === IN-MEMORY DATA ===
-games = {}
-
-# === Четене на лог файла ===
-with open(LOG_D2CS, "r", errors="ignore") as f:
-    for line in f:
-        ts = parse_ts(line)
-
-        if m := re_create.search(line):
-            game_name = m.group(1)
-            game_uid = f"{ts.strftime('%Y%m%d%H%M%S')}_{game_name}"
-            games[game_name] = {
-                "game_uid": game_uid,
-                "created_at": ts,
-                "destroyed_at": None,
-                "players": {}
-            }
-
-        elif m := re_add.search(line):
-            char, game_name = m.group(1), m.group(2)
-            if game_name in games:
-                if char not in games[game_name]["players"]:
-                    games[game_name]["players"][char] = {"sessions": []}
-                games[game_name]["players"][char]["sessions"].append({"join": ts, "leave": None})
-
-        elif m := re_del.search(line):
-            char, game_name = m.group(1), m.group(2)
-            if game_name in games and char in games[game_name]["players"]:
-                for sess in reversed(games[game_name]["players"][char]["sessions"]):
-                    if sess["leave"] is None:
-                        sess["leave"] = ts
-                        break
-
-        elif m := re_destroy.search(line):
-            game_name = m.group(1)
-            if game_name in games:
-                games[game_name]["destroyed_at"] = ts
-
-# === Филтриране и агрегиране ===
-final_index = {"total_games": 0, "games": []}
-
-for game_name, gdata in games.items():
-    if not gdata["destroyed_at"]:
-        continue
+# Checkpoint (отворени игри/сесии + offset в d2cs.log): всяко пускане чете
+# само новите редове и пише файлове само за игрите, приключили междувременно.
+STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "build_history.ckpt.json")
+
+tracker = D2csGameTracker(STATE_FILE, LOG_D2CS)
+closed_games = tracker.update()
+
+# === Зареждане на index.json (новите игри се добавят към него) ===
+try:
+    with open(INDEX_FILE, "r") as f:
+        final_index = json.load(f)
+except (FileNotFoundError, ValueError):
+    final_index = {"total_games": 0, "games": []}
+known_uids = {g["game_uid"] for g in final_index["games"]}
+new_entries = []
+
+def elapsed(start, end):
+    return (datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds()
+
+# === Филтриране и агрегиране (само приключилите от последното пускане) ===
+for game_name, gdata in closed_games:
     if not gdata["players"]:
         continue
-    duration = (gdata["destroyed_at"] - gdata["created_at"]).total_seconds()
+    duration = elapsed(gdata["created_at"], gdata["destroyed_at"])
     if duration < MIN_DURATION:
         continue
 
     # aggregate per player
     for char, pdata in gdata["players"].items():
-        join_count = len(pdata["sessions"])
-        total_time = sum(
-            (sess["leave"] - sess["join"]).total_seconds() if sess["leave"] else 0
-            for sess in pdata["sessions"]
-        )
-        max_session = max(
-            ((sess["leave"] - sess["join"]).total_seconds() if sess["leave"] else 0)
-            for sess in pdata["sessions"]
-        )
-        pdata["join_count"] = join_count
-        pdata["total_time_sec"] = int(total_time)
-        pdata["max_session_sec"] = int(max_session)
-        for sess in pdata["sessions"]:
-            sess["join"] = sess["join"].isoformat()
-            sess["leave"] = sess["leave"].isoformat() if sess["leave"] else None
-
-    # convert game timestamps to ISO
-    gdata["created_at"] = gdata["created_at"].isoformat()
-    gdata["destroyed_at"] = gdata["destroyed_at"].isoformat()
+        session_times = [elapsed(sess["join"], sess["leave"]) if sess["leave"] else 0 for sess in pdata["sessions"]]
+        pdata["join_count"] = len(pdata["sessions"])
+        pdata["total_time_sec"] = int(sum(session_times))
+        pdata["max_session_sec"] = int(max(session_times))
+
     gdata["duration_sec"] = int(duration)
 
     # write per-game JSON
@@ -105,19 +58,27 @@ for game_name, gdata in games.items():
     with open(game_file, "w") as f:
         json.dump(gdata, f, indent=2)
 
-    # update index
-    final_index["games"].append({
-        "game_uid": gdata["game_uid"],
-        "game_name": game_name,
-        "players": len(gdata["players"]),
-        "duration_sec": int(duration)
-    })
-
-final_index["total_games"] = len(final_index["games"])
-final_index["games"].sort(key=lambda x: x["game_name"])
-
-# write index.json
-with open(INDEX_FILE, "w") as f:
-    json.dump(final_index, f, indent=2)
-
-print(f"[OK] Processed {len(final_index['games'])} games. JSON files in {GAMES_DIR}")
+    # update index (повторно обработена игра след срив не се дублира)
+    if gdata["game_uid"] not in known_uids:
+        known_uids.add(gdata["game_uid"])
+        new_entries.append({
+            "game_uid": gdata["game_uid"],
+            "game_name": game_name,
+            "players": len(gdata["players"]),
+            "duration_sec": int(duration)
+        })
+
+if new_entries:
+    final_index["games"].extend(new_entries)
+    final_index["total_games"] = len(final_index["games"])
+    final_index["games"].sort(key=lambda x: x["game_name"])
+
+    # write index.json
+    tmp_index = INDEX_FILE + ".tmp"
+    with open(tmp_index, "w") as f:
+        json.dump(final_index, f, indent=2)
+    os.replace(tmp_index, INDEX_FILE)
+
+tracker.save()
+
+print(f"[OK] Processed {len(new_entries)} new games ({final_index['total_games']} total). JSON files in {GAMES_DIR}")
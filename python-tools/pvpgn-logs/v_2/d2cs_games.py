@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Състояние на игрите от d2cs.log с checkpoint между пусканията.
+
+Пази отворените игри (с отворените сесии на героите) и позицията в
+d2cs.log; update() обработва само новите редове и връща игрите, които
+току-що са приключили (game_destroy). Всеки скрипт държи свой state файл,
+за да не си "изяждат" новите редове един на друг. Игра без game_destroy
+(рестарт/срив на d2cs, изпуснат ред) и без активност STALE_AFTER_HOURS се
+маха от open_games, както prune_games() в 01.pvpgn_log_json.py.
+
+    tracker = D2csGameTracker(STATE_FILE)
+    closed = tracker.update()      # [(game_name, game), ...]
+    ... tracker.open_games ...
+    tracker.save()                 # след като изходът е записан
+"""
+import re
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+# log_tailer е в python-tools/pvpgn-logs
+PVPGN_LOGS_DIR = "/home/support/scripts-tools/d2cpp/python-tools/pvpgn-logs"
+sys.path.insert(0, PVPGN_LOGS_DIR)
+from log_tailer import load_state, save_state, read_new_lines
+
+D2CS_LOG = "/usr/local/pvpgn/var/pvpgn/logs/d2cs.log"
+STATE_VERSION = 1
+STALE_AFTER_HOURS = 48   # отворена игра без активност толкова време се изтрива
+
+YEAR = datetime.now().year
+
+re_create = re.compile(r"d2cs_game_create: game (\S+)")
+re_add = re.compile(r"game_add_character: added character (\S+) to game (\S+)")
+re_del = re.compile(r"game_del_character: removed character (\S+) from game (\S+)")
+re_destroy = re.compile(r"game_destroy: game (\S+) removed")
+
+
+def parse_ts(line: str) -> datetime:
+    dt = datetime.strptime(line[:15], "%b %d %H:%M:%S")
+    return dt.replace(year=YEAR)
+
+
+def last_activity(game: Dict[str, Any]) -> str:
+    """Последният ISO момент в играта: създаване, влизане или излизане на герой."""
+    stamps = [game["created_at"]]
+    for player in game["players"].values():
+        for sess in player["sessions"]:
+            stamps += [t for t in (sess["join"], sess["leave"]) if t]
+    return max(stamps)
+
+
+class D2csGameTracker:
+    def __init__(self, state_path: str, log_path: str = D2CS_LOG):
+        self.state_path = state_path
+        self.log_path = log_path
+        state = load_state(state_path)
+        if state.get("version") != STATE_VERSION or state.get("log") != log_path:
+            state = {"version": STATE_VERSION, "log": log_path, "position": {}, "open_games": {}}
+        self.state = state
+
+    @property
+    def open_games(self) -> Dict[str, Dict[str, Any]]:
+        """{ game_name: {"game_uid", "created_at", "destroyed_at", "players": {char: {"sessions": [...]}}} }"""
+        return self.state["open_games"]
+
+    def update(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Обработва новите редове; връща приключилите игри в реда на game_destroy."""
+        games = self.open_games
+        closed = []
+        for line in read_new_lines(self.log_path, self.state["position"], bootstrap_lines=None):
+            if "game" not in line:
+                continue
+            try:
+                ts = parse_ts(line)
+            except ValueError:
+                continue
+            iso = ts.isoformat()
+
+            if m := re_create.search(line):
+                game_name = m.group(1)
+                games[game_name] = {
+                    "game_uid": f"{ts.strftime('%Y%m%d%H%M%S')}_{game_name}",
+                    "created_at": iso,
+                    "destroyed_at": None,
+                    "players": {}
+                }
+
+            elif m := re_add.search(line):
+                char, game_name = m.group(1), m.group(2)
+                if game_name in games:
+                    player = games[game_name]["players"].setdefault(char, {"sessions": []})
+                    player["sessions"].append({"join": iso, "leave": None})
+
+            elif m := re_del.search(line):
+                char, game_name = m.group(1), m.group(2)
+                if game_name in games and char in games[game_name]["players"]:
+                    for sess in reversed(games[game_name]["players"][char]["sessions"]):
+                        if sess["leave"] is None:
+                            sess["leave"] = iso
+                            break
+
+            elif m := re_destroy.search(line):
+                game_name = m.group(1)
+                if game_name in games:
+                    game = games.pop(game_name)
+                    game["destroyed_at"] = iso
+                    closed.append((game_name, game))
+        self.prune_stale()
+        return closed
+
+    def prune_stale(self, hours: float = STALE_AFTER_HOURS) -> List[str]:
+        """Маха отворените игри без активност от hours часа; връща имената им."""
+        cutoff = (datetime.now() - timedelta(hours=hours)).isoformat()
+        games = self.open_games
+        stale = [name for name, game in games.items() if last_activity(game) < cutoff]
+        for name in stale:
+            del games[name]
+        return stale
+
+    def save(self) -> None:
+        save_state(self.state_path, self.state)
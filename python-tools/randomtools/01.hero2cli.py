@@ -3,14 +3,21 @@
 UNIFIED CHARACTER ANALYSIS SCRIPT (FINAL)
 Изпълнява пълен анализ на герой (Атрибути, Скилове, Прогрес, Руни, Чарове, Предмети)
 Героят се подава като аргумент от командния ред (e.g., python3 test.py Sorsi)
+
+Статусът и атрибутите са от заглавието (d2s_header.py); D2SFile (d2lib)
+декодира предметите чак за уменията и инвентара.
 """
 import os
 import sys
-from d2lib.files import D2SFile
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 from collections import defaultdict
 
+# Бързото четене на D2S заглавието е в python-tools/d2gs-py
+D2GS_PY_DIR = "/home/support/scripts-tools/d2cpp/python-tools/d2gs-py"
+sys.path.insert(0, D2GS_PY_DIR)
+from d2s_header import read_d2s_header
+
 # =======================================================
 # --- КОНФИГУРАЦИЯ ---
 # КЛЮЧОВИЯТ ПЪТ КЪМ TXT ФАЙЛОВЕТЕ
@@ -46,13 +53,8 @@ RUNE_STATS = {
 # Известни кодове, които започват с 'r', но НЕ СА руни:
 NON_RUNE_CODES = ['rin', 'rvl', 'rvs', 'rsv', 'rsc', 'rpl', 'rsk']
 
-# --- D2LIB ЗАРЕЖДАНЕ ---
+# --- D2LIB ЗАРЕЖДАНЕ (само за уменията и предметите, през D2SHeader.full()) ---
 os.environ['D2_DATA_PATH'] = D2_DATA_DIR
-try:
-    from d2lib.files import D2SFile
-except ImportError:
-    print("[!!!] ERROR: Failed to import d2lib.files.D2SFile. Is d2lib installed?")
-    sys.exit(1)
 
 # =======================================================
 # --- ПОМОЩНИ ФУНКЦИИ ---
@@ -132,12 +134,12 @@ def run_full_report_unified(char_name_input: str):
         sys.exit(1)
         
     try:
-        d2s = D2SFile(char_path)
-    except Exception as e:
+        hdr = read_d2s_header(char_path)
+    except (OSError, ValueError) as e:
         print(f"[!!!] ERROR: Failed to parse D2S file: {e}")
         sys.exit(1)
 
-    char_name = getattr(d2s, "char_name", char_name_input)
+    char_name = hdr.char_name or char_name_input
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     # --- 1. ОСНОВНА ИДЕНТИФИКАЦИЯ И СТАТУС ---
@@ -148,18 +150,18 @@ def run_full_report_unified(char_name_input: str):
     
     print("\n### 1. ОСНОВЕН СТАТУС")
     print(f"  Герой: {char_name}")
-    print(f"  Клас: {getattr(d2s, 'char_class', 'N/A')}")
-    print(f"  Ниво: {getattr(d2s, 'char_level', 0)}")
-    print(f"  Hardcore: {'Yes' if getattr(d2s, 'is_hardcore', False) else 'No'}")
-    print(f"  Ladder: {'Yes' if getattr(d2s, 'is_ladder', False) else 'No'}")
-    print(f"  Локация: Lobby/Offline (ID: {getattr(d2s, 'current_level_id', 0)})")
-    print(f"  Прогрес (Normal): {get_progression_status(getattr(d2s, 'progression', None))}")
+    print(f"  Клас: {getattr(hdr, 'char_class', 'N/A')}")
+    print(f"  Ниво: {getattr(hdr, 'char_level', 0)}")
+    print(f"  Hardcore: {'Yes' if getattr(hdr, 'is_hardcore', False) else 'No'}")
+    print(f"  Ladder: {'Yes' if getattr(hdr, 'is_ladder', False) else 'No'}")
+    print(f"  Локация: Lobby/Offline (ID: {getattr(hdr, 'current_level_id', 0)})")
+    print(f"  Прогрес (Normal): {get_progression_status(hdr.progression)}")
 
     print("\n–––––––––––––––––––––––––––––––––––––––––––––––––––––––")
     
     # --- 2. АТРИБУТИ (STATS) ---
     print("\n### 2. АТРИБУТИ")
-    attrs = getattr(d2s, "attributes", {})
+    attrs = hdr.attributes
     if attrs:
         print(f"  HP: {attrs.get('current_hp', 0):.0f}/{attrs.get('max_hp', 0):.0f} | Mana: {attrs.get('current_mana', 0):.0f}/{attrs.get('max_mana', 0):.0f}")
         print(f"  STR: {attrs.get('strength', 0)} | DEX: {attrs.get('dexterity', 0)} | VIT: {attrs.get('vitality', 0)} | ENG: {attrs.get('energy', 0)}")
@@ -170,6 +172,16 @@ def run_full_report_unified(char_name_input: str):
 
     print("\n–––––––––––––––––––––––––––––––––––––––––––––––––––––––")
 
+    # Оттук нататък трябва пълният D2SFile
+    try:
+        d2s = hdr.full()
+    except ImportError:
+        print("\n[!!!] ERROR: Failed to import d2lib.files.D2SFile. Is d2lib installed?")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n[!!!] ERROR: Failed to parse D2S file: {e}")
+        sys.exit(1)
+
     # --- 3. УМЕНИЯ (SKILLS) ---
     print("\n### 3. УМЕНИЯ (Skills)")
     skills = getattr(d2s, "skills", {})
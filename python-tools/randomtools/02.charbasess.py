@@ -2,27 +2,25 @@
 """
 Minimalistic script to extract essential character stats and progression status, 
 excluding items and relying on the D2S file only for character status.
+
+Чете само заглавието на всеки D2S (d2s_header.py) - без d2lib и без
+декодиране на предметите.
 """
 import os
+import sys
 import glob
 from typing import Dict, Any, Optional
 
+# Бързото четене на D2S заглавието е в python-tools/d2gs-py
+D2GS_PY_DIR = "/home/support/scripts-tools/d2cpp/python-tools/d2gs-py"
+sys.path.insert(0, D2GS_PY_DIR)
+from d2s_header import read_d2s_header
+
 # =======================================================
 # --- КОНФИГУРАЦИЯ ---
 CHAR_DIR = "/usr/local/pvpgn/var/pvpgn/charsave"
-D2_DATA_DIR = "/home/support/scripts-tools/d2cpp/pvpgnjsonstat/d2gs/items/" 
 # =======================================================
 
-# --- D2LIB ЗАРЕЖДАНЕ ---
-os.environ['D2_DATA_PATH'] = D2_DATA_DIR
-try:
-    from d2lib.files import D2SFile
-    print(f"[*] D2SFile imported. Data path: {D2_DATA_DIR}")
-except ImportError:
-    print("[!!!] ERROR: Failed to import d2lib.files.D2SFile. Is d2lib installed?")
-    exit(1)
-# ------------------------------------
-
 def get_progression_status(progression_value: Optional[int]) -> str:
     """Конвертира Progression Bitmask в четлив статус."""
     if progression_value is None:
@@ -58,8 +56,8 @@ def run_status_report():
         char_fname = os.path.basename(path)
         
         try:
-            d2s = D2SFile(path)
-        except Exception:
+            d2s = read_d2s_header(path)
+        except (OSError, ValueError):
             print(f"  [!] {char_fname:<20} | Status: UNREADABLE FILE")
             continue
 
@@ -1,18 +1,30 @@
 #!/usr/bin/env python3
 """
 Rune Finder Tool (CLI) - Анализира инвентара на всички герои 
-за необходимите руни чрез директно четене на D2S файлове.
+за необходимите руни чрез директно четене на D2S файлове
+или (с --snapshot) от общия snapshot на pvpgnjsonstat/d2gs.
+
+Директното четене обхожда само заглавията на предметите (d2s_items.py) -
+без d2lib и без декодиране на свойствата им.
 """
 import os
 import sys
 import glob
+import argparse
 from collections import defaultdict
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple
+
+# Лекото четене на предметите (само заглавията) е в python-tools/d2gs-py
+D2GS_PY_DIR = "/home/support/scripts-tools/d2cpp/python-tools/d2gs-py"
+sys.path.insert(0, D2GS_PY_DIR)
+from d2s_items import read_char_items, RUNE_CODES
 
 # --- КОНФИГУРАЦИЯ И RUNEWORDS ---
 CHAR_DIR = "/usr/local/pvpgn/var/pvpgn/charsave"
-D2_DATA_DIR = "/home/support/scripts-tools/d2cpp/pvpgnjsonstat/d2gs/items/" 
 NON_RUNE_CODES = ['rin', 'rvl', 'rvs', 'rsv', 'rsc', 'rpl', 'rsk'] # Кодове за филтриране
+# Общият snapshot на героите (07.build_char_snapshot.py) и модулът, който го чете
+D2GS_LIB_DIR = "/home/support/scripts-tools/d2cpp/pvpgnjsonstat/d2gs"
+SNAPSHOT_FILE = os.path.join(D2GS_LIB_DIR, "cache", "char_snapshot.bin")
 
 # RUNEWORD БАЗА ДАННИ
 RUNEWORDS = {
@@ -38,30 +50,14 @@ RUNEWORDS = {
     "Obsession": ["Zod Rune", "Ist Rune", "Lem Rune", "Lum Rune", "Io Rune"],
 }
 
-# --- D2LIB ЗАРЕЖДАНЕ ---
-os.environ['D2_DATA_PATH'] = D2_DATA_DIR
-try:
-    # Трябва да импортираме D2SFile, за да прочетем файловете
-    from d2lib.files import D2SFile
-except ImportError:
-    print("[!!!] ERROR: Failed to import d2lib.files.D2SFile. Is d2lib installed?")
-    sys.exit(1)
-
-
 # =======================================================
 # --- ОСНОВНИ ФУНКЦИИ ---
 # =======================================================
 
-def is_valid_rune(item: Any) -> bool:
-    """Проверява дали даден предмет е свободна руна."""
-    code = getattr(item, 'code', '')
+def is_rune_code(code: str) -> bool:
+    """Код r01 до r33 (без пръстени, rejuv. отвари и т.н.)."""
     if code.startswith('r') and code not in NON_RUNE_CODES:
-         # Допълнителна проверка за код r01 до r33
-         if len(code) == 3 and code[1:].isdigit() and 1 <= int(code[1:]) <= 33:
-            # Трябва да е свободна, а не поставена в гнездо (d2lib не винаги го засича 
-            # перфектно, но това е най-добрият филтър)
-            if not getattr(item, 'is_socketed', False):
-                 return True
+        return len(code) == 3 and code[1:].isdigit() and 1 <= int(code[1:]) <= 33
     return False
 
 def load_global_rune_inventory(char_dir: str) -> Dict[str, List[Tuple[str, str]]]:
@@ -75,29 +71,46 @@ def load_global_rune_inventory(char_dir: str) -> Dict[str, List[Tuple[str, str]]
     print(f"[*] Сканиране на {len(char_files)} геройски файла...")
 
     for path in char_files:
+        # Само свободни руни: филтър по кода от заглавието, поставените в гнезда се пропускат
         try:
-            d2s = D2SFile(path)
-            char_name = getattr(d2s, "char_name", os.path.basename(path))
-        except Exception:
+            hdr, runes = read_char_items(path, codes=RUNE_CODES)
+        except (OSError, ValueError):
             continue # Пропускаме нечетливите или невалидни файлове
+        char_name = hdr.char_name or os.path.basename(path)
 
-        all_items = list(getattr(d2s, "items", []))
-        stash_items = getattr(d2s, "stash", [])
-        try: all_items.extend(list(stash_items))
-        except Exception: pass
-        
-        # Обхождаме всички предмети и филтрираме за свободни руни
-        for item in all_items:
-            if is_valid_rune(item):
-                rune_name = getattr(item, 'name', 'Unknown Rune')
-                # Определяме локацията (проста евристика: Stash/Inventory)
-                location = "Stash" if getattr(item, 'is_in_stash', False) else "Inventory"
-                
-                global_inventory[rune_name].append((char_name, location))
+        for item in runes:
+            # Определяме локацията (проста евристика: Stash/Inventory)
+            location = "Stash" if item.is_in_stash else "Inventory"
+            global_inventory[item.name].append((char_name, location))
                 
     print(f"[*] Сканирането приключи. Намерени {sum(len(v) for v in global_inventory.values())} свободни руни.")
     return global_inventory
 
+def load_global_rune_inventory_from_snapshot(snapshot_path: str) -> Dict[str, List[Tuple[str, str]]]:
+    """
+    Същото като load_global_rune_inventory, но от вече декодирания snapshot -
+    без нито едно D2SFile декодиране.
+    """
+    sys.path.insert(0, D2GS_LIB_DIR)
+    import char_snapshot
+
+    snapshot = char_snapshot.load_snapshot(snapshot_path)
+    if snapshot is None:
+        print(f"[!!!] ERROR: Няма използваем snapshot: {snapshot_path}")
+        sys.exit(1)
+
+    global_inventory = defaultdict(list)
+    print(f"[*] Snapshot от {snapshot['generated']} ({len(snapshot['characters'])} героя)...")
+
+    for record in snapshot["characters"]:
+        for item in record["items"]:
+            if is_rune_code(item["code"]) and not item["is_socketed"]:
+                location = "Stash" if item["is_in_stash"] else "Inventory"
+                global_inventory[item["name"] or 'Unknown Rune'].append((record["charname"], location))
+
+    print(f"[*] Намерени {sum(len(v) for v in global_inventory.values())} свободни руни.")
+    return global_inventory
+
 def find_runeword_materials(target_runeword: str, global_inventory: Dict[str, List[Tuple[str, str]]]):
     """
     Проверява дали необходимите руни са налични.
@@ -167,16 +180,23 @@ def find_runeword_materials(target_runeword: str, global_inventory: Dict[str, Li
 # =======================================================
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("\n[!!!] ERROR: Моля, подайте името на Runeword-а като аргумент (в кавички).")
-        print("Например: python3 findruneword.py \"Call To Arms\"")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Find which characters hold the runes for a runeword.",
+                                     epilog='Например: python3 findruneword.py "Call To Arms"')
+    parser.add_argument("runeword", nargs="+", help="runeword name")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="read the shared character snapshot instead of decoding every D2S file")
+    parser.add_argument("--snapshot-file", default=SNAPSHOT_FILE, metavar="PATH",
+                        help=f"snapshot to read with --snapshot (default: {SNAPSHOT_FILE})")
+    args = parser.parse_args()
         
     # Взимаме всички аргументи след името на скрипта и ги обединяваме
-    runeword_name = " ".join(sys.argv[1:])
+    runeword_name = " ".join(args.runeword)
     
     # 1. Зареждане на глобалния инвентар
-    global_rune_inventory = load_global_rune_inventory(CHAR_DIR)
+    if args.snapshot:
+        global_rune_inventory = load_global_rune_inventory_from_snapshot(args.snapshot_file)
+    else:
+        global_rune_inventory = load_global_rune_inventory(CHAR_DIR)
     
     # 2. Търсене на Runeword
     find_runeword_materials(runeword_name, global_rune_inventory)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import os
 import re
+import sys
 import json
 import copy
 from collections import defaultdict
@@ -10,15 +11,14 @@ from datetime import datetime
 # CONFIG
 # ======================================================
 CHAR_SAVE_DIR = "/usr/local/pvpgn/var/pvpgn/charsave"
-D2_DATA_DIR   = "/home/support/scripts-tools/d2cpp/pvpgnjsonstat/d2gs/items/"
 RUNEWORDS_TXT = "runewords.txt"   # смени ако е другаде
 JSON_OUT_DIR  = "/var/www/html/pvpjsonstat/new"
 JSON_OUT_FILE = os.path.join(JSON_OUT_DIR, "runewords.json")
 
-NON_RUNE_CODES = ['rin', 'rvl', 'rvs', 'rsv', 'rsc', 'rpl', 'rsk']
-
-os.environ['D2_DATA_PATH'] = D2_DATA_DIR
-from d2lib.files import D2SFile
+# Руните се четат само от заглавията на предметите (без d2lib)
+D2GS_PY_DIR = "/home/support/scripts-tools/d2cpp/python-tools/d2gs-py"
+sys.path.insert(0, D2GS_PY_DIR)
+from d2s_items import read_char_items, RUNE_CODES
 
 # ======================================================
 # INVENTORY
@@ -30,26 +30,13 @@ def gather_inventory(char_dir):
         path = os.path.join(char_dir, fname)
         if os.path.isdir(path):
             continue
+        # целият файл или нищо: при грешка по средата руните му не се броят
         try:
-            d2s = D2SFile(path)
-        except Exception:
+            _, runes = read_char_items(path, codes=RUNE_CODES)
+        except (OSError, ValueError):
             continue
-
-        items = list(getattr(d2s, "items", []))
-        try:
-            items.extend(list(getattr(d2s, "stash", [])))
-        except Exception:
-            pass
-
-        for item in items:
-            code = getattr(item, "code", "")
-            if not code.startswith("r") or code in NON_RUNE_CODES:
-                continue
-            if len(code) == 3 and code[1:].isdigit():
-                n = int(code[1:])
-                if 1 <= n <= 33:
-                    rune = getattr(item, "name", "Unknown Rune")
-                    inventory[rune][fname] += 1
+        for item in runes:
+            inventory[item.name][fname] += 1
 
     return inventory
 